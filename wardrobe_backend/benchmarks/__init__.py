@@ -0,0 +1 @@
+"""效能量測腳本，於 wardrobe_backend 目錄執行（python benchmarks/<腳本>.py 或 python -m benchmarks.<腳本>）"""
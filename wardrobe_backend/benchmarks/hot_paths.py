@@ -0,0 +1,183 @@
+"""在合成衣櫥上分別量測推薦與統計的熱點路徑，結果以 JSON 輸出以便比較不同版本
+
+用法: python benchmarks/hot_paths.py [--sizes 10 100 1000 10000 100000] [--repeat 5]
+                                   [--output result.json] [--baseline previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.wardrobe_generator import generate_wardrobe, insert_wardrobe
+from src.main import create_app
+from src.models.wardrobe import db, ClothingItem
+from src.routes.recommendations import (aggregate_wardrobe_stats, filter_items_by_criteria,
+                                        generate_outfit_combinations, get_wardrobe_stats)
+from src.services.ai_service import OutfitScoringSystem
+from src.services.outfit_encoding import encode_outfits
+
+USER_ID = 1
+SEASON = '秋季'
+OCCASION = '日常'
+STYLE_LEVEL = 2
+WEATHER = {'temperature': 18, 'weather_main': 'Clear'}
+
+# 穿搭組合數隨每類衣物數量呈指數成長，只取每類前 N 件
+DEFAULT_COMBINATION_CAP = 15
+DEFAULT_SCORE_SAMPLES = 200
+
+
+def measure(func, repeat):
+    """執行 repeat 次，返回耗時統計（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - began) * 1000)
+    return {'median_ms': round(statistics.median(samples), 3), 'min_ms': round(min(samples), 3),
+            'max_ms': round(max(samples), 3), 'runs': repeat}
+
+
+def group_by_category(items, cap):
+    groups = {}
+    for item in items:
+        group = groups.setdefault(item['category'], [])
+        if len(group) < cap:
+            group.append(item)
+    return groups
+
+
+def run(size, repeat, seed, combination_cap, score_samples):
+    rnd = random.Random(seed)
+    scoring_system = OutfitScoringSystem()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          'INIT_DATABASE': False, 'BACKGROUND_TASKS': False, 'UPLOAD_FOLDER': tmp})
+        with app.app_context():
+            db.create_all()
+            insert_wardrobe(generate_wardrobe(size, seed, USER_ID))
+            rows = ClothingItem.query.filter_by(user_id=USER_ID).all()
+            all_items = [row.to_dict() for row in rows]
+
+            timings = {}
+            timings['ClothingItem.to_dict'] = measure(lambda: [row.to_dict() for row in rows], repeat)
+
+            filtered = filter_items_by_criteria(all_items, SEASON, OCCASION, STYLE_LEVEL)
+            timings['filter_items_by_criteria'] = measure(
+                lambda: filter_items_by_criteria(all_items, SEASON, OCCASION, STYLE_LEVEL), repeat)
+
+            items_by_category = group_by_category(filtered, combination_cap)
+            combinations = generate_outfit_combinations(items_by_category, WEATHER['temperature'])
+            timings['generate_outfit_combinations'] = measure(
+                lambda: generate_outfit_combinations(items_by_category, WEATHER['temperature']), repeat)
+
+            candidates = [item for group in items_by_category.values() for item in group]
+            sampled = rnd.sample(combinations, min(score_samples, len(combinations)))
+            if combinations:  # 衣物太少（沒有上衣或下著）時沒有組合可評分
+                timings['calculate_outfit_score'] = measure(
+                    lambda: [scoring_system.calculate_outfit_score(outfit, WEATHER, OCCASION, STYLE_LEVEL)
+                             for outfit in sampled], repeat)
+
+                # 同一批組合以批次評分計算，作為逐套評分的對照
+                encoding = scoring_system.encode_items(candidates)
+                index = {id(item): idx for idx, item in enumerate(candidates)}
+                encoded = encode_outfits([[index[id(item)] for item in outfit] for outfit in combinations])
+                timings['calculate_outfit_scores_batch'] = measure(
+                    lambda: scoring_system.calculate_outfit_scores_batch(encoding, encoded, WEATHER, OCCASION,
+                                                                         STYLE_LEVEL), repeat)
+
+            timings['aggregate_wardrobe_stats'] = measure(lambda: aggregate_wardrobe_stats(USER_ID), repeat)
+
+            def wardrobe_stats_endpoint():
+                with app.test_request_context(f'/api/stats/wardrobe?user_id={USER_ID}'):
+                    get_wardrobe_stats()
+
+            wardrobe_stats_endpoint()  # 建立統計快照
+            timings['get_wardrobe_stats'] = measure(wardrobe_stats_endpoint, repeat)
+
+            db.session.remove()
+            db.engine.dispose()
+
+    return {
+        'size': size,
+        'counts': {'items': len(all_items), 'filtered_items': len(filtered),
+                   'combination_items': len(candidates), 'combinations': len(combinations),
+                   'scored_outfits': len(sampled)},
+        'timings': timings,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """列出與前次結果的中位數比值（>1 表示變慢）"""
+    previous = {(run['size'], name): timing['median_ms']
+                for run in baseline['results'] for name, timing in run['timings'].items()}
+    for run in results:
+        for name, timing in run['timings'].items():
+            before = previous.get((run['size'], name))
+            if before:
+                ratio = timing['median_ms'] / before
+                print(f"{run['size']:>8} {name:<32}{before:>12.3f} -> {timing['median_ms']:>10.3f} ms"
+                      f"  x{ratio:.2f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--combination-cap', type=int, default=DEFAULT_COMBINATION_CAP)
+    parser.add_argument('--score-samples', type=int, default=DEFAULT_SCORE_SAMPLES)
+    parser.add_argument('--output', help='寫入 JSON 檔案（預設輸出至標準輸出）')
+    parser.add_argument('--baseline', help='與先前輸出的 JSON 比較')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'combination_cap': args.combination_cap,
+            'score_samples': args.score_samples,
+        },
+        'results': [run(size, args.repeat, args.seed, args.combination_cap, args.score_samples)
+                    for size in args.sizes],
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(report['results'], json.load(f))
+
+
+if __name__ == '__main__':
+    main()
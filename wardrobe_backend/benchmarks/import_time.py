@@ -0,0 +1,75 @@
+"""以 python -X importtime 量測應用程式的冷啟動 import 耗時，超出預算或載入了重量級套件時返回非零
+
+用法: python benchmarks/import_time.py [--module src.main] [--budget-ms 1500] [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 啟動時不應載入的套件（應在首次使用時才延遲載入）
+FORBIDDEN_MODULES = ('google.generativeai', 'grpc', 'google.protobuf', 'PIL')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def measure(module):
+    """在新的行程中 import 模組，返回 [(模組名稱, 自身微秒, 累計微秒, 深度)]"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} 失敗:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def is_forbidden(name):
+    return any(name == forbidden or name.startswith(forbidden + '.') for forbidden in FORBIDDEN_MODULES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='src.main')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 1500)))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        rows = measure(args.module)
+        totals.append(sum(self_us for _, self_us, _, _ in rows) / 1000)
+
+    # 以最後一次（快取已熱）的結果列出最耗時的直接依賴
+    top_level = sorted((row for row in rows if row[3] == 1), key=lambda row: row[2], reverse=True)
+    print(f"{'套件':<40}{'累計 ms':>10}")
+    for name, _, cumulative_us, _ in top_level[:args.top]:
+        print(f"{name:<40}{cumulative_us / 1000:>10.1f}")
+
+    median = statistics.median(totals)
+    print(f"\nimport {args.module}: 中位數 {median:.1f} ms（{', '.join(f'{t:.1f}' for t in totals)}），"
+          f"預算 {args.budget_ms:.0f} ms")
+
+    failed = False
+    loaded = sorted({name for name, _, _, _ in rows if is_forbidden(name)})
+    if loaded:
+        print(f"錯誤: 啟動時載入了應延遲載入的套件: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print('錯誤: 超出 import 耗時預算')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""比較套用索引遷移前後，常用 user_id 查詢在不同資料量下的耗時
+
+用法: python benchmarks/query_indexes.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.models.wardrobe import db, ClothingItem, FavoriteOutfit
+from src.models.migrations import upgrade_database
+
+CATEGORIES = ['上衣', '下著', '外套', '鞋子', '配件']
+ITEMS_PER_USER = 500
+INSERT_CHUNK = 50000
+
+
+def create_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def drop_indexes():
+    """移除模型上的索引，模擬遷移前的資料庫"""
+    for model in (ClothingItem, FavoriteOutfit):
+        for index in model.__table__.indexes:
+            index.drop(bind=db.session.connection(), checkfirst=True)
+    db.session.commit()
+
+
+def populate(size, rnd):
+    users = max(1, size // ITEMS_PER_USER)
+    start = datetime(2024, 1, 1)
+    for offset in range(0, size, INSERT_CHUNK):
+        count = min(INSERT_CHUNK, size - offset)
+        clothing_rows = [{
+            'user_id': rnd.randint(1, users),
+            'name': f'item{offset + i}',
+            'category': rnd.choice(CATEGORIES),
+            'created_at': start + timedelta(minutes=offset + i),
+        } for i in range(count)]
+        favorite_rows = [{
+            'user_id': row['user_id'],
+            'created_at': row['created_at'],
+        } for row in clothing_rows[:count // 10]]
+        db.session.execute(ClothingItem.__table__.insert(), clothing_rows)
+        if favorite_rows:
+            db.session.execute(FavoriteOutfit.__table__.insert(), favorite_rows)
+        db.session.commit()
+    return users
+
+
+def time_queries(users, rnd, repeat):
+    queries = {
+        'clothing_by_user': lambda user_id: ClothingItem.query.filter_by(user_id=user_id).all(),
+        'clothing_by_user_category': lambda user_id: ClothingItem.query.filter_by(user_id=user_id, category='上衣').all(),
+        'favorites_by_user_recent': lambda user_id: FavoriteOutfit.query.filter_by(user_id=user_id)
+            .order_by(FavoriteOutfit.created_at.desc()).limit(20).all(),
+    }
+    results = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(repeat):
+            user_id = rnd.randint(1, users)
+            began = time.perf_counter()
+            query(user_id)
+            samples.append((time.perf_counter() - began) * 1000)
+            db.session.expunge_all()
+        results[name] = round(statistics.median(samples), 3)
+    return results
+
+
+def run(size, repeat, seed):
+    rnd = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            drop_indexes()
+            users = populate(size, rnd)
+
+            before = time_queries(users, rnd, repeat)
+            began = time.perf_counter()
+            upgrade_database()
+            migrate_ms = round((time.perf_counter() - began) * 1000, 1)
+            after = time_queries(users, rnd, repeat)
+            db.session.remove()
+            db.engine.dispose()
+
+    return {'rows': size, 'users': users, 'migrate_ms': migrate_ms,
+            'before_ms': before, 'after_ms': after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    results = [run(size, args.repeat, args.seed) for size in args.sizes]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""以固定種子產生接近真實分佈的合成衣櫥，供效能量測使用
+
+顏色與風格取自 color_engine 的顏色分類與 ai_service 的風格等級偏好，季節與場合取自 outfit_encoding 的固定詞彙。
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from src.models.wardrobe import db, ClothingItem
+from src.services.ai_service import STYLE_LEVEL_PREFERENCES
+from src.services.outfit_encoding import SEASONS, OCCASIONS, season_mask, occasion_mask
+from src.services.color_engine import COLOR_CATEGORIES, get_color_engine
+
+# 類別與比例（同衣物分析提示詞的類別）
+CATEGORY_WEIGHTS = {'上衣': 35, '下著': 25, '外套': 12, '鞋子': 15, '配件': 13}
+
+# 中性色系較常見
+NEUTRAL_FAMILIES = ('黑色系', '白色系', '灰色系', '藍色系', '米色系')
+NEUTRAL_WEIGHT = 4
+
+MATERIALS = ['棉質', '純棉', '麻質', '羊毛', '厚針織', '薄長袖', '聚酯纖維', '牛仔布', '防水尼龍', '絨布', '皮革', '透氣網布']
+
+# 詞彙外的場合（資料庫查詢需以溢位位元粗篩）
+EXTRA_OCCASIONS = ['派對', '旅行']
+
+# 資料缺漏的比例（未完成 AI 分析或用戶未填寫）
+MISSING_COLOR_RATE = 0.05
+MISSING_STYLE_RATE = 0.05
+ALL_SEASONS_RATE = 0.1
+NO_OCCASION_RATE = 0.1
+EXTRA_OCCASION_RATE = 0.02
+
+
+def vocabularies() -> Dict[str, Any]:
+    """取得顏色與風格詞彙"""
+    styles = sorted({style for prefs in STYLE_LEVEL_PREFERENCES.values() for style in prefs['styles']})
+    return {
+        'color_categories': COLOR_CATEGORIES,
+        'styles': styles + ['運動'],
+    }
+
+
+def generate_wardrobe(size: int, seed: int = 42, user_id: int = 1) -> List[Dict[str, Any]]:
+    """產生 size 件衣物的字典列表（格式同 ClothingItem.to_dict，不含 id）"""
+    rnd = random.Random(seed)
+    vocab = vocabularies()
+    families = list(vocab['color_categories'])
+    family_weights = [NEUTRAL_WEIGHT if family in NEUTRAL_FAMILIES else 1 for family in families]
+    categories = list(CATEGORY_WEIGHTS)
+    category_weights = list(CATEGORY_WEIGHTS.values())
+    start = datetime(2024, 1, 1)
+
+    items = []
+    for idx in range(size):
+        category = rnd.choices(categories, category_weights)[0]
+        color = None
+        if rnd.random() >= MISSING_COLOR_RATE:
+            color = rnd.choice(vocab['color_categories'][rnd.choices(families, family_weights)[0]])
+        style = None if rnd.random() < MISSING_STYLE_RATE else rnd.choice(vocab['styles'])
+
+        if rnd.random() < ALL_SEASONS_RATE:
+            seasons = []
+        else:
+            seasons = sorted(rnd.sample(SEASONS, rnd.randint(1, len(SEASONS))), key=SEASONS.index)
+
+        occasions = []
+        if rnd.random() >= NO_OCCASION_RATE:
+            occasions = rnd.sample(OCCASIONS, rnd.randint(1, 3))
+            if rnd.random() < EXTRA_OCCASION_RATE:
+                occasions.append(rnd.choice(EXTRA_OCCASIONS))
+
+        items.append({
+            'user_id': user_id,
+            'name': f"{color or ''}{style or ''}{category}{idx}",
+            'category': category,
+            'primary_color': color,
+            'style': style,
+            'material': rnd.choice(MATERIALS),
+            'suitable_seasons': seasons,
+            'suitable_occasions': occasions,
+            'usage_count': int(rnd.expovariate(1 / 8)),
+            'created_at': start + timedelta(minutes=idx),
+        })
+    return items
+
+
+def insert_wardrobe(items: List[Dict[str, Any]], chunk_size: int = 5000):
+    """批次寫入資料庫（同時計算篩選用的反正規化欄位）"""
+    engine = get_color_engine()
+    for offset in range(0, len(items), chunk_size):
+        rows = [dict(item,
+                     suitable_seasons=json.dumps(item['suitable_seasons'], ensure_ascii=False),
+                     suitable_occasions=json.dumps(item['suitable_occasions'], ensure_ascii=False),
+                     season_mask=season_mask(item['suitable_seasons']),
+                     occasion_mask=occasion_mask(item['suitable_occasions']),
+                     color_family=engine.family_id(item['primary_color'] or ''))
+                for item in items[offset:offset + chunk_size]]
+        db.session.execute(ClothingItem.__table__.insert(), rows)
+    db.session.commit()
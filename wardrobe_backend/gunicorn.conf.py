@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+# 用法（於 wardrobe_backend 目錄）：gunicorn -c gunicorn.conf.py
+wsgi_app = 'src.wsgi:app'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# 串流推薦與匯出可能持續較久
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+# 各 worker 的指標寫入此目錄，/api/metrics 不論落在哪個 worker 都輸出合計
+metrics_dir = os.getenv('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'database', 'metrics'))
+
+
+def on_starting(server):
+    """在 fork worker 前由主行程建立表格、套用遷移並建立預設用戶，避免 worker 同時寫入"""
+    from src.main import create_app
+    from src.models.wardrobe import db
+
+    app = create_app({'INIT_DATABASE': True, 'BACKGROUND_TASKS': False, 'METRICS_DIR': None})
+    with app.app_context():
+        db.engine.dispose()
+
+    # 清除上次執行留下的指標，worker 由環境變數取得目錄
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(metrics_dir, name))
+    os.environ['METRICS_DIR'] = metrics_dir
@@ -3,80 +3,177 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.wardrobe import db, ClothingItem, FavoriteOutfit  # 改為從 wardrobe 導入
+from src.models.migrations import upgrade_database
+from src.models.sqlite import configure_sqlite
 from src.models.user import User  # 單獨導入 User 模型
 from src.routes.user import user_bp
 from src.routes.clothing import clothing_bp
 from src.routes.recommendations import recommendations_bp
+from src.routes.backup import backup_bp
+from src.routes.metrics import metrics_bp
+from src.services import compression
+from src.services.analysis_queue import analysis_queue
+from src.services.metrics import metrics
+from src.services.photo_storage import photo_storage
+from src.services.process_lock import acquire_process_lock
+from src.services.static_assets import StaticManifest
+from src.services.weather_prefetch import weather_prefetcher
 from dotenv import load_dotenv
 
 # 載入環境變數
 load_dotenv()
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# 啟用 CORS
-CORS(app, origins="*")
-
-# 資料庫配置
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
-# 初始化資料庫
-db.init_app(app)
-
-# 註冊藍圖
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(clothing_bp, url_prefix='/api')
-app.register_blueprint(recommendations_bp, url_prefix='/api')
-
-# 建立資料庫表格和初始資料
-with app.app_context():
-    db.create_all()
-    
-    # 檢查是否有預設用戶，沒有則建立
-    if not User.query.filter_by(id=1).first():
-        default_user = User(
-            id=1,
-            username='default_user',
-            email='user@example.com',
-            style_level=3,
-            location='台北市'
-        )
-        db.session.add(default_user)
-        db.session.commit()
-        print("建立預設用戶 (ID: 1)")
-
-# 靜態檔案服務
-@app.route('/uploads/<filename>')
-def uploaded_file(filename):
-    upload_folder = os.path.join(os.path.dirname(__file__), 'uploads')
-    return send_from_directory(upload_folder, filename)
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
-
-# 健康檢查端點
-@app.route('/api/health')
-def health_check():
-    return {'status': 'healthy', 'message': 'AI Wardrobe Backend is running'}
+BASE_DIR = os.path.dirname(__file__)
+
+# 連線池設定（環境變數名稱 -> create_engine 參數），未設定時使用 SQLAlchemy 預設值
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', lambda value: value.lower() in ('1', 'true', 'yes')),
+}
+
+
+def env_flag(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def default_config():
+    """由環境變數組成的預設設定"""
+    engine_options = {option: convert(os.environ[name])
+                      for name, (option, convert) in POOL_SETTINGS.items() if os.getenv(name)}
+    return {
+        'SECRET_KEY': os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT'),
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL',
+                                             f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options,
+        'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
+        'SQLITE_JOURNAL_MODE': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'SQLITE_BUSY_TIMEOUT_MS': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'SQLITE_SYNCHRONOUS': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        # 啟動時建立表格、套用遷移並建立預設用戶（多 worker 部署時由主行程執行一次）
+        'INIT_DATABASE': env_flag('INIT_DATABASE', True),
+        # 背景工作：每個 worker 各自預先抓取天氣（天氣快取在行程記憶體中）；
+        # 恢復未完成的 AI 分析與回收圖片只由取得檔案鎖的 worker 執行
+        'BACKGROUND_TASKS': env_flag('BACKGROUND_TASKS', True),
+        'BACKGROUND_LOCK_FILE': os.path.join(BASE_DIR, 'database', 'background.lock'),
+        'UPLOAD_FOLDER': os.path.join(BASE_DIR, 'uploads'),
+        # 圖片儲存後端（見 photo_storage.PHOTO_STORES）
+        'PHOTO_STORE': os.getenv('PHOTO_STORE', 'local'),
+        # 前端靜態檔案於啟動時預先壓縮（gzip/brotli）的存放位置；JSON 回應動態壓縮
+        'STATIC_CACHE_FOLDER': os.path.join(BASE_DIR, 'database', 'static_cache'),
+        'COMPRESS_RESPONSES': env_flag('COMPRESS_RESPONSES', True),
+        # 多 worker 時各 worker 的指標寫入此目錄，/api/metrics 輸出合計（未設定時只輸出本行程）
+        'METRICS_DIR': os.getenv('METRICS_DIR'),
+    }
+
+
+def init_database(app):
+    """建立資料庫表格、套用遷移與初始資料"""
+    with app.app_context():
+        db.create_all()
+        upgrade_database()
+
+        # 檢查是否有預設用戶，沒有則建立
+        if not User.query.filter_by(id=1).first():
+            default_user = User(
+                id=1,
+                username='default_user',
+                email='user@example.com',
+                style_level=3,
+                location='台北市'
+            )
+            db.session.add(default_user)
+            db.session.commit()
+            print("建立預設用戶 (ID: 1)")
+
+
+def start_background_tasks(app):
+    """啟動天氣預先抓取；取得檔案鎖的 worker 另外恢復未完成的 AI 分析並回收沒有引用的圖片"""
+    # 天氣快取在各 worker 的記憶體中，每個 worker 都需預先抓取（啟動時間隨機錯開）
+    weather_prefetcher.start()
+    if not acquire_process_lock(app.config['BACKGROUND_LOCK_FILE']):
+        return False
+    with app.app_context():
+        analysis_queue.resume_pending()
+    photo_storage.collect_unreferenced()
+    return True
+
+
+def create_app(config=None):
+    """建立 Flask 應用程式，config 可覆寫 default_config 的設定"""
+    app = Flask(__name__, static_folder=os.path.join(BASE_DIR, 'static'))
+    app.config.from_mapping(default_config())
+    if config:
+        app.config.from_mapping(config)
+
+    # 啟用 CORS
+    CORS(app, origins="*")
+
+    # 初始化資料庫與背景分析佇列
+    db.init_app(app)
+    with app.app_context():
+        configure_sqlite(db.engine, app.config['SQLITE_JOURNAL_MODE'],
+                         app.config['SQLITE_BUSY_TIMEOUT_MS'], app.config['SQLITE_SYNCHRONOUS'])
+    analysis_queue.init_app(app)
+    photo_storage.init_app(app)
+    weather_prefetcher.init_app(app)
+
+    # 請求計時（/api/metrics）與 JSON 回應壓縮
+    metrics.init_app(app)
+    compression.init_app(app)
+
+    # 註冊藍圖
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(clothing_bp, url_prefix='/api')
+    app.register_blueprint(recommendations_bp, url_prefix='/api')
+    app.register_blueprint(backup_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+    register_routes(app)
+
+    if app.config['INIT_DATABASE']:
+        init_database(app)
+    if app.config['BACKGROUND_TASKS']:
+        start_background_tasks(app)
+
+    return app
+
+
+def register_routes(app):
+    # 上傳的圖片（內容定址的分片路徑，或舊版的平面檔名）
+    @app.route('/uploads/<path:filename>')
+    def uploaded_file(filename):
+        return photo_storage.send(filename)
+
+    # 前端檔案於啟動時建立索引並預先壓縮
+    static_manifest = StaticManifest(app.static_folder, app.config['STATIC_CACHE_FOLDER']) \
+        if app.static_folder else None
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if static_manifest is None:
+            return "Static folder not configured", 404
+
+        asset = static_manifest.get(path) if path != "" else None
+        if asset is None:
+            asset = static_manifest.get('index.html')
+            if asset is None:
+                return "index.html not found", 404
+        return static_manifest.send(asset)
+
+    # 健康檢查端點
+    @app.route('/api/health')
+    def health_check():
+        return {'status': 'healthy', 'message': 'AI Wardrobe Backend is running'}
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # 開發模式；正式環境請使用 wsgi.py 搭配多 worker 的 WSGI 伺服器
+    app = create_app()
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 5000)), debug=env_flag('FLASK_DEBUG', True))
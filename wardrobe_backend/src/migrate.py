@@ -0,0 +1,28 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import create_app
+from src.models.wardrobe import db
+from src.models.migrations import MIGRATIONS, current_version, upgrade_database
+
+app = create_app({'INIT_DATABASE': False, 'BACKGROUND_TASKS': False})
+
+def migrate():
+    with app.app_context():
+        try:
+            db.create_all()
+            applied = upgrade_database()
+            if not applied:
+                print("資料庫已是最新版本")
+            
+            version = current_version()
+            for migration_version, name, _ in MIGRATIONS:
+                status = "✅" if migration_version <= version else "⏳"
+                print(f"{status} {migration_version:03d}_{name}")
+            
+        except Exception as e:
+            print(f"❌ 遷移失敗: {e}")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,20 @@
+from src.models.wardrobe import db
+import json
+
+class AnalysisCacheEntry(db.Model):
+    __tablename__ = 'analysis_cache'
+    
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256(模型:提示詞版本:正規化圖片)
+    result = db.Column(db.Text, nullable=False)  # JSON string
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    last_used_at = db.Column(db.DateTime, default=db.func.current_timestamp(), index=True)
+    
+    def to_dict(self):
+        return {
+            'cache_key': self.cache_key,
+            'result': json.loads(self.result),
+            'hits': self.hits,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None
+        }
@@ -0,0 +1,193 @@
+import json
+from datetime import datetime
+from src.models.wardrobe import (db, ClothingItem, FavoriteOutfit, FavoriteOutfitItem, WardrobeVersion,
+                                 WardrobeSummary)
+from src.models.analysis_cache import AnalysisCacheEntry
+from src.models.weather import CityCoordinate
+from src.models.photo import StoredPhoto
+from src.services.color_engine import get_color_engine
+from src.services.outfit_encoding import season_mask, occasion_mask
+
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def _existing_columns(table_name):
+    return {column['name'] for column in db.inspect(db.session.connection()).get_columns(table_name)}
+
+
+def add_column_if_missing(model, column_name):
+    """依模型定義為既有表格新增欄位，返回是否有新增"""
+    table = model.__table__
+    if column_name in _existing_columns(table.name):
+        return False
+
+    column = table.c[column_name]
+    column_type = column.type.compile(dialect=db.engine.dialect)
+    default = f" NOT NULL DEFAULT {column.server_default.arg}" if column.server_default is not None else ''
+    db.session.execute(db.text(f"ALTER TABLE {table.name} ADD COLUMN {column_name} {column_type}{default}"))
+    return True
+
+
+def drop_column_if_present(table_name, column_name):
+    """刪除模型已不再定義的欄位，返回是否有刪除"""
+    if column_name not in _existing_columns(table_name):
+        return False
+    db.session.execute(db.text(f"ALTER TABLE {table_name} DROP COLUMN {column_name}"))
+    return True
+
+
+def create_index_if_missing(model, index_name):
+    """依模型定義建立索引（已存在則略過）"""
+    index = next(index for index in model.__table__.indexes if index.name == index_name)
+    index.create(bind=db.session.connection(), checkfirst=True)
+
+
+def _clothing_attribute_columns():
+    """ClothingItem 反正規化篩選欄位"""
+    added = [add_column_if_missing(ClothingItem, column)
+             for column in ('season_mask', 'occasion_mask', 'color_family')]
+    create_index_if_missing(ClothingItem, 'ix_clothing_items_user_style')
+    create_index_if_missing(ClothingItem, 'ix_clothing_items_user_color_family')
+
+    # 回填舊資料（以表格直接讀寫，模型含有之後的遷移才新增的欄位）
+    if any(added):
+        table = ClothingItem.__table__
+        color_engine = get_color_engine()
+        rows = db.session.execute(db.select(table.c.id, table.c.primary_color, table.c.suitable_seasons,
+                                            table.c.suitable_occasions)).all()
+        for item_id, primary_color, suitable_seasons, suitable_occasions in rows:
+            db.session.execute(db.update(table).where(table.c.id == item_id).values(
+                season_mask=season_mask(suitable_seasons),
+                occasion_mask=occasion_mask(suitable_occasions),
+                color_family=color_engine.family_id(primary_color or '')
+            ))
+
+
+def _user_query_indexes():
+    """常用查詢的 user_id 複合索引"""
+    create_index_if_missing(ClothingItem, 'ix_clothing_items_user_category')
+    create_index_if_missing(ClothingItem, 'ix_clothing_items_user_created_at')
+    create_index_if_missing(FavoriteOutfit, 'ix_favorite_outfits_user_created_at')
+
+
+def _clothing_keyset_index():
+    """衣物列表分頁用的 (user_id, id) 索引"""
+    create_index_if_missing(ClothingItem, 'ix_clothing_items_user_id')
+
+
+def _clothing_analysis_status():
+    """背景 AI 分析狀態欄位"""
+    add_column_if_missing(ClothingItem, 'analysis_status')
+    add_column_if_missing(ClothingItem, 'user_fields')
+
+
+def _analysis_cache_table():
+    """AI 分析結果快取表"""
+    AnalysisCacheEntry.__table__.create(bind=db.session.connection(), checkfirst=True)
+
+
+def _clothing_photo_variants():
+    """衣物縮圖網址欄位"""
+    add_column_if_missing(ClothingItem, 'photo_variants')
+
+
+def _city_coordinates_table():
+    """城市座標快取表"""
+    CityCoordinate.__table__.create(bind=db.session.connection(), checkfirst=True)
+
+
+def _wardrobe_versions_table():
+    """衣櫥版本表（推薦快取失效用）"""
+    WardrobeVersion.__table__.create(bind=db.session.connection(), checkfirst=True)
+
+
+def _wardrobe_summaries_table():
+    """衣櫃統計快照表與最常穿衣物索引"""
+    WardrobeSummary.__table__.create(bind=db.session.connection(), checkfirst=True)
+    create_index_if_missing(ClothingItem, 'ix_clothing_items_user_usage')
+
+
+def _favorite_outfit_items_table():
+    """收藏穿搭改以衣物 ID 引用，並移除 outfit_data JSON 欄位"""
+    FavoriteOutfitItem.__table__.create(bind=db.session.connection(), checkfirst=True)
+    add_column_if_missing(FavoriteOutfit, 'explanation')
+    if 'outfit_data' not in _existing_columns(FavoriteOutfit.__tablename__):
+        return
+
+    # 轉換舊資料：只保留仍存在的衣物
+    existing_ids = {item_id for (item_id,) in db.session.query(ClothingItem.id)}
+    rows = db.session.execute(db.text("SELECT id, outfit_data FROM favorite_outfits")).all()
+    for favorite_id, outfit_data in rows:
+        try:
+            outfit = json.loads(outfit_data or '{}')
+        except ValueError:
+            outfit = {}
+        item_ids = [item.get('id') for item in outfit.get('items', []) if isinstance(item, dict)]
+        for position, item_id in enumerate(item_id for item_id in item_ids if item_id in existing_ids):
+            db.session.add(FavoriteOutfitItem(favorite_id=favorite_id, position=position, item_id=item_id))
+        db.session.execute(db.update(FavoriteOutfit).where(FavoriteOutfit.id == favorite_id)
+                           .values(explanation=outfit.get('explanation')))
+    db.session.flush()
+
+    drop_column_if_present(FavoriteOutfit.__tablename__, 'outfit_data')
+
+
+def _stored_photos_table():
+    """內容定址圖片儲存的引用計數表（既有的 uploads/ 平面檔案維持原路徑）"""
+    StoredPhoto.__table__.create(bind=db.session.connection(), checkfirst=True)
+
+
+def _stored_photos_source_digest():
+    """儲存名稱改為處理後原圖的雜湊，上傳內容的雜湊另存以略過相同上傳的處理"""
+    add_column_if_missing(StoredPhoto, 'source_digest')
+    create_index_if_missing(StoredPhoto, 'ix_stored_photos_source_digest')
+
+
+# 版本號只能遞增，已發佈的遷移不可修改
+MIGRATIONS = [
+    (1, 'clothing_attribute_columns', _clothing_attribute_columns),
+    (2, 'user_query_indexes', _user_query_indexes),
+    (3, 'clothing_keyset_index', _clothing_keyset_index),
+    (4, 'clothing_analysis_status', _clothing_analysis_status),
+    (5, 'analysis_cache_table', _analysis_cache_table),
+    (6, 'clothing_photo_variants', _clothing_photo_variants),
+    (7, 'city_coordinates_table', _city_coordinates_table),
+    (8, 'wardrobe_versions_table', _wardrobe_versions_table),
+    (9, 'wardrobe_summaries_table', _wardrobe_summaries_table),
+    (10, 'favorite_outfit_items_table', _favorite_outfit_items_table),
+    (11, 'stored_photos_table', _stored_photos_table),
+    (12, 'stored_photos_source_digest', _stored_photos_source_digest),
+]
+
+
+def current_version():
+    """返回資料庫目前的結構版本"""
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+
+def upgrade_database():
+    """依序套用尚未執行的遷移，每個遷移各自一個交易，返回套用的版本列表"""
+    SchemaMigration.__table__.create(bind=db.engine, checkfirst=True)
+
+    applied = []
+    version = current_version()
+    for migration_version, name, upgrade in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        try:
+            upgrade()
+            db.session.add(SchemaMigration(version=migration_version, name=name))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        print(f"套用資料庫遷移 {migration_version:03d}_{name}")
+        applied.append(migration_version)
+
+    return applied
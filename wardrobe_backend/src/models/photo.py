@@ -0,0 +1,18 @@
+import json
+from src.models.wardrobe import db
+
+class StoredPhoto(db.Model):
+    """以內容雜湊儲存的圖片（原圖與衍生檔案），refcount 為引用此圖片的衣物數"""
+    __tablename__ = 'stored_photos'
+
+    digest = db.Column(db.String(64), primary_key=True)  # 儲存的原圖（轉正並移除中繼資料後）的 SHA-256
+    source_digest = db.Column(db.String(64), nullable=True, index=True)  # 上傳內容的 SHA-256
+    extension = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    analysis_name = db.Column(db.String(255), nullable=True)  # 分析用圖片的儲存名稱
+    variants = db.Column(db.Text, nullable=True)  # JSON string: {縮圖名稱: 儲存名稱}
+    refcount = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def variant_names(self):
+        return json.loads(self.variants) if self.variants else {}
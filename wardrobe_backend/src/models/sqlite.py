@@ -0,0 +1,31 @@
+from sqlalchemy import event
+
+# 允許設定的 PRAGMA 值（直接組入 SQL，需限制範圍）
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def configure_sqlite(engine, journal_mode='WAL', busy_timeout_ms=5000, synchronous='NORMAL'):
+    """為每個新的 SQLite 連線設定 journal mode、busy timeout 與 synchronous
+
+    WAL 模式下讀取不會被寫入阻擋；synchronous=NORMAL 在 WAL 下仍可保證資料庫一致性。
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    journal_mode = journal_mode.upper()
+    synchronous = synchronous.upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"無效的 SQLite journal mode: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"無效的 SQLite synchronous 設定: {synchronous}")
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+            cursor.execute(f"PRAGMA synchronous = {synchronous}")
+        finally:
+            cursor.close()
@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from src.services.color_engine import get_color_engine
+from src.services.outfit_encoding import season_mask, occasion_mask
 import json
 
 db = SQLAlchemy()
@@ -6,6 +8,11 @@ db = SQLAlchemy()
 class ClothingItem(db.Model):
     __tablename__ = 'clothing_items'
     
+    # to_dict 輸出的欄位，可用於欄位投影
+    SERIALIZED_FIELDS = ('id', 'user_id', 'name', 'category', 'primary_color', 'style', 'material',
+                         'suitable_seasons', 'suitable_occasions', 'photo_path', 'usage_count', 'created_at',
+                         'analysis_status', 'photo_variants')
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False, default=1)  # 移除外鍵約束，暫時簡化
     name = db.Column(db.String(100), nullable=False)
@@ -16,10 +23,38 @@ class ClothingItem(db.Model):
     suitable_seasons = db.Column(db.Text, nullable=True)  # JSON string
     suitable_occasions = db.Column(db.Text, nullable=True)  # JSON string
     photo_path = db.Column(db.String(255), nullable=True)
+    photo_variants = db.Column(db.Text, nullable=True)  # JSON string: {縮圖名稱: URL}
     usage_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
-    def to_dict(self):
+    # 反正規化篩選欄位，於新增/更新時由 update_attribute_columns 計算
+    season_mask = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    occasion_mask = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    color_family = db.Column(db.Integer, nullable=True)
+    
+    # 背景 AI 分析狀態（pending/processing/done/failed，未分析為空）與用戶手動填寫的欄位
+    analysis_status = db.Column(db.String(20), nullable=True)
+    user_fields = db.Column(db.Text, nullable=True)  # JSON string
+    
+    # 新增索引時需同步加入 migrations.py
+    __table_args__ = (
+        db.Index('ix_clothing_items_user_id', 'user_id', 'id'),
+        db.Index('ix_clothing_items_user_category', 'user_id', 'category'),
+        db.Index('ix_clothing_items_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_clothing_items_user_style', 'user_id', 'style'),
+        db.Index('ix_clothing_items_user_color_family', 'user_id', 'color_family'),
+        db.Index('ix_clothing_items_user_usage', 'user_id', 'usage_count'),
+    )
+    
+    def update_attribute_columns(self):
+        """根據季節、場合與顏色更新篩選用的位元遮罩與顏色系別"""
+        self.season_mask = season_mask(self.suitable_seasons)
+        self.occasion_mask = occasion_mask(self.suitable_occasions)
+        self.color_family = get_color_engine().family_id(self.primary_color or '')
+    
+    def to_dict(self, fields=None):
+        if fields is not None:
+            return {field: self._serialize_field(field) for field in fields}
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -31,24 +66,93 @@ class ClothingItem(db.Model):
             'suitable_seasons': json.loads(self.suitable_seasons) if self.suitable_seasons else [],
             'suitable_occasions': json.loads(self.suitable_occasions) if self.suitable_occasions else [],
             'photo_path': self.photo_path,
+            'photo_variants': json.loads(self.photo_variants) if self.photo_variants else {},
             'usage_count': self.usage_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'analysis_status': self.analysis_status
         }
+    
+    def provided_fields(self):
+        """返回新增時由用戶手動填寫的欄位（AI 分析不會覆寫）"""
+        return json.loads(self.user_fields) if self.user_fields else []
+    
+    def _serialize_field(self, field):
+        """序列化單一欄位（供欄位投影使用）"""
+        value = getattr(self, field)
+        if field in ('suitable_seasons', 'suitable_occasions'):
+            return json.loads(value) if value else []
+        if field == 'photo_variants':
+            return json.loads(value) if value else {}
+        if field == 'created_at':
+            return value.isoformat() if value else None
+        return value
 
 class FavoriteOutfit(db.Model):
     __tablename__ = 'favorite_outfits'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False, default=1)
-    outfit_data = db.Column(db.Text, nullable=False)  # JSON string
+    explanation = db.Column(db.Text, nullable=True)
     score = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
-    def to_dict(self):
+    __table_args__ = (
+        db.Index('ix_favorite_outfits_user_created_at', 'user_id', 'created_at'),
+    )
+    
+    def to_dict(self, items=None):
+        """輸出收藏穿搭，items 為依序排列的衣物字典（由 favorite_outfit_items 載入）"""
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'outfit_data': self.outfit_data,
+            'outfit_data': {
+                'items': items or [],
+                'explanation': self.explanation,
+                'score': self.score
+            },
             'score': self.score,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+class FavoriteOutfitItem(db.Model):
+    __tablename__ = 'favorite_outfit_items'
+    
+    # 收藏穿搭引用的衣物（不複製衣物資料，列出時即時載入）
+    favorite_id = db.Column(db.Integer, primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_favorite_outfit_items_item_id', 'item_id'),
+    )
+
+class WardrobeVersion(db.Model):
+    __tablename__ = 'wardrobe_versions'
+    
+    # 用戶衣櫥每次變動時遞增，作為推薦快取的失效依據
+    user_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def current(cls, user_id):
+        """返回用戶目前的衣櫥版本"""
+        version = db.session.query(cls.version).filter_by(user_id=int(user_id)).scalar()
+        return version or 0
+    
+    @classmethod
+    def bump(cls, user_id):
+        """遞增用戶的衣櫥版本（與衣物變更在同一交易中提交）"""
+        user_id = int(user_id)
+        updated = cls.query.filter_by(user_id=user_id).update({cls.version: cls.version + 1},
+                                                              synchronize_session=False)
+        if not updated:
+            db.session.add(cls(user_id=user_id, version=1))
+
+class WardrobeSummary(db.Model):
+    __tablename__ = 'wardrobe_summaries'
+    
+    # 衣櫃統計快照，衣櫥版本不同時重新彙總
+    user_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON string
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
@@ -0,0 +1,17 @@
+from src.models.wardrobe import db
+
+class CityCoordinate(db.Model):
+    __tablename__ = 'city_coordinates'
+    
+    query = db.Column(db.String(100), primary_key=True)  # 地理編碼查詢字串，例如 "Taipei,TW"
+    lat = db.Column(db.Float, nullable=False)
+    lon = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    
+    def to_dict(self):
+        return {
+            'query': self.query,
+            'lat': self.lat,
+            'lon': self.lon,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
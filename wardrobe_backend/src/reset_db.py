@@ -2,9 +2,12 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from main import app
+from src.main import create_app
 from src.models.wardrobe import db
 from src.models.user import User
+from src.models.migrations import upgrade_database
+
+app = create_app({'INIT_DATABASE': False, 'BACKGROUND_TASKS': False})
 
 def reset_database():
     with app.app_context():
@@ -17,6 +20,7 @@ def reset_database():
             
             # 重新建立所有表格
             db.create_all()
+            upgrade_database()
             print("重新建立所有表格")
             
             # 建立預設用戶
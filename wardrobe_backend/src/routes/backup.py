@@ -0,0 +1,49 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.services.wardrobe_archive import ArchiveError, iter_export_archive, import_archive
+from datetime import datetime
+import os
+
+backup_bp = Blueprint('backup', __name__)
+
+# 備份檔可能包含大量圖片，匯入時放寬請求大小上限
+IMPORT_MAX_CONTENT_LENGTH = int(os.getenv('IMPORT_MAX_UPLOAD_MB', 2048)) * 1024 * 1024
+
+@backup_bp.route('/export', methods=['GET'])
+def export_wardrobe():
+    """匯出用戶衣櫥（衣物、收藏穿搭與圖片）為串流 zip"""
+    try:
+        user_id = int(request.args.get('user_id', 1))
+        filename = f"wardrobe_{user_id}_{datetime.utcnow():%Y%m%d%H%M%S}.zip"
+        
+        return Response(
+            stream_with_context(iter_export_archive(user_id)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@backup_bp.route('/import', methods=['POST'])
+def import_wardrobe():
+    """匯入 /api/export 產生的備份至指定用戶"""
+    try:
+        request.max_content_length = IMPORT_MAX_CONTENT_LENGTH
+        user_id = int(request.form.get('user_id', 1))
+        
+        archive = request.files.get('archive')
+        if not archive:
+            return jsonify({'success': False, 'error': '沒有上傳備份檔'}), 400
+        
+        counts = import_archive(archive.stream, user_id)
+        
+        return jsonify({
+            'success': True,
+            'data': counts,
+            'message': f"已匯入 {counts['clothing_items']} 件衣物與 {counts['favorite_outfits']} 套收藏穿搭"
+        })
+        
+    except ArchiveError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
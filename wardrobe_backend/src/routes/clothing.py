@@ -1,148 +1,343 @@
 from flask import Blueprint, request, jsonify
-from src.models.wardrobe import db, ClothingItem, FavoriteOutfit
-from src.services.ai_service import AIService, OutfitScoringSystem
+from src.models.wardrobe import db, ClothingItem, FavoriteOutfitItem, WardrobeVersion
+from src.services.ai_service import AIService
+from src.services.image_pipeline import prepare_analysis_image
+from src.services.analysis_queue import (analysis_queue, ANALYSIS_PENDING, ANALYSIS_PROCESSING, ANALYSIS_DONE,
+                                         ANALYSIS_FAILED, ANALYSIS_TEXT_FIELDS, ANALYSIS_LIST_FIELDS)
+from src.services.bulk_import import BulkImportError, MAX_BULK_ITEMS, parse_metadata, iter_archive_images
+from src.services.photo_storage import photo_storage
+from src.services.metrics import metrics
+from sqlalchemy.orm import load_only
 import os
 import json
-import uuid
-from werkzeug.utils import secure_filename
-
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    print("Warning: PIL not available. Image processing will be disabled.")
+import logging
 
 clothing_bp = Blueprint('clothing', __name__)
+logger = logging.getLogger(__name__)
 
 # 配置
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+MAX_PAGE_SIZE = 200
+
+# 批次匯入：整個請求的大小上限與每個交易的筆數
+BULK_MAX_CONTENT_LENGTH = int(os.getenv('BULK_MAX_UPLOAD_MB', 512)) * 1024 * 1024
+BULK_COMMIT_SIZE = 100
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def ensure_upload_folder():
-    upload_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), UPLOAD_FOLDER)
-    if not os.path.exists(upload_path):
-        os.makedirs(upload_path)
-    return upload_path
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower()
+
+def parse_fields(fields_param):
+    """解析 fields 參數，返回欄位列表（未指定時返回 None）"""
+    if not fields_param:
+        return None
+    
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()]
+    invalid = [field for field in fields if field not in ClothingItem.SERIALIZED_FIELDS]
+    if invalid:
+        raise ValueError(f"無效的欄位名稱: {', '.join(invalid)}")
+    
+    # 分頁游標需要 id
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
 
 @clothing_bp.route('/clothing', methods=['GET'])
 def get_clothing_items():
-    """獲取所有衣物"""
+    """獲取衣物（可選 limit/after 分頁與 fields 欄位投影）"""
     try:
-        print("=== 開始獲取衣物資料 ===")  # 調試用
         user_id = request.args.get('user_id', 1)
-        print(f"用戶ID: {user_id}")
+        limit = request.args.get('limit', type=int)
+        after = request.args.get('after', type=int)
+        
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        query = ClothingItem.query.filter(ClothingItem.user_id == user_id)
+        if fields is not None:
+            query = query.options(load_only(*[getattr(ClothingItem, field) for field in fields]))
         
-        # 檢查資料庫連接
-        items = ClothingItem.query.filter_by(user_id=user_id).all()
-        print(f"找到 {len(items)} 件衣物")
+        # 未指定 limit 時維持回傳整個衣櫥
+        if limit is None:
+            items = query.all()
+            logger.debug("用戶 %s 共 %d 件衣物", user_id, len(items))
+            return jsonify({
+                'success': True,
+                'data': [item.to_dict(fields) for item in items]
+            })
         
-        result = {
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if after is not None:
+            query = query.filter(ClothingItem.id > after)
+        items = query.order_by(ClothingItem.id).limit(limit + 1).all()
+        
+        has_more = len(items) > limit
+        items = items[:limit]
+        logger.debug("用戶 %s 分頁 after=%s 取得 %d 件衣物", user_id, after, len(items))
+        
+        return jsonify({
             'success': True,
-            'data': [item.to_dict() for item in items]
-        }
-        print(f"回傳資料: {result}")
-        return jsonify(result)
+            'data': [item.to_dict(fields) for item in items],
+            'next_cursor': items[-1].id if has_more else None
+        })
         
     except Exception as e:
-        print(f"=== 錯誤發生 ===")
-        print(f"錯誤類型: {type(e).__name__}")
-        print(f"錯誤訊息: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("獲取衣物資料失敗")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @clothing_bp.route('/clothing', methods=['POST'])
 def add_clothing_item():
-    """新增衣物"""
+    """新增衣物（有圖片時於背景進行 AI 分析）"""
+    staged = None
     try:
         user_id = request.form.get('user_id', 1)
         
-        # 處理圖片上傳
+        # 處理圖片上傳（以內容雜湊儲存，相同圖片共用檔案）
         photo_path = None
+        photo_variants = {}
         if 'photo' in request.files:
             file = request.files['photo']
             if file and file.filename and allowed_file(file.filename):
-                upload_path = ensure_upload_folder()
-                filename = str(uuid.uuid4()) + '.' + file.filename.rsplit('.', 1)[1].lower()
-                file_path = os.path.join(upload_path, filename)
-                file.save(file_path)
-                photo_path = f'/uploads/{filename}'
+                with metrics.stage('upload.save'):
+                    staged = photo_storage.stage(file.stream, file_extension(file.filename))
                 
-                # 如果有AI服務，進行圖片分析
-                ai_api_key = os.getenv('GEMINI_API_KEY')
-                if ai_api_key:
-                    try:
-                        ai_service = AIService(ai_api_key)
-                        ai_result = ai_service.analyze_clothing_image(file_path)
-                        
-                        # 使用AI分析結果
-                        item = ClothingItem(
-                            user_id=user_id,
-                            name=request.form.get('name', ai_result.get('name', '新衣物')),
-                            category=request.form.get('category', ai_result.get('category', '其他')),
-                            primary_color=request.form.get('primary_color', ai_result.get('primary_color', '')),
-                            style=request.form.get('style', ai_result.get('style', '')),
-                            material=request.form.get('material', ai_result.get('material', '')),
-                            suitable_seasons=json.dumps(request.form.getlist("suitable_seasons") or ai_result.get("suitable_seasons", [])),
-                            suitable_occasions=json.dumps(request.form.getlist("suitable_occasions") or ai_result.get("suitable_occasions", [])),
-                            photo_path=photo_path
-                        )
-                    except Exception as ai_error:
-                        print(f"AI分析失敗: {ai_error}")
-                        # 使用手動輸入的資料
-                        item = ClothingItem(
-                            user_id=user_id,
-                            name=request.form.get('name', '新衣物'),
-                            category=request.form.get('category', '其他'),
-                            primary_color=request.form.get('primary_color', ''),
-                            style=request.form.get('style', ''),
-                            material=request.form.get('material', ''),
-                            suitable_seasons=json.dumps(request.form.getlist('suitable_seasons')),
-                            suitable_occasions=json.dumps(request.form.getlist('suitable_occasions')),
-                            photo_path=photo_path
-                        )
-                else:
-                    # 沒有AI服務，使用手動輸入
-                    item = ClothingItem(
-                        user_id=user_id,
-                        name=request.form.get('name', '新衣物'),
-                        category=request.form.get('category', '其他'),
-                        primary_color=request.form.get('primary_color', ''),
-                        style=request.form.get('style', ''),
-                        material=request.form.get('material', ''),
-                        suitable_seasons=json.dumps(request.form.getlist('suitable_seasons')),
-                        suitable_occasions=json.dumps(request.form.getlist('suitable_occasions')),
-                        photo_path=photo_path
-                    )
-        else:
-            # 沒有圖片，使用手動輸入
-            item = ClothingItem(
-                user_id=user_id,
-                name=request.form.get('name', '新衣物'),
-                category=request.form.get('category', '其他'),
-                primary_color=request.form.get('primary_color', ''),
-                style=request.form.get('style', ''),
-                material=request.form.get('material', ''),
-                suitable_seasons=json.dumps(request.form.getlist('suitable_seasons')),
-                suitable_occasions=json.dumps(request.form.getlist('suitable_occasions')),
-                photo_path=photo_path
-            )
-        
-        db.session.add(item)
-        db.session.commit()
+                # 轉正、移除中繼資料並產生分析用圖片與縮圖（已儲存過的圖片略過），以處理後的內容命名
+                with metrics.stage('upload.ingest'):
+                    photo_storage.prepare(staged)
+                photo_path = staged.photo_url
+                photo_variants = staged.variant_urls
+        
+        # 先以手動輸入的資料建立衣物
+        item = ClothingItem(
+            user_id=user_id,
+            name=request.form.get('name', '新衣物'),
+            category=request.form.get('category', '其他'),
+            primary_color=request.form.get('primary_color', ''),
+            style=request.form.get('style', ''),
+            material=request.form.get('material', ''),
+            suitable_seasons=json.dumps(request.form.getlist('suitable_seasons')),
+            suitable_occasions=json.dumps(request.form.getlist('suitable_occasions')),
+            photo_path=photo_path,
+            photo_variants=json.dumps(photo_variants) if photo_variants else None
+        )
+        
+        # 如果有AI服務，標記為待分析並記錄用戶已填寫的欄位
+        analyze = staged is not None and bool(os.getenv('GEMINI_API_KEY'))
+        if analyze:
+            provided_fields = [field for field in ANALYSIS_TEXT_FIELDS if field in request.form]
+            provided_fields += [field for field in ANALYSIS_LIST_FIELDS if request.form.getlist(field)]
+            item.analysis_status = ANALYSIS_PENDING
+            item.user_fields = json.dumps(provided_fields)
+        
+        item.update_attribute_columns()
+        with metrics.stage('upload.db_commit'):
+            db.session.add(item)
+            if staged:
+                photo_storage.acquire(staged)
+            WardrobeVersion.bump(user_id)
+            db.session.commit()
+        
+        if staged:
+            analysis_path = photo_storage.publish(staged)
+            staged = None
+            if analyze:
+                analysis_queue.submit(item.id, analysis_path)
         
         return jsonify({
             'success': True,
             'data': item.to_dict(),
-            'message': '衣物新增成功'
+            'message': '衣物新增成功，AI分析進行中' if analyze else '衣物新增成功'
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        if staged:
+            photo_storage.discard(staged)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@clothing_bp.route('/clothing/bulk', methods=['POST'])
+def bulk_import_clothing():
+    """批次匯入衣物：多張圖片（photos）或 zip（archive），可附 CSV/JSON 中繼資料（metadata）"""
+    staged_photos = []
+    try:
+        # 批次上傳允許較大的請求
+        request.max_content_length = BULK_MAX_CONTENT_LENGTH
+        user_id = request.form.get('user_id', 1)
+        
+        # 中繼資料可為上傳的檔案或表單欄位，以原始檔名對應圖片
+        metadata_file = request.files.get('metadata')
+        if metadata_file:
+            metadata_text = metadata_file.read().decode('utf-8-sig')
+            format_hint = metadata_file.filename.rsplit('.', 1)[-1].lower() if metadata_file.filename else ''
+        else:
+            metadata_text, format_hint = request.form.get('metadata', ''), ''
+        metadata, rows_without_photo = parse_metadata(metadata_text, format_hint)
+        
+        results = []
+        photos = []
+        
+        def add_photo(filename, source, error):
+            if len(results) >= MAX_BULK_ITEMS:
+                raise BulkImportError(f'一次最多匯入 {MAX_BULK_ITEMS} 件衣物')
+            results.append({'filename': filename, 'success': False})
+            if error:
+                results[-1]['error'] = error
+                return
+            staged = photo_storage.stage(source, file_extension(filename))
+            staged_photos.append(staged)
+            photos.append((len(results) - 1, filename, staged))
+        
+        for file in request.files.getlist('photos'):
+            if file and file.filename:
+                filename = os.path.basename(file.filename)
+                add_photo(filename, file.stream, None if allowed_file(filename) else '不支援的檔案格式')
+        if 'archive' in request.files:
+            for filename, source, error in iter_archive_images(request.files['archive'].stream, allowed_file):
+                add_photo(filename, source, error)
+        
+        if len(results) + len(rows_without_photo) > MAX_BULK_ITEMS:
+            raise BulkImportError(f'一次最多匯入 {MAX_BULK_ITEMS} 件衣物')
+        if not results and not rows_without_photo:
+            return jsonify({'success': False, 'error': '沒有可匯入的衣物'}), 400
+        
+        # 並行處理圖片（轉正、分析用圖片與縮圖），已儲存過的圖片略過
+        with metrics.stage('bulk.ingest'):
+            photo_storage.prepare_all(staged_photos)
+        
+        analyze = bool(os.getenv('GEMINI_API_KEY'))
+        entries = []
+        for index, filename, staged in photos:
+            entries.append((index, build_bulk_item(user_id, metadata.get(filename, {}), staged, analyze), staged))
+        for values in rows_without_photo:
+            results.append({'filename': None, 'success': False})
+            entries.append((len(results) - 1, build_bulk_item(user_id, values, None, False), None))
+        
+        # 分批寫入，每批一個交易；提交後才排入 AI 分析
+        # 某批失敗時只有該批標記為失敗，已提交的衣物仍列在結果中，用戶重試時不會重複建立
+        for start in range(0, len(entries), BULK_COMMIT_SIZE):
+            batch = entries[start:start + BULK_COMMIT_SIZE]
+            try:
+                db.session.add_all(item for _, item, _ in batch)
+                for _, _, staged in batch:
+                    if staged:
+                        photo_storage.acquire(staged)
+                WardrobeVersion.bump(user_id)
+                db.session.flush()
+                created = [(index, item.id, item.analysis_status, staged) for index, item, staged in batch]
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"批次匯入寫入失敗: {e}")
+                for index, _, staged in batch:
+                    results[index]['error'] = f'寫入失敗: {e}'
+                    if staged:
+                        photo_storage.discard(staged)
+                        staged_photos.remove(staged)
+                continue
+            
+            for index, item_id, analysis_status, staged in created:
+                results[index].update(success=True, item_id=item_id, analysis_status=analysis_status)
+                if staged:
+                    staged_photos.remove(staged)
+                    try:
+                        analysis_path = photo_storage.publish(staged)
+                    except Exception as e:
+                        # 衣物已建立，只有圖片未能儲存
+                        logger.error(f"批次匯入圖片儲存失敗 for item {item_id}: {e}")
+                        results[index]['error'] = f'圖片儲存失敗: {e}'
+                        continue
+                    if analyze:
+                        analysis_queue.submit(item_id, analysis_path)
+        
+        created_count = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'data': {
+                'created': created_count,
+                'failed': len(results) - created_count,
+                'items': results
+            },
+            'message': f'已匯入 {created_count} 件衣物' + ('，AI分析進行中' if analyze and photos else '')
         })
         
+    except BulkImportError as e:
+        db.session.rollback()
+        for staged in staged_photos:
+            photo_storage.discard(staged)
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
+        # 已提交的批次已移入儲存，只清理未提交的暫存圖片
+        for staged in staged_photos:
+            photo_storage.discard(staged)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def build_bulk_item(user_id, values, staged, analyze):
+    """以中繼資料建立批次匯入的衣物（未填寫的欄位由 AI 分析補上）"""
+    variants = staged.variant_urls if staged else {}
+    item = ClothingItem(
+        user_id=user_id,
+        name=values.get('name', '新衣物'),
+        category=values.get('category', '其他'),
+        primary_color=values.get('primary_color', ''),
+        style=values.get('style', ''),
+        material=values.get('material', ''),
+        suitable_seasons=json.dumps(values.get('suitable_seasons', [])),
+        suitable_occasions=json.dumps(values.get('suitable_occasions', [])),
+        photo_path=staged.photo_url if staged else None,
+        photo_variants=json.dumps(variants) if variants else None
+    )
+    if analyze and staged:
+        item.analysis_status = ANALYSIS_PENDING
+        item.user_fields = json.dumps([field for field in (*ANALYSIS_TEXT_FIELDS, *ANALYSIS_LIST_FIELDS) if field in values])
+    item.update_attribute_columns()
+    return item
+
+@clothing_bp.route('/clothing/analysis', methods=['GET'])
+def get_clothing_analysis_progress():
+    """查詢多件衣物的 AI 分析狀態（ids 以逗號分隔），用於批次匯入的進度"""
+    try:
+        try:
+            item_ids = [int(item_id) for item_id in request.args.get('ids', '').split(',') if item_id.strip()]
+        except ValueError:
+            return jsonify({'success': False, 'error': '無效的衣物 ID'}), 400
+        
+        rows = db.session.query(ClothingItem.id, ClothingItem.analysis_status) \
+            .filter(ClothingItem.id.in_(item_ids)).all() if item_ids else []
+        counts = {}
+        for _, status in rows:
+            counts[status or ANALYSIS_DONE] = counts.get(status or ANALYSIS_DONE, 0) + 1
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'total': len(rows),
+                'counts': counts,
+                'items': [{'item_id': item_id, 'status': status} for item_id, status in rows]
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@clothing_bp.route('/clothing/<int:item_id>/analysis', methods=['GET'])
+def get_clothing_analysis(item_id):
+    """查詢衣物的 AI 分析狀態"""
+    try:
+        item = ClothingItem.query.get_or_404(item_id)
+        
+        result = {'item_id': item.id, 'status': item.analysis_status}
+        if item.analysis_status in (ANALYSIS_DONE, ANALYSIS_FAILED):
+            result['item'] = item.to_dict()
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+        
+    except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @clothing_bp.route('/clothing/<int:item_id>', methods=['PUT'])
@@ -167,6 +362,13 @@ def update_clothing_item(item_id):
         if data.get('suitable_occasions'):
             item.suitable_occasions = json.dumps(data['suitable_occasions'])
         
+        # 分析進行中時，用戶修改的欄位不再由 AI 結果覆寫
+        if item.analysis_status in (ANALYSIS_PENDING, ANALYSIS_PROCESSING):
+            edited_fields = [field for field in (*ANALYSIS_TEXT_FIELDS, *ANALYSIS_LIST_FIELDS) if data.get(field)]
+            item.user_fields = json.dumps(list(dict.fromkeys(item.provided_fields() + edited_fields)))
+        
+        item.update_attribute_columns()
+        WardrobeVersion.bump(item.user_id)
         db.session.commit()
         
         return jsonify({
@@ -185,14 +387,15 @@ def delete_clothing_item(item_id):
     try:
         item = ClothingItem.query.get_or_404(item_id)
         
-        # 刪除圖片檔案
-        if item.photo_path:
-            file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), item.photo_path.lstrip('/'))
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        # 減少圖片引用數，提交後由背景回收沒有引用的圖片檔案與縮圖
+        released = photo_storage.release(item.photo_path)
         
+        # 從收藏穿搭中移除此衣物（item_id 索引）
+        FavoriteOutfitItem.query.filter_by(item_id=item.id).delete(synchronize_session=False)
         db.session.delete(item)
+        WardrobeVersion.bump(item.user_id)
         db.session.commit()
+        photo_storage.collect_later([released])
         
         return jsonify({
             'success': True,
@@ -205,7 +408,7 @@ def delete_clothing_item(item_id):
 
 @clothing_bp.route('/clothing/analyze', methods=['POST'])
 def analyze_clothing():
-    """AI 分析衣物圖片"""
+    """AI 分析衣物圖片（圖片不寫入儲存，分析後即刪除）"""
     try:
         if 'photo' not in request.files:
             return jsonify({'success': False, 'error': '沒有上傳圖片'}), 400
@@ -214,22 +417,21 @@ def analyze_clothing():
         if not file or not file.filename or not allowed_file(file.filename):
             return jsonify({'success': False, 'error': '無效的圖片檔案'}), 400
         
-        # 儲存臨時檔案
-        upload_path = ensure_upload_folder()
-        filename = str(uuid.uuid4()) + '.' + file.filename.rsplit('.', 1)[1].lower()
-        file_path = os.path.join(upload_path, filename)
-        file.save(file_path)
-        
-        # AI 分析
         ai_api_key = os.getenv('GEMINI_API_KEY')
         if not ai_api_key:
             return jsonify({'success': False, 'error': 'AI服務未配置'}), 500
         
-        ai_service = AIService(ai_api_key)
-        result = ai_service.analyze_clothing_image(file_path)
-        
-        # 清理臨時檔案
-        os.remove(file_path)
+        # 圖片只存於暫存目錄，分析完成或失敗時都會刪除
+        with photo_storage.scratch_folder() as folder:
+            file_path = os.path.join(folder, 'photo.' + file_extension(file.filename))
+            with metrics.stage('analyze.save'):
+                file.save(file_path)
+            
+            ai_service = AIService(ai_api_key)
+            with metrics.stage('analyze.prepare_image'):
+                analysis_path = prepare_analysis_image(file_path) or file_path
+            with metrics.stage('analyze.ai'):
+                result = ai_service.analyze_clothing_image(analysis_path)
         
         return jsonify({
             'success': True,
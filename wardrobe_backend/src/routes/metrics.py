@@ -0,0 +1,46 @@
+from flask import Blueprint, Response
+from src.services.metrics import metrics
+from src.services.analysis_cache import analysis_cache
+from src.services.weather_cache import weather_cache
+from src.services.recommendation_cache import recommendation_cache
+from src.services.outfit_analysis import outfit_analyzer
+
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def cache_samples():
+    """各快取的命中統計，返回 Metrics.render 的 extra_samples"""
+    caches = {
+        'analysis': analysis_cache.stats(),
+        'weather': weather_cache.stats(),
+        'recommendation': recommendation_cache.stats(),
+        'outfit_analysis': outfit_analyzer.stats(),
+    }
+    series = [
+        ('cache_hits_total', 'counter', '快取命中次數', 'hits'),
+        ('cache_stale_hits_total', 'counter', '快取過期但仍回傳舊資料的次數', 'stale_hits'),
+        ('cache_misses_total', 'counter', '快取未命中次數', 'misses'),
+        ('cache_entries', 'gauge', '快取目前的項目數', 'entries'),
+        ('cache_max_entries', 'gauge', '快取項目數上限', 'max_entries'),
+    ]
+    samples = []
+    for name, type_name, help_text, field in series:
+        samples += [(name, type_name, help_text, {'cache': cache}, stats[field])
+                    for cache, stats in caches.items() if field in stats]
+
+    analyzer = caches['outfit_analysis']
+    samples.append(('outfit_analysis_timeouts_total', 'counter', '穿搭分析超過期限改用範本說明的次數', {},
+                    analyzer['timeouts']))
+    samples.append(('outfit_analysis_inflight', 'gauge', '進行中的穿搭分析呼叫', {}, analyzer['inflight']))
+    return samples
+
+
+metrics.register_collector(cache_samples)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """以 Prometheus 文字格式輸出延遲直方圖與計數器（多 worker 時為所有 worker 的合計）"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,13 +1,30 @@
-from flask import Blueprint, request, jsonify
-from src.models.wardrobe import db, ClothingItem, FavoriteOutfit
-from src.services.ai_service import WeatherService, OutfitScoringSystem
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.wardrobe import (db, ClothingItem, FavoriteOutfit, FavoriteOutfitItem, WardrobeVersion,
+                                 WardrobeSummary)
+from src.services.ai_service import WeatherService, OutfitScoringSystem, STYLE_LEVEL_PREFERENCES
+from src.services.color_engine import get_color_engine
+from src.services.outfit_encoding import SEASON_BITS, OCCASION_BITS, OVERFLOW_BIT
+from src.services.outfit_search import OutfitSearch
+from src.services.outfit_analysis import outfit_analyzer
+from src.services.recommendation_cache import recommendation_cache
+from src.services.metrics import metrics
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+import numpy as np
 import os
 import json
 import random
-from itertools import combinations
+import time
+from itertools import product
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
+# 批次推薦一次最多的情境數
+MAX_BATCH_SCENARIOS = 20
+
+# 串流推薦兩次中間結果之間的最短間隔（秒）
+STREAM_MIN_INTERVAL = 0.05
+
 @recommendations_bp.route('/weather/<city>', methods=['GET'])
 def get_weather(city):
     """獲取天氣資訊"""
@@ -34,78 +51,167 @@ def generate_recommendations():
         occasion = data.get('occasion', '日常')
         style_level = data.get('style_level', 3)
         
-        # 獲取用戶所有衣物
-        all_items = ClothingItem.query.filter_by(user_id=user_id).all()
-        if len(all_items) < 2:
-            return jsonify({
-                'success': True,
-                'data': [],
-                'message': '衣櫃中的衣物不足，無法生成推薦'
-            })
-        
-        # 轉換為字典格式
-        items_dict = [item.to_dict() for item in all_items]
-        
-        # 根據溫度確定季節
-        temperature = weather.get('temperature', 20)
-        if temperature < 15:
-            season = '冬季'
-        elif temperature < 20:
-            season = '秋季'
-        elif temperature < 25:
-            season = '春季'
-        else:
-            season = '夏季'
-        
-        # 篩選適合的衣物
-        suitable_items = filter_items_by_criteria(items_dict, season, occasion, style_level)
+        # 衣櫥未變動時直接使用快取的搜尋結果
+        season = season_for_temperature(weather.get('temperature', 20))
+        with metrics.stage('recommend.cache_lookup'):
+            cache_key = recommendation_cache.key(user_id, WardrobeVersion.current(user_id),
+                                                 season, occasion, style_level, weather)
+            cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            return jsonify(analyzed_response(*cached, weather, occasion, style_level))
+        
+        # 檢查用戶衣物數量，在資料庫中篩選適合的衣物
+        with metrics.stage('recommend.db_query'):
+            if ClothingItem.query.filter_by(user_id=user_id).count() < 2:
+                return jsonify({
+                    'success': True,
+                    'data': [],
+                    'message': '衣櫃中的衣物不足，無法生成推薦'
+                })
+            items = query_items_by_criteria(user_id, season, occasion, style_level)
+        with metrics.stage('recommend.to_dict'):
+            suitable_items = [item.to_dict() for item in items]
         
         if len(suitable_items) < 2:
-            return jsonify({
-                'success': True,
-                'data': [],
-                'message': f'找不到適合{season}和{occasion}場合的衣物組合'
-            })
+            outfits, message, complete = [], f'找不到適合{season}和{occasion}場合的衣物組合', True
+        else:
+            scoring_system = OutfitScoringSystem()
+            with metrics.stage('recommend.encode'):
+                encoding = scoring_system.encode_items(suitable_items)
+            with metrics.stage('recommend.search'):
+                outfits, message, complete = search_outfits(scoring_system, encoding, range(len(suitable_items)),
+                                                            weather, occasion, style_level,
+                                                            parse_budget_ms(data.get('budget_ms')))
+        
+        # 達到時間上限的結果不完整，不寫入快取
+        if complete:
+            recommendation_cache.put(cache_key, (outfits, message))
+        return jsonify(analyzed_response(outfits, message, weather, occasion, style_level))
         
-        # 按類別分組
-        items_by_category = {}
-        for item in suitable_items:
-            category = item.get('category', '其他')
-            items_by_category.setdefault(category, []).append(item)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@recommendations_bp.route('/recommendations/generate/stream', methods=['POST'])
+def stream_recommendations():
+    """以 Server-Sent Events 逐步回傳穿搭推薦：最佳組合改變時推送 outfits 事件，完成時推送 done 事件"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id', 1)
+        weather = data.get('weather', {})
+        occasion = data.get('occasion', '日常')
+        style_level = data.get('style_level', 3)
         
-        # 生成搭配組合
-        outfit_combinations = generate_outfit_combinations(items_by_category, temperature)
+        season = season_for_temperature(weather.get('temperature', 20))
+        cache_key = recommendation_cache.key(user_id, WardrobeVersion.current(user_id),
+                                             season, occasion, style_level, weather)
+        cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            return sse_response([sse_event('done', analyzed_response(*cached, weather, occasion, style_level))])
         
-        if not outfit_combinations:
-            return jsonify({
+        if ClothingItem.query.filter_by(user_id=user_id).count() < 2:
+            return sse_response([sse_event('done', {
                 'success': True,
                 'data': [],
-                'message': '無法生成適合的搭配組合'
-            })
+                'message': '衣櫃中的衣物不足，無法生成推薦'
+            })])
+        
+        # 資料庫查詢在回應開始前完成，串流期間只進行搜尋
+        with metrics.stage('recommend.db_query'):
+            items = query_items_by_criteria(user_id, season, occasion, style_level)
+        with metrics.stage('recommend.to_dict'):
+            suitable_items = [item.to_dict() for item in items]
+        if len(suitable_items) < 2:
+            outfits, message = [], f'找不到適合{season}和{occasion}場合的衣物組合'
+            recommendation_cache.put(cache_key, (outfits, message))
+            return sse_response([sse_event('done', recommendation_response(outfits, message, weather, style_level))])
         
-        # 使用AI評分系統評分
         scoring_system = OutfitScoringSystem()
-        scored_outfits = []
+        with metrics.stage('recommend.encode'):
+            encoding = scoring_system.encode_items(suitable_items)
+        search, layouts = plan_outfit_search(scoring_system, encoding, range(len(suitable_items)),
+                                             weather, occasion, style_level, parse_budget_ms(data.get('budget_ms')))
+        return sse_response(stream_search_events(search, layouts, weather, occasion, style_level, cache_key))
         
-        for outfit_items in outfit_combinations:
-            score = scoring_system.calculate_outfit_score(outfit_items, weather, occasion, style_level)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def scenario_error(index, scenario):
+    """檢查批次推薦的情境格式，返回錯誤訊息（正確時返回 None）"""
+    if not isinstance(scenario, dict):
+        return f'情境 {index} 必須是物件'
+    if not isinstance(scenario.get('weather', {}), dict):
+        return f'情境 {index} 的 weather 必須是物件'
+    style_level = scenario.get('style_level', 3)
+    if not isinstance(style_level, int) or isinstance(style_level, bool) \
+            or style_level not in STYLE_LEVEL_PREFERENCES:
+        return f'情境 {index} 的 style_level 必須是 {min(STYLE_LEVEL_PREFERENCES)}-{max(STYLE_LEVEL_PREFERENCES)}'
+    return None
+
+@recommendations_bp.route('/recommendations/generate_batch', methods=['POST'])
+def generate_recommendations_batch():
+    """一次生成多個情境（場合、天氣、風格等級）的穿搭推薦"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id', 1)
+        scenarios = data.get('scenarios') or []
+        
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({'success': False, 'error': '請提供至少一個情境'}), 400
+        if len(scenarios) > MAX_BATCH_SCENARIOS:
+            return jsonify({'success': False, 'error': f'一次最多 {MAX_BATCH_SCENARIOS} 個情境'}), 400
+        for index, scenario in enumerate(scenarios):
+            error = scenario_error(index, scenario)
+            if error:
+                return jsonify({'success': False, 'error': error}), 400
+        
+        # 衣櫥只載入與編碼一次，所有情境共用
+        version = WardrobeVersion.current(user_id)
+        with metrics.stage('recommend.db_query'):
+            items = ClothingItem.query.filter_by(user_id=user_id).all()
+        with metrics.stage('recommend.to_dict'):
+            all_items = [item.to_dict() for item in items]
+        scoring_system = OutfitScoringSystem()
+        with metrics.stage('recommend.encode'):
+            encoding = scoring_system.encode_items(all_items)
+        default_budget_ms = parse_budget_ms(data.get('budget_ms'))
+        
+        results = []
+        for scenario in scenarios:
+            weather = scenario.get('weather', {})
+            occasion = scenario.get('occasion', '日常')
+            style_level = scenario.get('style_level', 3)
+            season = season_for_temperature(weather.get('temperature', 20))
             
-            explanation = create_outfit_explanation(outfit_items, weather, score, style_level)
+            cache_key = recommendation_cache.key(user_id, version, season, occasion, style_level, weather)
+            cached = recommendation_cache.get(cache_key)
+            if cached is not None:
+                outfits, message = cached
+            elif len(all_items) < 2:
+                outfits, message = [], '衣櫃中的衣物不足，無法生成推薦'
+            else:
+                candidates = np.flatnonzero(criteria_mask(scoring_system, encoding, season, occasion, style_level))
+                if len(candidates) < 2:
+                    outfits, message, complete = [], f'找不到適合{season}和{occasion}場合的衣物組合', True
+                else:
+                    budget_ms = parse_budget_ms(scenario.get('budget_ms')) or default_budget_ms
+                    with metrics.stage('recommend.search'):
+                        outfits, message, complete = search_outfits(scoring_system, encoding, candidates,
+                                                                    weather, occasion, style_level, budget_ms)
+                if complete:
+                    recommendation_cache.put(cache_key, (outfits, message))
             
-            scored_outfits.append({
-                'id': f"outfit_{random.randint(1000, 9999)}",
-                'items': outfit_items,
-                'score': score,
-                'explanation': explanation
+            scenario_result = recommendation_response(outfits, message, weather, style_level)
+            del scenario_result['success']
+            results.append({
+                'occasion': occasion,
+                'style_level': style_level,
+                'season': season,
+                **scenario_result
             })
         
-        # 排序並選擇最佳推薦
-        best_outfits = sorted(scored_outfits, key=lambda x: x['score'], reverse=True)[:3]
-        final_recommendations = [outfit for outfit in best_outfits if outfit['score'] >= 60]
-        
         return jsonify({
             'success': True,
-            'data': final_recommendations
+            'data': results
         })
         
     except Exception as e:
@@ -117,21 +223,30 @@ def save_favorite_outfit():
     try:
         data = request.get_json()
         user_id = data.get('user_id', 1)
-        outfit_data = data.get('outfit_data')
+        outfit_data = data.get('outfit_data') or {}
         score = data.get('score', 0)
         
+        # 只記錄衣物 ID，列出收藏時再載入最新的衣物資料
+        item_ids = [item.get('id') for item in outfit_data.get('items', []) if isinstance(item, dict)]
+        owned_ids = {item_id for (item_id,) in db.session.query(ClothingItem.id).filter(
+            ClothingItem.user_id == user_id, ClothingItem.id.in_(item_ids))}
+        item_ids = [item_id for item_id in item_ids if item_id in owned_ids]
+        
         favorite = FavoriteOutfit(
             user_id=user_id,
-            outfit_data=json.dumps(outfit_data),
+            explanation=outfit_data.get('explanation'),
             score=score
         )
         
         db.session.add(favorite)
+        db.session.flush()
+        db.session.add_all(FavoriteOutfitItem(favorite_id=favorite.id, position=position, item_id=item_id)
+                           for position, item_id in enumerate(item_ids))
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'data': favorite.to_dict(),
+            'data': favorite.to_dict(load_favorite_items([favorite.id])[favorite.id]),
             'message': '穿搭收藏成功'
         })
         
@@ -145,19 +260,11 @@ def get_favorite_outfits():
     try:
         user_id = request.args.get('user_id', 1)
         favorites = FavoriteOutfit.query.filter_by(user_id=user_id).order_by(FavoriteOutfit.created_at.desc()).all()
-        
-        result = []
-        for favorite in favorites:
-            favorite_dict = favorite.to_dict()
-            try:
-                favorite_dict['outfit_data'] = json.loads(favorite_dict['outfit_data'])
-            except:
-                pass
-            result.append(favorite_dict)
+        items_by_favorite = load_favorite_items([favorite.id for favorite in favorites])
         
         return jsonify({
             'success': True,
-            'data': result
+            'data': [favorite.to_dict(items_by_favorite[favorite.id]) for favorite in favorites]
         })
         
     except Exception as e:
@@ -168,6 +275,7 @@ def delete_favorite_outfit(favorite_id):
     """刪除收藏的穿搭"""
     try:
         favorite = FavoriteOutfit.query.get_or_404(favorite_id)
+        FavoriteOutfitItem.query.filter_by(favorite_id=favorite.id).delete(synchronize_session=False)
         db.session.delete(favorite)
         db.session.commit()
         
@@ -184,53 +292,84 @@ def delete_favorite_outfit(favorite_id):
 def get_wardrobe_stats():
     """獲取衣櫃統計數據"""
     try:
-        user_id = request.args.get('user_id', 1)
-        items = ClothingItem.query.filter_by(user_id=user_id).all()
-        
-        # 統計數據
-        total_items = len(items)
-        avg_usage = sum(item.usage_count for item in items) / total_items if total_items > 0 else 0
-        
-        # 按類別統計
-        category_stats = {}
-        color_stats = {}
-        style_stats = {}
-        
-        for item in items:
-            # 類別統計
-            category = item.category or '其他'
-            category_stats[category] = category_stats.get(category, 0) + 1
-            
-            # 顏色統計
-            color = item.primary_color or '未知'
-            color_stats[color] = color_stats.get(color, 0) + 1
-            
-            # 風格統計
-            style = item.style or '未知'
-            style_stats[style] = style_stats.get(style, 0) + 1
-        
-        # 最常穿的衣物
-        most_worn = sorted(items, key=lambda x: x.usage_count, reverse=True)[:5]
+        try:
+            user_id = int(request.args.get('user_id', 1))
+        except ValueError:
+            return jsonify({'success': False, 'error': '無效的用戶 ID'}), 400
+        
+        # 衣櫥未變動時直接使用統計快照
+        version = WardrobeVersion.current(user_id)
+        summary = db.session.get(WardrobeSummary, user_id)
+        if summary is not None and summary.version == version:
+            stats = json.loads(summary.data)
+        else:
+            stats = aggregate_wardrobe_stats(user_id)
+            data = json.dumps(stats, ensure_ascii=False)
+            if summary is None:
+                db.session.add(WardrobeSummary(user_id=user_id, version=version, data=data))
+            else:
+                summary.version, summary.data = version, data
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # 同時載入的其他請求已寫入快照，直接返回本次彙總的結果
+                db.session.rollback()
         
         return jsonify({
             'success': True,
-            'data': {
-                'total_items': total_items,
-                'average_usage': round(avg_usage, 1),
-                'category_distribution': category_stats,
-                'color_distribution': color_stats,
-                'style_distribution': style_stats,
-                'most_worn_items': [item.to_dict() for item in most_worn]
-            }
+            'data': stats
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def load_favorite_items(favorite_ids):
+    """以一次 JOIN 查詢載入收藏穿搭的衣物，返回 {收藏ID: [衣物字典]}"""
+    items_by_favorite = {favorite_id: [] for favorite_id in favorite_ids}
+    if not favorite_ids:
+        return items_by_favorite
+    
+    rows = db.session.query(FavoriteOutfitItem.favorite_id, ClothingItem) \
+        .join(ClothingItem, ClothingItem.id == FavoriteOutfitItem.item_id) \
+        .filter(FavoriteOutfitItem.favorite_id.in_(favorite_ids)) \
+        .order_by(FavoriteOutfitItem.favorite_id, FavoriteOutfitItem.position)
+    for favorite_id, item in rows:
+        items_by_favorite[favorite_id].append(item.to_dict())
+    return items_by_favorite
+
+def aggregate_wardrobe_stats(user_id):
+    """以 SQL 彙總衣櫃統計數據"""
+    total_items, avg_usage = db.session.query(
+        db.func.count(ClothingItem.id), db.func.avg(ClothingItem.usage_count)
+    ).filter(ClothingItem.user_id == user_id).one()
+    
+    def distribution(column, default):
+        # 空值與空字串合併為預設名稱
+        stats = {}
+        rows = db.session.query(column, db.func.count()).filter(ClothingItem.user_id == user_id).group_by(column)
+        for value, count in rows:
+            key = value or default
+            stats[key] = stats.get(key, 0) + count
+        return stats
+    
+    # 最常穿的衣物（使用 user_id, usage_count 索引）
+    most_worn = ClothingItem.query.filter_by(user_id=user_id) \
+        .order_by(ClothingItem.usage_count.desc(), ClothingItem.id.asc()).limit(5).all()
+    
+    return {
+        'total_items': total_items,
+        'average_usage': round(avg_usage or 0, 1),
+        'category_distribution': distribution(ClothingItem.category, '其他'),
+        'color_distribution': distribution(ClothingItem.primary_color, '未知'),
+        'style_distribution': distribution(ClothingItem.style, '未知'),
+        'most_worn_items': [item.to_dict() for item in most_worn]
+    }
+
 def filter_items_by_criteria(all_items, season, occasion, style_level):
     """根據條件篩選衣物"""
-    scoring_system = OutfitScoringSystem()
-    style_prefs = scoring_system.style_level_preferences[style_level]
+    color_engine = get_color_engine()
+    style_prefs = STYLE_LEVEL_PREFERENCES[style_level]
     preferred_colors = style_prefs['colors']
     preferred_styles = style_prefs['styles']
     
@@ -258,43 +397,191 @@ def filter_items_by_criteria(all_items, season, occasion, style_level):
         item_style = item.get('style', '')
         style_match = item_style in preferred_styles
         
-        # 顏色偏好篩選
+        # 顏色偏好篩選（以顏色系別比對）
         item_color = item.get('primary_color', '')
-        color_preference = item_color in preferred_colors or style_level == 3
+        color_preference = color_engine.family_name(item_color) in preferred_colors or style_level == 3
         
         if season_match and occasion_match and (style_match or color_preference):
             suitable_items.append(item)
     
     return suitable_items
 
-def generate_outfit_combinations(items_by_category, temperature):
-    """生成穿搭組合"""
-    combinations_list = []
+def query_items_by_criteria(user_id, season, occasion, style_level):
+    """以反正規化欄位在資料庫中篩選衣物，條件與 filter_items_by_criteria 相同"""
+    style_prefs = STYLE_LEVEL_PREFERENCES[style_level]
+    
+    season_bit = 1 << SEASON_BITS[season]
+    occasion_bit = 1 << OCCASION_BITS[occasion] if occasion in OCCASION_BITS else OVERFLOW_BIT
+    
+    query = ClothingItem.query.filter(
+        ClothingItem.user_id == user_id,
+        or_(ClothingItem.season_mask == 0, ClothingItem.season_mask.op('&')(season_bit) != 0),
+        or_(ClothingItem.occasion_mask == 0, ClothingItem.occasion_mask.op('&')(occasion_bit) != 0),
+    )
+    
+    # 風格或顏色偏好（風格等級 3 不限顏色）
+    if style_level != 3:
+        color_families = [get_color_engine().family_ids[color] for color in style_prefs['colors']]
+        query = query.filter(or_(ClothingItem.style.in_(style_prefs['styles']),
+                                 ClothingItem.color_family.in_(color_families)))
+    
+    items = query.all()
+    
+    # 詞彙外的場合只能以溢位位元粗篩，需再精確比對
+    if occasion not in OCCASION_BITS:
+        items = [item for item in items
+                 if not item.occasion_mask or occasion in json.loads(item.suitable_occasions or '[]')]
+    
+    return items
+
+def criteria_mask(scoring_system, encoding, season, occasion, style_level):
+    """在已編碼的衣櫥上套用 filter_items_by_criteria 的篩選條件"""
+    style_prefs = STYLE_LEVEL_PREFERENCES[style_level]
+    color_families = None
+    if style_level != 3:
+        color_families = [scoring_system.color_engine.family_ids[color] for color in style_prefs['colors']]
+    return encoding.criteria_mask(season, occasion, style_prefs['styles'], color_families)
+
+def season_for_temperature(temperature):
+    """根據溫度確定季節"""
+    if temperature < 15:
+        return '冬季'
+    elif temperature < 20:
+        return '秋季'
+    elif temperature < 25:
+        return '春季'
+    else:
+        return '夏季'
+
+def plan_outfit_search(scoring_system, encoding, candidates, weather, occasion, style_level, budget_ms=None):
+    """為候選衣物（編碼索引）建立搜尋，返回 (OutfitSearch, 版型列表)"""
+    # 按類別分組（記錄衣物索引）
+    items_by_category = {}
+    for idx in candidates:
+        category = encoding.items[idx].get('category', '其他')
+        items_by_category.setdefault(category, []).append(int(idx))
+    
+    # 生成搭配版型，在完整組合中以分支限界搜尋最佳推薦
+    layouts = build_outfit_layouts(items_by_category, weather.get('temperature', 20))
+    search = OutfitSearch(scoring_system, encoding, weather, occasion, style_level,
+                          k=3, min_score=60, budget_ms=budget_ms)
+    return search, layouts
+
+def search_outcome(search, layouts):
+    """返回 ([(分數, 衣物列表)], 訊息, 是否搜尋完整)"""
+    if not layouts:
+        return [], '無法生成適合的搭配組合', True
     
+    items = search.encoding.items
+    outfits = [(score, [items[idx] for idx in outfit]) for score, outfit in search.results()]
+    if not search.complete:
+        return outfits, '已達搜尋時間上限，回傳目前找到的最佳組合', False
+    return outfits, None, True
+
+def search_outfits(scoring_system, encoding, candidates, weather, occasion, style_level, budget_ms=None):
+    """在候選衣物（編碼索引）中搜尋最佳穿搭，返回格式同 search_outcome"""
+    search, layouts = plan_outfit_search(scoring_system, encoding, candidates, weather, occasion, style_level,
+                                         budget_ms)
+    search.search(layouts)
+    return search_outcome(search, layouts)
+
+def recommendation_response(outfits, message, weather, style_level, outfit_id=None, explanations=None):
+    """將搜尋結果轉為推薦回應（說明依實際天氣產生）
+
+    outfit_id 為依衣物列表產生穿搭 ID 的函式，預設為隨機 ID；
+    explanations 為各穿搭的 AI 分析文字，缺少的穿搭使用範本說明。
+    """
+    outfit_id = outfit_id or (lambda outfit_items: f"outfit_{random.randint(1000, 9999)}")
+    explanations = explanations or [None] * len(outfits)
+    recommendations = [{
+        'id': outfit_id(outfit_items),
+        'items': outfit_items,
+        'score': score,
+        'explanation': explanation or create_outfit_explanation(outfit_items, weather, score, style_level)
+    } for (score, outfit_items), explanation in zip(outfits, explanations)]
+    
+    result = {
+        'success': True,
+        'data': recommendations
+    }
+    if message:
+        result['message'] = message
+    return result
+
+def analyzed_response(outfits, message, weather, occasion, style_level, outfit_id=None):
+    """推薦回應，最終的穿搭在期限內並行取得 AI 分析"""
+    with metrics.stage('recommend.explanation'):
+        explanations = outfit_analyzer.analyze(OutfitScoringSystem(), outfits, weather, occasion)
+    return recommendation_response(outfits, message, weather, style_level, outfit_id, explanations)
+
+def sse_event(event, payload):
+    """格式化一個 Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def stream_search_events(search, layouts, weather, occasion, style_level, cache_key):
+    """逐步推送搜尋中的最佳穿搭（outfits 事件），結束時推送 done 事件"""
+    # 同一串流中相同的穿搭維持相同 ID，方便前端更新畫面
+    outfit_ids = {}
+    def outfit_id(outfit_items):
+        key = tuple(item['id'] for item in outfit_items)
+        return outfit_ids.setdefault(key, f"outfit_{random.randint(1000, 9999)}")
+    
+    try:
+        last_sent = None
+        items = search.encoding.items
+        began = time.perf_counter()
+        for ranked in search.iter_search(layouts):
+            now = time.perf_counter()
+            if last_sent is not None and now - last_sent < STREAM_MIN_INTERVAL:
+                continue
+            last_sent = now
+            outfits = [(score, [items[idx] for idx in outfit]) for score, outfit in ranked]
+            yield sse_event('outfits', recommendation_response(outfits, None, weather, style_level, outfit_id))
+        
+        # 串流期間的搜尋時間包含推送事件，只記錄到直方圖
+        metrics.stage_duration.observe(time.perf_counter() - began, stage='recommend.stream_search')
+        outfits, message, complete = search_outcome(search, layouts)
+        if complete:
+            recommendation_cache.put(cache_key, (outfits, message))
+        yield sse_event('done', analyzed_response(outfits, message, weather, occasion, style_level, outfit_id))
+    except Exception as e:
+        yield sse_event('error', {'success': False, 'error': str(e)})
+
+def sse_response(events):
+    # 產生器在請求結束後才執行，保留請求情境（同 backup 匯出）
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def build_outfit_layouts(items_by_category, temperature):
+    """生成搭配版型，每個版型為各類別欄位的衣物列表"""
     tops = items_by_category.get('上衣', [])
     bottoms = items_by_category.get('下著', [])
     outerwears = items_by_category.get('外套', [])
     shoes = items_by_category.get('鞋子', [])
     
+    if not tops or not bottoms:
+        return []
+    
     # 基礎搭配（上衣+下著）
-    for top in tops[:3]:  # 限制數量以提高性能
-        for bottom in bottoms[:3]:
-            combo = [top, bottom]
-            if shoes:
-                combo.append(shoes[0])
-            combinations_list.append(combo)
+    layouts = [[tops, bottoms, shoes] if shoes else [tops, bottoms]]
     
     # 層次搭配（當溫度較低時加入外套）
     if temperature < 22 and outerwears:
-        for top in tops[:2]:
-            for bottom in bottoms[:2]:
-                for outer in outerwears[:2]:
-                    combo = [top, bottom, outer]
-                    if shoes:
-                        combo.append(shoes[0])
-                    combinations_list.append(combo)
+        layouts.append([tops, bottoms, outerwears, shoes] if shoes else [tops, bottoms, outerwears])
     
-    return combinations_list[:10]  # 限制組合數量
+    return layouts
+
+def generate_outfit_combinations(items_by_category, temperature):
+    """生成所有穿搭組合"""
+    return [list(combo) for layout in build_outfit_layouts(items_by_category, temperature) for combo in product(*layout)]
+
+def parse_budget_ms(value):
+    """解析搜尋時間上限（毫秒），無效值表示不限時"""
+    try:
+        budget_ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    return budget_ms if budget_ms > 0 else None
 
 def create_outfit_explanation(outfit_items, weather, score, style_level):
     """生成穿搭說明"""
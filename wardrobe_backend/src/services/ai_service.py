@@ -1,36 +1,68 @@
 import os
 import json
+import hashlib
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Optional
+import numpy as np
 import requests
+from src.services.color_engine import COLOR_CATEGORIES, get_color_engine
+from src.services.outfit_encoding import WardrobeEncoding
+from src.services.analysis_cache import analysis_cache
+from src.services.weather_cache import weather_cache, get_http_session
+from src.models.wardrobe import db
+from src.models.weather import CityCoordinate
+from src.services.lazy_import import lazy_module
+from src.services.metrics import metrics
+from flask import has_app_context
 
-try:
-    import google.generativeai as genai
-    from PIL import Image
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    print("Warning: Google Generative AI not available. AI features will be disabled.")
+# Gemini SDK（含 grpc/protobuf）與 Pillow 載入成本高，首次使用時才載入
+load_genai = lazy_module('google.generativeai',
+                         "Warning: Google Generative AI not available. AI features will be disabled.")
+load_pil_image = lazy_module('PIL.Image')
 
-class AIService:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        if GEMINI_AVAILABLE:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
-        else:
-            self.model = None
-    
-    def analyze_clothing_image(self, image_path: str) -> Dict[str, Any]:
-        """分析衣物圖片並返回結構化資訊"""
-        if not GEMINI_AVAILABLE or not self.model:
-            return self._get_default_analysis()
-            
-        try:
-            image = Image.open(image_path)
-            
-            prompt = """
+
+def gemini_available() -> bool:
+    """Gemini SDK 與 Pillow 是否可用（首次呼叫時載入）"""
+    return load_genai() is not None and load_pil_image() is not None
+
+
+def create_gemini_model(api_key: Optional[str]):
+    """建立 Gemini 模型；未設定 API 金鑰或 SDK 不可用時返回 None（不會載入 SDK）"""
+    if not api_key or not gemini_available():
+        return None
+    genai = load_genai()
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(ANALYSIS_MODEL_NAME)
+
+
+# genai.configure 會修改 SDK 的全域設定，模型於首次使用時建立一次後共用
+_gemini_models: Dict[str, Any] = {}
+_gemini_models_lock = threading.Lock()
+
+
+def get_gemini_model(api_key: Optional[str]):
+    """取得共用的 Gemini 模型（每個 API 金鑰只建立一次）；無法使用時返回 None"""
+    if not api_key:
+        return None
+    if api_key not in _gemini_models:
+        with _gemini_models_lock:
+            if api_key not in _gemini_models:
+                _gemini_models[api_key] = create_gemini_model(api_key)
+    return _gemini_models[api_key]
+
+
+def __getattr__(name: str):
+    # 相容舊的 GEMINI_AVAILABLE 常數，讀取時才檢查
+    if name == 'GEMINI_AVAILABLE':
+        return gemini_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 衣物分析使用的模型與提示詞；修改提示詞時需遞增版本號，使舊的快取結果失效
+ANALYSIS_MODEL_NAME = 'gemini-2.0-flash'
+ANALYSIS_PROMPT_VERSION = 1
+CLOTHING_ANALYSIS_PROMPT = """
             請分析這張衣物圖片，並以JSON格式返回以下資訊：
             {
                 "name": "衣物名稱",
@@ -45,8 +77,51 @@ class AIService:
             
             請確保返回有效的JSON格式，不要包含其他文字。
             """
+
+# 風格等級偏好（顏色系別與風格）
+STYLE_LEVEL_PREFERENCES = {
+    1: {'colors': ['黑色系', '白色系', '灰色系', '米色系'], 'styles': ['正式', '現代']},
+    2: {'colors': ['黑色系', '白色系', '灰色系', '藍色系'], 'styles': ['休閒', '現代']},
+    3: {'colors': ['黑色系', '白色系', '灰色系', '藍色系', '米色系'], 'styles': ['休閒', '現代', '正式']},
+    4: {'colors': ['紅色系', '藍色系', '綠色系', '黃色系', '紫色系'], 'styles': ['現代', '浪漫']},
+    5: {'colors': ['紅色系', '黃色系', '紫色系', '綠色系', '橙色系'], 'styles': ['浪漫', '復古']}
+}
+
+def analysis_cache_key(image) -> str:
+    """以解碼後的像素（不含檔案格式與中繼資料）計算分析快取鍵"""
+    normalized = image.convert('RGB')
+    digest = hashlib.sha256(f"{ANALYSIS_MODEL_NAME}:{ANALYSIS_PROMPT_VERSION}:{normalized.size}:".encode())
+    digest.update(normalized.tobytes())
+    return digest.hexdigest()
+
+class ClothingAnalysisError(RuntimeError):
+    """AI 無法分析衣物圖片（未配置或分析失敗）"""
+
+class AIService:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self.model = get_gemini_model(api_key)
+    
+    def analyze_clothing_image(self, image_path: str, fallback: bool = True) -> Dict[str, Any]:
+        """分析衣物圖片並返回結構化資訊（相同圖片直接使用快取結果）
+
+        無法分析時返回預設結果；fallback 為 False 時改為拋出 ClothingAnalysisError。
+        """
+        if not self.model:
+            if not fallback:
+                raise ClothingAnalysisError('AI服務未配置')
+            return self._get_default_analysis()
+            
+        try:
+            image = load_pil_image().open(image_path)
             
-            response = self.model.generate_content([prompt, image])
+            cache_key = analysis_cache_key(image)
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            with metrics.external_call('gemini', 'analyze_clothing'):
+                response = self.model.generate_content([CLOTHING_ANALYSIS_PROMPT, image])
             
             # 解析回應
             response_text = response.text.strip()
@@ -56,10 +131,13 @@ class AIService:
                 response_text = response_text[3:-3]
             
             result = json.loads(response_text)
+            analysis_cache.put(cache_key, result)
             return result
             
         except Exception as e:
             print(f"AI分析錯誤: {e}")
+            if not fallback:
+                raise ClothingAnalysisError(f"AI分析錯誤: {e}") from e
             return self._get_default_analysis()
     
     def _get_default_analysis(self) -> Dict[str, Any]:
@@ -78,37 +156,74 @@ class AIService:
 class WeatherService:
     """OpenWeather One Call API 3.0 天氣服務"""
     
+    # 台灣主要城市映射
+    TAIWAN_CITIES = {
+        '台北': 'Taipei', '台北市': 'Taipei', '新北': 'New Taipei', '新北市': 'New Taipei',
+        '桃園': 'Taoyuan', '台中': 'Taichung', '台中市': 'Taichung', '台南': 'Tainan',
+        '台南市': 'Tainan', '高雄': 'Kaohsiung', '高雄市': 'Kaohsiung', '基隆': 'Keelung',
+        '新竹': 'Hsinchu', '嘉義': 'Chiayi', '宜蘭': 'Yilan', '花蓮': 'Hualien', '台東': 'Taitung'
+    }
+    
     def __init__(self, api_key: str):
         if not api_key:
             raise ValueError("API key is required for WeatherService.")
         self.api_key = api_key
         self.base_url = "https://api.openweathermap.org/data/3.0/onecall"
         self.geo_url = "https://api.openweathermap.org/geo/1.0"
-        self.session = requests.Session()
+        self.session = get_http_session()
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO)
         
-        # 台灣主要城市映射
-        self.taiwan_cities = {
-            '台北': 'Taipei', '台北市': 'Taipei', '新北': 'New Taipei', '新北市': 'New Taipei',
-            '桃園': 'Taoyuan', '台中': 'Taichung', '台中市': 'Taichung', '台南': 'Tainan',
-            '台南市': 'Tainan', '高雄': 'Kaohsiung', '高雄市': 'Kaohsiung', '基隆': 'Keelung',
-            '新竹': 'Hsinchu', '嘉義': 'Chiayi', '宜蘭': 'Yilan', '花蓮': 'Hualien', '台東': 'Taitung'
-        }
+        self.taiwan_cities = self.TAIWAN_CITIES
+
+    # 城市座標不會變動：行程內記憶體快取，並持久化到 city_coordinates 表
+    _coordinates_memo: Dict[str, Dict[str, float]] = {}
 
     def _get_coordinates(self, city_name: str) -> Optional[Dict[str, float]]:
-        params = {'q': f"{city_name},TW", 'limit': 1, 'appid': self.api_key}
+        query = f"{city_name},TW"
+        coordinates = self._coordinates_memo.get(query)
+        if coordinates:
+            return coordinates
+        
+        coordinates = self._load_stored_coordinates(query) or self._fetch_coordinates(query)
+        if coordinates:
+            self._coordinates_memo[query] = coordinates
+        return coordinates
+
+    def _load_stored_coordinates(self, query: str) -> Optional[Dict[str, float]]:
+        if not has_app_context():
+            return None
         try:
-            response = self.session.get(f"{self.geo_url}/direct", params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            if data:
-                return {'lat': data[0]['lat'], 'lon': data[0]['lon']}
-            self.logger.warning(f"找不到城市 {city_name} 的座標。")
+            stored = db.session.get(CityCoordinate, query)
+            return {'lat': stored.lat, 'lon': stored.lon} if stored else None
+        except Exception as e:
+            self.logger.warning(f"讀取城市座標失敗 for {query}: {e}")
             return None
+
+    def _fetch_coordinates(self, query: str) -> Optional[Dict[str, float]]:
+        params = {'q': query, 'limit': 1, 'appid': self.api_key}
+        try:
+            with metrics.external_call('openweather', 'geocode'):
+                response = self.session.get(f"{self.geo_url}/direct", params=params, timeout=5)
+                response.raise_for_status()
+            data = response.json()
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"獲取座標失敗 for city {city_name}: {e}")
+            self.logger.error(f"獲取座標失敗 for city {query}: {e}")
             return None
+        
+        if not data:
+            self.logger.warning(f"找不到城市 {query} 的座標。")
+            return None
+        
+        coordinates = {'lat': data[0]['lat'], 'lon': data[0]['lon']}
+        if has_app_context():
+            try:
+                db.session.merge(CityCoordinate(query=query, lat=coordinates['lat'], lon=coordinates['lon']))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.logger.warning(f"儲存城市座標失敗 for {query}: {e}")
+        return coordinates
 
     def get_weather_by_city(self, city_name: str) -> Optional[Dict[str, Any]]:
         english_city = self.taiwan_cities.get(city_name, city_name)
@@ -116,8 +231,22 @@ class WeatherService:
         if not coordinates:
             return None
         
-        weather_data = self._get_onecall_weather(coordinates['lat'], coordinates['lon'])
-        return self._process_onecall_data(weather_data, city_name) if weather_data else None
+        lat, lon = coordinates['lat'], coordinates['lon']
+        weather = weather_cache.get(weather_cache.key(lat, lon), lambda: self._fetch_processed_weather(lat, lon))
+        return dict(weather, city_name=city_name) if weather else None
+
+    def refresh_city_weather(self, english_city: str) -> bool:
+        """立即更新城市天氣快取（供背景預先抓取使用）"""
+        coordinates = self._get_coordinates(english_city)
+        if not coordinates:
+            return False
+        
+        lat, lon = coordinates['lat'], coordinates['lon']
+        return weather_cache.refresh(weather_cache.key(lat, lon), lambda: self._fetch_processed_weather(lat, lon)) is not None
+
+    def _fetch_processed_weather(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        weather_data = self._get_onecall_weather(lat, lon)
+        return self._process_onecall_data(weather_data, '') if weather_data else None
 
     def _get_onecall_weather(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         params = {
@@ -125,8 +254,9 @@ class WeatherService:
             'units': 'metric', 'lang': 'zh_tw', 'exclude': 'minutely,alerts'
         }
         try:
-            response = self.session.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
+            with metrics.external_call('openweather', 'onecall'):
+                response = self.session.get(self.base_url, params=params, timeout=10)
+                response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"One Call API請求失敗 for lat={lat}, lon={lon}: {e}")
@@ -328,377 +458,137 @@ class WeatherService:
 class OutfitScoringSystem:
     """穿搭評分系統"""
     
-    def __init__(self):
-        # 顏色相容性矩陣 - 擴展更多顏色變體
-        self.color_compatibility = {
-            # 基礎黑色系
-            '黑色': ['白色', '灰色', '紅色', '藍色', '黃色', '綠色', '米色', '銀色'],
-            '黑': ['白色', '灰色', '紅色', '藍色', '黃色', '綠色', '米色', '銀色'],
-            'black': ['白色', '灰色', '紅色', '藍色', '黃色', '綠色', '米色', '銀色'],
-            '深黑': ['白色', '灰色', '紅色', '藍色', '黃色', '綠色', '米色', '銀色'],
-            
-            # 基礎白色系
-            '白色': ['黑色', '灰色', '藍色', '紅色', '綠色', '紫色', '粉色', '米色'],
-            '白': ['黑色', '灰色', '藍色', '紅色', '綠色', '紫色', '粉色', '米色'],
-            'white': ['黑色', '灰色', '藍色', '紅色', '綠色', '紫色', '粉色', '米色'],
-            '純白': ['黑色', '灰色', '藍色', '紅色', '綠色', '紫色', '粉色', '米色'],
-            '米白': ['黑色', '灰色', '藍色', '紅色', '綠色', '紫色', '粉色', '米色'],
-            
-            # 基礎灰色系
-            '灰色': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            '灰': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            'gray': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            'grey': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            '深灰': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            '淺灰': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            '炭灰': ['黑色', '白色', '藍色', '紅色', '黃色', '綠色', '紫色'],
-            
-            # 基礎藍色系
-            '藍色': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            '藍': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            'blue': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            '深藍': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            '淺藍': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            '海軍藍': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            '天藍': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            '牛仔藍': ['白色', '黑色', '灰色', '米色', '棕色', '黃色', '綠色'],
-            
-            # 基礎紅色系
-            '紅色': ['黑色', '白色', '灰色', '米色', '藍色'],
-            '紅': ['黑色', '白色', '灰色', '米色', '藍色'],
-            'red': ['黑色', '白色', '灰色', '米色', '藍色'],
-            '深紅': ['黑色', '白色', '灰色', '米色', '藍色'],
-            '酒紅': ['黑色', '白色', '灰色', '米色', '藍色'],
-            '粉紅': ['白色', '黑色', '灰色', '米色'],
-            '粉色': ['白色', '黑色', '灰色', '米色'],
-            
-            # 基礎綠色系
-            '綠色': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            '綠': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            'green': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            '深綠': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            '淺綠': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            '軍綠': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            '橄欖綠': ['白色', '黑色', '米色', '棕色', '藍色', '灰色'],
-            
-            # 基礎黃色系
-            '黃色': ['黑色', '灰色', '藍色', '白色', '棕色'],
-            '黃': ['黑色', '灰色', '藍色', '白色', '棕色'],
-            'yellow': ['黑色', '灰色', '藍色', '白色', '棕色'],
-            '淺黃': ['黑色', '灰色', '藍色', '白色', '棕色'],
-            '檸檬黃': ['黑色', '灰色', '藍色', '白色', '棕色'],
-            
-            # 基礎紫色系
-            '紫色': ['白色', '黑色', '灰色', '銀色'],
-            '紫': ['白色', '黑色', '灰色', '銀色'],
-            'purple': ['白色', '黑色', '灰色', '銀色'],
-            '深紫': ['白色', '黑色', '灰色', '銀色'],
-            '淺紫': ['白色', '黑色', '灰色', '銀色'],
-            
-            # 基礎米色/棕色系
-            '米色': ['藍色', '綠色', '棕色', '白色', '黑色', '灰色'],
-            '米': ['藍色', '綠色', '棕色', '白色', '黑色', '灰色'],
-            'beige': ['藍色', '綠色', '棕色', '白色', '黑色', '灰色'],
-            '卡其': ['藍色', '綠色', '棕色', '白色', '黑色', '灰色'],
-            '駝色': ['藍色', '綠色', '棕色', '白色', '黑色', '灰色'],
-            
-            '棕色': ['米色', '綠色', '藍色', '白色', '黑色', '灰色'],
-            '棕': ['米色', '綠色', '藍色', '白色', '黑色', '灰色'],
-            'brown': ['米色', '綠色', '藍色', '白色', '黑色', '灰色'],
-            '咖啡色': ['米色', '綠色', '藍色', '白色', '黑色', '灰色'],
-            '深棕': ['米色', '綠色', '藍色', '白色', '黑色', '灰色'],
-            
-            # 其他常見顏色
-            '橙色': ['黑色', '白色', '灰色', '藍色', '棕色'],
-            '橘色': ['黑色', '白色', '灰色', '藍色', '棕色'],
-            'orange': ['黑色', '白色', '灰色', '藍色', '棕色'],
-            
-            '銀色': ['黑色', '白色', '灰色', '藍色', '紫色'],
-            '銀': ['黑色', '白色', '灰色', '藍色', '紫色'],
-            'silver': ['黑色', '白色', '灰色', '藍色', '紫色'],
-            
-            '金色': ['黑色', '白色', '棕色', '米色'],
-            '金': ['黑色', '白色', '棕色', '米色'],
-            'gold': ['黑色', '白色', '棕色', '米色'],
-        }
-        
+    def __init__(self, api_key: Optional[str] = None):
         # 顏色分類映射 - 將相似顏色歸類
-        self.color_categories = {
-            '黑色系': ['黑色', '黑', 'black', '深黑', '炭黑'],
-            '白色系': ['白色', '白', 'white', '純白', '米白', '象牙白'],
-            '灰色系': ['灰色', '灰', 'gray', 'grey', '深灰', '淺灰', '炭灰', '銀灰'],
-            '藍色系': ['藍色', '藍', 'blue', '深藍', '淺藍', '海軍藍', '天藍', '牛仔藍', '寶藍'],
-            '紅色系': ['紅色', '紅', 'red', '深紅', '酒紅', '粉紅', '粉色', '桃紅'],
-            '綠色系': ['綠色', '綠', 'green', '深綠', '淺綠', '軍綠', '橄欖綠', '草綠'],
-            '黃色系': ['黃色', '黃', 'yellow', '淺黃', '檸檬黃', '金黃'],
-            '紫色系': ['紫色', '紫', 'purple', '深紫', '淺紫', '薰衣草紫'],
-            '棕色系': ['棕色', '棕', 'brown', '咖啡色', '深棕', '淺棕', '巧克力色'],
-            '米色系': ['米色', '米', 'beige', '卡其', '駝色', '奶油色'],
-            '橙色系': ['橙色', '橘色', 'orange', '橘紅', '橙黃'],
-        }
+        self.color_categories = COLOR_CATEGORIES
+        self.color_engine = get_color_engine()
         
         # 風格等級偏好
-        self.style_level_preferences = {
-            1: {'colors': ['黑色系', '白色系', '灰色系', '米色系'], 'styles': ['正式', '現代']},
-            2: {'colors': ['黑色系', '白色系', '灰色系', '藍色系'], 'styles': ['休閒', '現代']},
-            3: {'colors': ['黑色系', '白色系', '灰色系', '藍色系', '米色系'], 'styles': ['休閒', '現代', '正式']},
-            4: {'colors': ['紅色系', '藍色系', '綠色系', '黃色系', '紫色系'], 'styles': ['現代', '浪漫']},
-            5: {'colors': ['紅色系', '黃色系', '紫色系', '綠色系', '橙色系'], 'styles': ['浪漫', '復古']}
-        }
+        self.style_level_preferences = STYLE_LEVEL_PREFERENCES
+        
+        # 穿搭分析文字使用的模型（未設定 API 金鑰時使用預設文字）
+        self.model = get_gemini_model(api_key or os.getenv('GEMINI_API_KEY'))
     
     def _normalize_color(self, color: str) -> str:
         """標準化顏色名稱，返回顏色系別"""
-        if not color:
-            return '未知'
-        
-        color = color.strip().lower()
-        
-        # 直接查找顏色系別
-        for category, colors in self.color_categories.items():
-            if any(c.lower() in color or color in c.lower() for c in colors):
-                return category
-        
-        # 模糊匹配常見顏色關鍵字
-        color_keywords = {
-            '黑': '黑色系', '白': '白色系', '灰': '灰色系', '藍': '藍色系',
-            '紅': '紅色系', '綠': '綠色系', '黃': '黃色系', '紫': '紫色系',
-            '棕': '棕色系', '米': '米色系', '橙': '橙色系', '橘': '橙色系',
-            'black': '黑色系', 'white': '白色系', 'gray': '灰色系', 'grey': '灰色系',
-            'blue': '藍色系', 'red': '紅色系', 'green': '綠色系', 'yellow': '黃色系',
-            'purple': '紫色系', 'brown': '棕色系', 'beige': '米色系', 'orange': '橙色系'
-        }
-        
-        for keyword, category in color_keywords.items():
-            if keyword in color:
-                return category
-        
-        return '其他'
+        return self.color_engine.family_name(color)
     
     def _get_color_compatibility_score(self, color1: str, color2: str) -> float:
         """計算兩個顏色的相容性分數"""
-        if not color1 or not color2:
-            return 50
-        
-        # 標準化顏色
-        norm_color1 = self._normalize_color(color1)
-        norm_color2 = self._normalize_color(color2)
-        
-        # 同色系給高分
-        if norm_color1 == norm_color2:
-            return 85
-        
-        # 檢查經典搭配
-        classic_combinations = [
-            ('黑色系', '白色系'), ('白色系', '黑色系'),
-            ('黑色系', '灰色系'), ('灰色系', '黑色系'),
-            ('白色系', '灰色系'), ('灰色系', '白色系'),
-            ('藍色系', '白色系'), ('白色系', '藍色系'),
-            ('藍色系', '米色系'), ('米色系', '藍色系'),
-            ('黑色系', '藍色系'), ('藍色系', '黑色系'),
-            ('綠色系', '米色系'), ('米色系', '綠色系'),
-            ('棕色系', '米色系'), ('米色系', '棕色系'),
-        ]
-        
-        if (norm_color1, norm_color2) in classic_combinations:
-            return 90
-        
-        # 中性色與其他顏色的搭配
-        neutral_colors = ['黑色系', '白色系', '灰色系', '米色系']
-        if norm_color1 in neutral_colors or norm_color2 in neutral_colors:
-            return 75
-        
-        # 對比色搭配
-        contrast_pairs = [
-            ('紅色系', '綠色系'), ('綠色系', '紅色系'),
-            ('藍色系', '橙色系'), ('橙色系', '藍色系'),
-            ('黃色系', '紫色系'), ('紫色系', '黃色系'),
-        ]
-        
-        if (norm_color1, norm_color2) in contrast_pairs:
-            return 70
-        
-        # 相鄰色搭配
-        adjacent_pairs = [
-            ('藍色系', '綠色系'), ('綠色系', '藍色系'),
-            ('紅色系', '橙色系'), ('橙色系', '紅色系'),
-            ('黃色系', '橙色系'), ('橙色系', '黃色系'),
-        ]
-        
-        if (norm_color1, norm_color2) in adjacent_pairs:
-            return 80
-        
-        # 其他情況給予基礎分數
-        return 60
+        return self.color_engine.pair_score(color1, color2)
+    
+    def encode_items(self, items: List[Dict]) -> WardrobeEncoding:
+        """將衣物編碼為批次評分用的整數屬性陣列"""
+        return WardrobeEncoding(items)
     
     def calculate_outfit_score(self, outfit_items: List[Dict], weather: Dict, occasion: str, style_level: int) -> float:
         """計算穿搭總分（0-100分）"""
         if len(outfit_items) < 2:
             return 0
         
+        encoding = self.encode_items(outfit_items)
+        outfits = np.arange(len(outfit_items), dtype=np.int64).reshape(1, -1)
+        return float(self.calculate_outfit_scores_batch(encoding, outfits, weather, occasion, style_level)[0])
+    
+    def calculate_outfit_scores_batch(self, encoding: WardrobeEncoding, outfits: np.ndarray, weather: Dict,
+                                      occasion: str, style_level: int) -> np.ndarray:
+        """批次計算 N 套穿搭的總分，outfits 為 N x K 的衣物索引陣列（以 -1 補齊）"""
+        outfits = np.asarray(outfits, dtype=np.int64)
+        if outfits.ndim != 2 or outfits.shape[0] == 0:
+            return np.zeros(len(outfits), dtype=np.float64)
+        
+        valid = outfits >= 0
+        outfits = np.where(valid, outfits, 0)
+        counts = valid.sum(axis=1)
+        
         # 顏色搭配評分 (30%)
-        color_score = self._calculate_color_harmony(outfit_items)
+        color_score = self._batch_color_harmony(encoding, outfits, valid)
         
         # 風格一致性評分 (25%)
-        style_score = self._calculate_style_consistency(outfit_items, style_level)
+        style_score = self._batch_style_consistency(encoding, outfits, valid, style_level)
         
         # 天氣適應性評分 (25%)
-        weather_score = self._calculate_weather_appropriateness(outfit_items, weather)
+        weather_score = self._batch_item_average(encoding.item_weather_scores(weather), outfits, valid, counts)
         
         # 場合適用性評分 (20%)
-        occasion_score = self._calculate_occasion_suitability(outfit_items, occasion)
+        occasion_score = self._batch_item_average(encoding.item_occasion_scores(occasion), outfits, valid, counts)
         
         total_score = (color_score * 0.3 + style_score * 0.25 + 
                       weather_score * 0.25 + occasion_score * 0.2)
         
-        return min(100, total_score)
+        return np.where(counts < 2, 0.0, np.minimum(100, total_score))
     
-    def _calculate_color_harmony(self, outfit_items: List[Dict]) -> float:
-        """計算顏色和諧度"""
-        if len(outfit_items) < 2:
-            return 50
-        
-        harmony_scores = []
-        
-        for i in range(len(outfit_items)):
-            for j in range(i + 1, len(outfit_items)):
-                color1 = outfit_items[i].get('primary_color', '').strip()
-                color2 = outfit_items[j].get('primary_color', '').strip()
-                
-                score = self._get_color_compatibility_score(color1, color2)
-                harmony_scores.append(score)
-        
-        return sum(harmony_scores) / len(harmony_scores) if harmony_scores else 50
+    def _batch_color_harmony(self, encoding: WardrobeEncoding, outfits: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """批次計算顏色和諧度（所有衣物兩兩配對的平均分）"""
+        colors = encoding.color_id[outfits]
+        first, second = np.triu_indices(outfits.shape[1], 1)
+        pair_valid = valid[:, first] & valid[:, second]
+        pair_scores = encoding.color_matrix[colors[:, first], colors[:, second]] * pair_valid
+        pair_counts = pair_valid.sum(axis=1)
+        
+        return np.where(pair_counts > 0, pair_scores.sum(axis=1) / np.maximum(pair_counts, 1), 50)
     
-    def _calculate_style_consistency(self, outfit_items: List[Dict], style_level: int) -> float:
-        """計算風格一致性"""
-        styles = [item.get('style', '').strip() for item in outfit_items if item.get('style')]
-        
-        if not styles:
-            return 50
+    def _batch_style_consistency(self, encoding: WardrobeEncoding, outfits: np.ndarray, valid: np.ndarray,
+                                 style_level: int) -> np.ndarray:
+        """批次計算風格一致性"""
+        styles = np.where(valid, encoding.style_id[outfits], -1)
+        has_style = styles >= 0
+        style_counts = has_style.sum(axis=1)
         
         preferred_styles = self.style_level_preferences.get(style_level, {}).get('styles', [])
-        
-        style_match_score = 0
-        for style in styles:
-            if style in preferred_styles:
-                style_match_score += 100
-            else:
-                style_match_score += 40
-        
-        unique_styles = set(styles)
-        consistency_bonus = 100 if len(unique_styles) == 1 else max(60, 100 - (len(unique_styles) - 1) * 15)
-        
-        return (style_match_score / len(styles) + consistency_bonus) / 2
-    
-    def _calculate_weather_appropriateness(self, outfit_items: List[Dict], weather: Dict) -> float:
-        """計算天氣適應性"""
-        temp = weather.get('temperature', 20)
-        weather_main = weather.get('weather_main', 'Clear')
-        
-        appropriateness_score = 0
-        total_items = len(outfit_items)
-        
-        for item in outfit_items:
-            category = item.get('category', '').strip()
-            material = item.get('material', '').lower()
-            seasons = item.get('suitable_seasons', [])
-            
-            if isinstance(seasons, str):
-                try:
-                    seasons = json.loads(seasons)
-                except:
-                    seasons = [s.strip() for s in seasons.split(',')]
-            
-            item_score = 50
-            
-            # 溫度適應性
-            if temp < 10:  # 寒冷
-                if category in ['外套'] or any(keyword in material for keyword in ['毛', '厚', '保暖', '羊毛', '絨']):
-                    item_score += 25
-                if '冬季' in seasons:
-                    item_score += 15
-            elif temp < 18:  # 涼爽
-                if category in ['外套', '上衣'] or any(keyword in material for keyword in ['薄', '長袖']):
-                    item_score += 20
-                if any(season in seasons for season in ['秋季', '春季']):
-                    item_score += 15
-            elif temp < 26:  # 舒適
-                if any(season in seasons for season in ['春季', '秋季']):
-                    item_score += 20
-            else:  # 溫暖/炎熱
-                if any(keyword in material for keyword in ['棉', '麻', '透氣', '薄', '涼爽']):
-                    item_score += 25
-                if '夏季' in seasons:
-                    item_score += 15
-            
-            # 天氣狀況適應性
-            if weather_main in ['Rain', 'Thunderstorm', 'Drizzle']:
-                if category == '外套' or any(keyword in material for keyword in ['防水', '雨']):
-                    item_score += 10
-            
-            appropriateness_score += min(100, item_score)
-        
-        return appropriateness_score / total_items
+        preferred = encoding.preferred_styles(preferred_styles)[styles] & has_style
+        match_counts = preferred.sum(axis=1)
+        style_match_score = match_counts * 100 + (style_counts - match_counts) * 40
+        
+        # 排序後計算不同風格的數量
+        sorted_styles = np.sort(styles, axis=1)
+        is_new = np.ones_like(sorted_styles, dtype=bool)
+        is_new[:, 1:] = sorted_styles[:, 1:] != sorted_styles[:, :-1]
+        unique_styles = ((sorted_styles >= 0) & is_new).sum(axis=1)
+        consistency_bonus = np.where(unique_styles == 1, 100, np.maximum(60, 100 - (unique_styles - 1) * 15))
+        
+        return np.where(style_counts > 0,
+                        (style_match_score / np.maximum(style_counts, 1) + consistency_bonus) / 2, 50)
     
-    def _calculate_occasion_suitability(self, outfit_items: List[Dict], occasion: str) -> float:
-        """計算場合適用性"""
-        suitability_score = 0
-        total_items = len(outfit_items)
-        
-        occasion_mapping = {
-            '正式': ['正式', '工作'],
-            '日常': ['日常', '休閒'],
-            '運動': ['運動'],
-            '約會': ['約會', '日常'],
-            '工作': ['工作', '正式']
-        }
-        
-        suitable_occasions = occasion_mapping.get(occasion, [occasion])
-        
-        for item in outfit_items:
-            item_occasions = item.get('suitable_occasions', [])
-            if isinstance(item_occasions, str):
-                try:
-                    item_occasions = json.loads(item_occasions)
-                except:
-                    item_occasions = [s.strip() for s in item_occasions.split(',')]
-            
-            if any(occ in suitable_occasions for occ in item_occasions):
-                suitability_score += 100
-            elif not item_occasions:
-                suitability_score += 70
-            else:
-                suitability_score += 40
-        
-        return suitability_score / total_items
+    def _batch_item_average(self, item_scores: np.ndarray, outfits: np.ndarray, valid: np.ndarray,
+                            counts: np.ndarray) -> np.ndarray:
+        """批次計算每套穿搭的單品分數平均"""
+        return (item_scores[outfits] * valid).sum(axis=1) / np.maximum(counts, 1)
     
     def generate_outfit_analysis(self, outfit_items: List[Dict], score: float, weather: Dict, occasion: str = "日常") -> str:
         """生成穿搭分析文字"""
-        if not GEMINI_AVAILABLE or not self.model:
+        if not self.model:
             return self._get_default_analysis_text(score)
         
         try:
-            # 準備穿搭描述
-            outfit_descriptions = []
-            for item in outfit_items:
-                desc = f"{item.get('name', '衣物')}"
-                if item.get('primary_color'):
-                    desc += f"({item['primary_color']})"
-                outfit_descriptions.append(desc)
-            
-            outfit_text = " + ".join(outfit_descriptions)
-            
-            # 評分等級
-            if score >= 80:
-                grade = "優秀"
-            elif score >= 70:
-                grade = "良好" 
-            elif score >= 60:
-                grade = "及格"
-            else:
-                grade = "需改進"
-            
-            prompt = f"""
+            return self.request_outfit_analysis(self.outfit_analysis_prompt(outfit_items, score, weather, occasion))
+        except Exception as e:
+            print(f"AI 穿搭分析生成錯誤: {e}")
+            return self._get_default_analysis_text(score)
+    
+    def outfit_analysis_prompt(self, outfit_items: List[Dict], score: float, weather: Dict, occasion: str = "日常") -> str:
+        """組成穿搭分析的提示詞（提示詞相同即可共用分析結果）"""
+        # 準備穿搭描述
+        outfit_descriptions = []
+        for item in outfit_items:
+            desc = f"{item.get('name', '衣物')}"
+            if item.get('primary_color'):
+                desc += f"({item['primary_color']})"
+            outfit_descriptions.append(desc)
+        
+        outfit_text = " + ".join(outfit_descriptions)
+        
+        # 評分等級
+        if score >= 80:
+            grade = "優秀"
+        elif score >= 70:
+            grade = "良好" 
+        elif score >= 60:
+            grade = "及格"
+        else:
+            grade = "需改進"
+        
+        return f"""
             請為這套穿搭組合提供專業的時尚分析：
 
             穿搭組合：{outfit_text}
@@ -719,13 +609,12 @@ class OutfitScoringSystem:
             - 控制在100-120字
             - 以 "**AI穿搭分析** (評分:{score:.1f}/100-{grade})" 開頭
             """
-            
+    
+    def request_outfit_analysis(self, prompt: str) -> str:
+        """呼叫模型產生穿搭分析（錯誤由呼叫端處理）"""
+        with metrics.external_call('gemini', 'outfit_analysis'):
             response = self.model.generate_content(prompt)
-            return response.text.strip()
-            
-        except Exception as e:
-            print(f"AI 穿搭分析生成錯誤: {e}")
-            return self._get_default_analysis_text(score)
+        return response.text.strip()
     
     def _get_default_analysis_text(self, score: float) -> str:
         """獲取預設分析文字"""
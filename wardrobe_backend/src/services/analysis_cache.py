@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from flask import has_app_context
+
+from src.models.wardrobe import db
+from src.models.analysis_cache import AnalysisCacheEntry
+
+DEFAULT_MAX_ENTRIES = 5000
+
+# 命中時的使用次數與時間先累積在記憶體，達到筆數或間隔後以獨立連線批次寫入
+TOUCH_BATCH_SIZE = 50
+TOUCH_FLUSH_SECONDS = 30
+
+
+class AnalysisCache:
+    """以圖片內容雜湊為鍵、保存在資料庫中的 AI 分析結果快取（LRU 淘汰）
+
+    讀寫都使用獨立的資料庫連線，不會提交或回滾呼叫端 session 中的交易。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv('AI_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, Tuple[int, datetime]] = {}
+        self._last_flush = time.monotonic()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """查詢快取，命中時記錄使用時間（延後批次寫入）"""
+        if not has_app_context():
+            return None
+
+        table = AnalysisCacheEntry.__table__
+        try:
+            with db.engine.connect() as connection:
+                result = connection.execute(
+                    db.select(table.c.result).where(table.c.cache_key == cache_key)
+                ).scalar()
+        except Exception as e:
+            self.logger.warning(f"讀取分析快取失敗: {e}")
+            return None
+
+        if result is None:
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        self._touch(cache_key)
+        return json.loads(result)
+
+    def put(self, cache_key: str, result: Dict[str, Any]):
+        """寫入快取並淘汰最久未使用的項目"""
+        if not has_app_context():
+            return
+
+        # 先寫入累積的使用時間，淘汰順序才正確
+        self.flush_touches()
+        table = AnalysisCacheEntry.__table__
+        values = {'result': json.dumps(result, ensure_ascii=False), 'last_used_at': datetime.utcnow()}
+        try:
+            with db.engine.begin() as connection:
+                updated = connection.execute(
+                    db.update(table).where(table.c.cache_key == cache_key).values(**values)
+                ).rowcount
+                if not updated:
+                    connection.execute(db.insert(table).values(cache_key=cache_key, hits=0, **values))
+
+                overflow = connection.execute(db.select(db.func.count()).select_from(table)).scalar() \
+                    - self.max_entries
+                if overflow > 0:
+                    stale_keys = db.select(table.c.cache_key).order_by(table.c.last_used_at.asc()).limit(overflow)
+                    connection.execute(db.delete(table).where(table.c.cache_key.in_(stale_keys)))
+        except Exception as e:
+            self.logger.warning(f"寫入分析快取失敗: {e}")
+
+    def flush_touches(self):
+        """將累積的命中次數與最後使用時間寫入資料庫"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._last_flush = time.monotonic()
+        if not touched:
+            return
+
+        table = AnalysisCacheEntry.__table__
+        try:
+            with db.engine.begin() as connection:
+                for cache_key, (hits, last_used_at) in touched.items():
+                    connection.execute(db.update(table).where(table.c.cache_key == cache_key)
+                                       .values(hits=table.c.hits + hits, last_used_at=last_used_at))
+        except Exception as e:
+            self.logger.warning(f"更新分析快取使用時間失敗: {e}")
+
+    def _touch(self, cache_key: str):
+        with self._lock:
+            hits, _ = self._touched.get(cache_key, (0, None))
+            self._touched[cache_key] = (hits + 1, datetime.utcnow())
+            due = len(self._touched) >= TOUCH_BATCH_SIZE or \
+                time.monotonic() - self._last_flush >= TOUCH_FLUSH_SECONDS
+        if due:
+            self.flush_touches()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'max_entries': self.max_entries}
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+analysis_cache = AnalysisCache()
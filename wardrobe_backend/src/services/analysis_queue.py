@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from src.models.wardrobe import db, ClothingItem, WardrobeVersion
+from src.services.ai_service import AIService
+from src.services.photo_storage import photo_storage
+
+# 分析狀態
+ANALYSIS_PENDING = 'pending'
+ANALYSIS_PROCESSING = 'processing'
+ANALYSIS_DONE = 'done'
+ANALYSIS_FAILED = 'failed'
+
+# 可由 AI 分析結果填入的欄位與預設值
+ANALYSIS_TEXT_FIELDS = {
+    'name': '新衣物',
+    'category': '其他',
+    'primary_color': '',
+    'style': '',
+    'material': '',
+}
+ANALYSIS_LIST_FIELDS = ('suitable_seasons', 'suitable_occasions')
+
+DEFAULT_WORKERS = 4
+
+
+def apply_analysis_result(item: ClothingItem, ai_result: Dict, provided_fields: Iterable[str]):
+    """以 AI 分析結果填入用戶未提供的欄位"""
+    provided_fields = set(provided_fields)
+    for field, default in ANALYSIS_TEXT_FIELDS.items():
+        if field not in provided_fields:
+            setattr(item, field, ai_result.get(field, default))
+    for field in ANALYSIS_LIST_FIELDS:
+        if field not in provided_fields:
+            setattr(item, field, json.dumps(ai_result.get(field, [])))
+    item.update_attribute_columns()
+
+
+class AnalysisQueue:
+    """在背景執行緒池中執行衣物圖片分析，完成後更新資料列"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('AI_ANALYSIS_WORKERS', DEFAULT_WORKERS))
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ai-analysis')
+        app.extensions['analysis_queue'] = self
+
+    def submit(self, item_id: int, image_path: str):
+        """排入分析工作（呼叫前資料列需已提交且狀態為 pending）"""
+        self._executor.submit(self._run, item_id, image_path)
+
+    def resume_pending(self):
+        """重新排入上次關閉前未完成的分析"""
+        items = ClothingItem.query.filter(
+            ClothingItem.analysis_status.in_([ANALYSIS_PENDING, ANALYSIS_PROCESSING])
+        ).all()
+        for item in items:
+            image_path = photo_storage.analysis_image_path(item.photo_path)
+            if image_path:
+                item.analysis_status = ANALYSIS_PENDING
+                self.submit(item.id, image_path)
+            else:
+                item.analysis_status = ANALYSIS_FAILED
+        db.session.commit()
+        return len(items)
+
+    def _run(self, item_id: int, image_path: str):
+        with self._app.app_context():
+            item = db.session.get(ClothingItem, item_id)
+            if item is None:
+                return
+            item.analysis_status = ANALYSIS_PROCESSING
+            db.session.commit()
+
+            try:
+                ai_service = AIService(os.getenv('GEMINI_API_KEY'))
+                # 無法分析時標記為失敗，不以預設值覆寫用戶未填寫的欄位
+                ai_result = ai_service.analyze_clothing_image(image_path, fallback=False)
+
+                # 分析期間衣物可能已被刪除或由用戶編輯
+                db.session.expire_all()
+                item = db.session.get(ClothingItem, item_id)
+                if item is None:
+                    return
+                apply_analysis_result(item, ai_result, item.provided_fields())
+                item.analysis_status = ANALYSIS_DONE
+                WardrobeVersion.bump(item.user_id)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.logger.error(f"AI分析失敗 for item {item_id}: {e}")
+                item = db.session.get(ClothingItem, item_id)
+                if item is not None:
+                    item.analysis_status = ANALYSIS_FAILED
+                    db.session.commit()
+
+
+analysis_queue = AnalysisQueue()
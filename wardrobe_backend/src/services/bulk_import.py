@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import os
+import zipfile
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+# 單次匯入上限
+MAX_BULK_ITEMS = 500
+MAX_BULK_FILE_SIZE = 16 * 1024 * 1024
+
+# 中繼資料可填寫的欄位
+METADATA_TEXT_FIELDS = ('name', 'category', 'primary_color', 'style', 'material')
+METADATA_LIST_FIELDS = ('suitable_seasons', 'suitable_occasions')
+
+# 列表欄位字串的分隔符號（CSV 中含逗號的欄位需加引號）
+LIST_SEPARATORS = (';', '|', '、', ',')
+
+
+class BulkImportError(ValueError):
+    """匯入請求格式錯誤"""
+
+
+def _split_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    value = str(value or '')
+    for separator in LIST_SEPARATORS[1:]:
+        value = value.replace(separator, LIST_SEPARATORS[0])
+    return [v.strip() for v in value.split(LIST_SEPARATORS[0]) if v.strip()]
+
+
+def _normalize_metadata(row: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留有填寫的欄位（未填寫的欄位交由 AI 分析）"""
+    values = {}
+    for field in METADATA_TEXT_FIELDS:
+        value = row.get(field)
+        if value is not None and str(value).strip():
+            values[field] = str(value).strip()
+    for field in METADATA_LIST_FIELDS:
+        items = _split_list(row.get(field))
+        if items:
+            values[field] = items
+    return values
+
+
+def parse_metadata(text: str, format_hint: str = '') -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """解析 CSV 或 JSON 中繼資料
+
+    返回 ({檔名: 欄位}, [沒有檔名的列])；JSON 可為列表或 {檔名: 欄位} 物件，CSV 需有標題列。
+    """
+    text = text.strip()
+    if not text:
+        return {}, []
+
+    if format_hint == 'json' or (format_hint != 'csv' and text[0] in '[{'):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise BulkImportError(f"中繼資料 JSON 格式錯誤: {e}")
+        if isinstance(data, dict):
+            rows = [dict(fields or {}, filename=filename) for filename, fields in data.items()]
+        elif isinstance(data, list):
+            rows = data
+        else:
+            raise BulkImportError('中繼資料 JSON 需為列表或物件')
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+
+    by_filename = {}
+    without_photo = []
+    for row in rows:
+        if not isinstance(row, dict):
+            raise BulkImportError('中繼資料每一列需為物件')
+        filename = os.path.basename(str(row.get('filename') or '').strip())
+        if filename:
+            by_filename[filename] = _normalize_metadata(row)
+        else:
+            without_photo.append(_normalize_metadata(row))
+    return by_filename, without_photo
+
+
+def iter_archive_images(archive: IO[bytes], allowed_file) -> Iterator[Tuple[str, Optional[IO[bytes]], Optional[str]]]:
+    """逐一列出 zip 中的圖片，返回 (檔名, 檔案物件, 錯誤訊息)"""
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise BulkImportError('無效的 zip 檔案')
+
+    with zf:
+        for info in zf.infolist():
+            filename = os.path.basename(info.filename)
+            if info.is_dir() or not filename or info.filename.startswith('__MACOSX/') or filename.startswith('.'):
+                continue
+            if not allowed_file(filename):
+                yield filename, None, '不支援的檔案格式'
+            elif info.file_size > MAX_BULK_FILE_SIZE:
+                yield filename, None, '檔案過大'
+            else:
+                with zf.open(info) as source:
+                    yield filename, source, None
@@ -0,0 +1,151 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# 顏色分類映射 - 將相似顏色歸類
+COLOR_CATEGORIES = {
+    '黑色系': ['黑色', '黑', 'black', '深黑', '炭黑'],
+    '白色系': ['白色', '白', 'white', '純白', '米白', '象牙白'],
+    '灰色系': ['灰色', '灰', 'gray', 'grey', '深灰', '淺灰', '炭灰', '銀灰'],
+    '藍色系': ['藍色', '藍', 'blue', '深藍', '淺藍', '海軍藍', '天藍', '牛仔藍', '寶藍'],
+    '紅色系': ['紅色', '紅', 'red', '深紅', '酒紅', '粉紅', '粉色', '桃紅'],
+    '綠色系': ['綠色', '綠', 'green', '深綠', '淺綠', '軍綠', '橄欖綠', '草綠'],
+    '黃色系': ['黃色', '黃', 'yellow', '淺黃', '檸檬黃', '金黃'],
+    '紫色系': ['紫色', '紫', 'purple', '深紫', '淺紫', '薰衣草紫'],
+    '棕色系': ['棕色', '棕', 'brown', '咖啡色', '深棕', '淺棕', '巧克力色'],
+    '米色系': ['米色', '米', 'beige', '卡其', '駝色', '奶油色'],
+    '橙色系': ['橙色', '橘色', 'orange', '橘紅', '橙黃'],
+}
+
+# 模糊匹配常見顏色關鍵字
+COLOR_KEYWORDS = {
+    '黑': '黑色系', '白': '白色系', '灰': '灰色系', '藍': '藍色系',
+    '紅': '紅色系', '綠': '綠色系', '黃': '黃色系', '紫': '紫色系',
+    '棕': '棕色系', '米': '米色系', '橙': '橙色系', '橘': '橙色系',
+    'black': '黑色系', 'white': '白色系', 'gray': '灰色系', 'grey': '灰色系',
+    'blue': '藍色系', 'red': '紅色系', 'green': '綠色系', 'yellow': '黃色系',
+    'purple': '紫色系', 'brown': '棕色系', 'beige': '米色系', 'orange': '橙色系'
+}
+
+# 經典搭配
+CLASSIC_COMBINATIONS = {
+    ('黑色系', '白色系'), ('白色系', '黑色系'),
+    ('黑色系', '灰色系'), ('灰色系', '黑色系'),
+    ('白色系', '灰色系'), ('灰色系', '白色系'),
+    ('藍色系', '白色系'), ('白色系', '藍色系'),
+    ('藍色系', '米色系'), ('米色系', '藍色系'),
+    ('黑色系', '藍色系'), ('藍色系', '黑色系'),
+    ('綠色系', '米色系'), ('米色系', '綠色系'),
+    ('棕色系', '米色系'), ('米色系', '棕色系'),
+}
+
+# 中性色
+NEUTRAL_COLORS = {'黑色系', '白色系', '灰色系', '米色系'}
+
+# 對比色搭配
+CONTRAST_PAIRS = {
+    ('紅色系', '綠色系'), ('綠色系', '紅色系'),
+    ('藍色系', '橙色系'), ('橙色系', '藍色系'),
+    ('黃色系', '紫色系'), ('紫色系', '黃色系'),
+}
+
+# 相鄰色搭配
+ADJACENT_PAIRS = {
+    ('藍色系', '綠色系'), ('綠色系', '藍色系'),
+    ('紅色系', '橙色系'), ('橙色系', '紅色系'),
+    ('黃色系', '橙色系'), ('橙色系', '黃色系'),
+}
+
+UNKNOWN_FAMILY = '未知'
+OTHER_FAMILY = '其他'
+
+# 任一顏色缺失時的分數
+MISSING_COLOR_SCORE = 50
+
+# 原始顏色字串 -> 系別ID 的快取上限
+COLOR_CACHE_SIZE = 4096
+
+
+def family_pair_score(family1: str, family2: str) -> int:
+    """依色彩規則計算兩個顏色系別的相容性分數"""
+    # 同色系給高分
+    if family1 == family2:
+        return 85
+
+    if (family1, family2) in CLASSIC_COMBINATIONS:
+        return 90
+
+    # 中性色與其他顏色的搭配
+    if family1 in NEUTRAL_COLORS or family2 in NEUTRAL_COLORS:
+        return 75
+
+    if (family1, family2) in CONTRAST_PAIRS:
+        return 70
+
+    if (family1, family2) in ADJACENT_PAIRS:
+        return 80
+
+    # 其他情況給予基礎分數
+    return 60
+
+
+class ColorEngine:
+    """預先編譯的顏色引擎：顏色字串轉系別ID，並以系別矩陣查詢相容性分數"""
+
+    def __init__(self, color_categories: Dict[str, List[str]] = COLOR_CATEGORIES,
+                 color_keywords: Dict[str, str] = COLOR_KEYWORDS,
+                 cache_size: int = COLOR_CACHE_SIZE):
+        self.families: List[str] = list(color_categories.keys()) + [OTHER_FAMILY, UNKNOWN_FAMILY]
+        self.family_ids: Dict[str, int] = {name: idx for idx, name in enumerate(self.families)}
+        self.other_id = self.family_ids[OTHER_FAMILY]
+        self.unknown_id = self.family_ids[UNKNOWN_FAMILY]
+
+        # 預先小寫化，保持原本的掃描順序
+        self._category_spellings: List[Tuple[int, Tuple[str, ...]]] = [
+            (self.family_ids[category], tuple(c.lower() for c in colors))
+            for category, colors in color_categories.items()
+        ]
+        self._keywords: List[Tuple[str, int]] = [
+            (keyword, self.family_ids[category]) for keyword, category in color_keywords.items()
+        ]
+
+        # 系別 x 系別 分數矩陣，只建立一次
+        self.matrix: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(family_pair_score(f1, f2) for f2 in self.families)
+            for f1 in self.families
+        )
+
+        self.family_id = lru_cache(maxsize=cache_size)(self._resolve_family_id)
+
+    def _resolve_family_id(self, color: str) -> int:
+        """解析顏色字串的系別ID（結果由 family_id 快取）"""
+        if not color:
+            return self.unknown_id
+
+        color = color.strip().lower()
+
+        # 直接查找顏色系別
+        for family_id, spellings in self._category_spellings:
+            if any(c in color or color in c for c in spellings):
+                return family_id
+
+        for keyword, family_id in self._keywords:
+            if keyword in color:
+                return family_id
+
+        return self.other_id
+
+    def family_name(self, color: str) -> str:
+        """返回顏色字串的系別名稱"""
+        return self.families[self.family_id(color)]
+
+    def pair_score(self, color1: str, color2: str) -> int:
+        """計算兩個顏色字串的相容性分數"""
+        if not color1 or not color2:
+            return MISSING_COLOR_SCORE
+        return self.matrix[self.family_id(color1)][self.family_id(color2)]
+
+
+@lru_cache(maxsize=None)
+def get_color_engine() -> ColorEngine:
+    """取得行程共用的顏色引擎"""
+    return ColorEngine()
@@ -0,0 +1,87 @@
+import gzip
+from typing import Optional, Sequence
+
+from flask import Flask, request
+
+from src.services.lazy_import import lazy_module
+
+# brotli 為選用套件，未安裝時只使用 gzip
+load_brotli = lazy_module('brotli')
+
+# 依偏好排序的壓縮格式
+ENCODINGS = ('br', 'gzip')
+
+# 小於此大小的回應壓縮效益低於成本
+MIN_COMPRESS_SIZE = 512
+
+# 動態回應使用較快的壓縮等級；靜態檔案於啟動時以最高等級預先壓縮
+DYNAMIC_GZIP_LEVEL = 6
+DYNAMIC_BROTLI_QUALITY = 5
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_MIMETYPES = ('application/json',)
+
+
+def available_encodings() -> Sequence[str]:
+    return ENCODINGS if load_brotli() is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: str, offered: Sequence[str]) -> Optional[str]:
+    """依 Accept-Encoding 從 offered（依偏好排序）中選出壓縮格式，不接受任何格式時返回 None"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    best = None
+    for encoding in offered:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    if encoding == 'br':
+        return load_brotli().compress(data, quality=STATIC_BROTLI_QUALITY if static else DYNAMIC_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL if static else DYNAMIC_GZIP_LEVEL, mtime=0)
+
+
+def add_vary(response, header: str = 'Accept-Encoding'):
+    values = [value.strip() for value in response.headers.get('Vary', '').split(',') if value.strip()]
+    if header not in values:
+        response.headers['Vary'] = ', '.join(values + [header])
+
+
+def compress_response(response):
+    """壓縮 JSON 回應（串流、已壓縮或過小的回應維持原樣）"""
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or not 200 <= response.status_code < 300):
+        return response
+
+    add_vary(response)
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app: Flask):
+    """為 JSON 回應啟用壓縮（COMPRESS_RESPONSES 設為 False 可停用，例如由反向代理負責壓縮時）"""
+    if app.config.get('COMPRESS_RESPONSES', True):
+        app.after_request(compress_response)
@@ -0,0 +1,115 @@
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from src.services.lazy_import import lazy_module
+
+# Pillow 在第一次處理圖片時才載入
+load_pil_image = lazy_module('PIL.Image', "Warning: PIL not available. Image processing will be disabled.")
+load_pil_image_ops = lazy_module('PIL.ImageOps')
+
+logger = logging.getLogger(__name__)
+
+# 送給 AI 分析的圖片長邊上限
+ANALYSIS_MAX_SIZE = 1024
+ANALYSIS_SUFFIX = '_analysis.jpg'
+
+# 列表用縮圖（長邊像素）
+THUMBNAIL_SIZES = {
+    'small': 256,
+    'medium': 768,
+}
+
+# 可安全重新編碼（套用方向並移除中繼資料）的原圖格式
+REENCODE_FORMATS = {'JPEG', 'PNG'}
+
+
+def _resized(image, max_size: int):
+    resized = image.copy()
+    resized.thumbnail((max_size, max_size), load_pil_image().LANCZOS)
+    return resized
+
+
+def _web_mode(image):
+    """轉為 WebP/JPEG 可用的色彩模式"""
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _load_oriented(file_path: str):
+    """開啟圖片並依 EXIF 方向轉正，返回 (圖片, 原始格式)"""
+    with load_pil_image().open(file_path) as opened:
+        image_format = opened.format
+        icc_profile = opened.info.get('icc_profile')
+        image = load_pil_image_ops().exif_transpose(opened)
+        image.load()
+    if icc_profile:
+        image.info['icc_profile'] = icc_profile
+    return image, image_format
+
+
+def analysis_image_path(file_path: str) -> str:
+    """返回送給 AI 分析的圖片路徑（沒有縮小版本時使用原圖）"""
+    candidate = os.path.splitext(file_path)[0] + ANALYSIS_SUFFIX
+    return candidate if os.path.exists(candidate) else file_path
+
+
+def ingest_image(file_path: str) -> Tuple[str, Dict[str, str]]:
+    """處理上傳圖片：轉正並移除中繼資料、產生分析用圖片與縮圖
+
+    返回 (分析用圖片路徑, {縮圖名稱: 檔名})；無法處理時返回原圖路徑與空縮圖。
+    """
+    if load_pil_image() is None:
+        return file_path, {}
+
+    try:
+        image, image_format = _load_oriented(file_path)
+        stem = os.path.splitext(file_path)[0]
+        icc_profile = image.info.get('icc_profile')
+
+        # 覆寫原圖，不保留 EXIF（含 GPS 等個人資訊）
+        if image_format in REENCODE_FORMATS:
+            if image_format == 'JPEG':
+                image.convert('RGB').save(file_path, 'JPEG', quality=95, icc_profile=icc_profile)
+            else:
+                image.save(file_path, 'PNG', optimize=True, icc_profile=icc_profile)
+
+        analysis_path = stem + ANALYSIS_SUFFIX
+        _resized(image, ANALYSIS_MAX_SIZE).convert('RGB').save(analysis_path, 'JPEG', quality=85)
+
+        variants = {}
+        for name, max_size in THUMBNAIL_SIZES.items():
+            variant_path = f"{stem}_{name}.webp"
+            _web_mode(_resized(image, max_size)).save(variant_path, 'WEBP', quality=80, method=4)
+            variants[name] = os.path.basename(variant_path)
+
+        return analysis_path, variants
+    except Exception as e:
+        logger.warning(f"圖片處理失敗 {file_path}: {e}")
+        return file_path, {}
+
+
+def prepare_analysis_image(file_path: str) -> Optional[str]:
+    """只產生分析用的縮小圖片（供預覽分析使用），返回路徑；無法處理時返回 None"""
+    if load_pil_image() is None:
+        return None
+
+    try:
+        image, _ = _load_oriented(file_path)
+        analysis_path = os.path.splitext(file_path)[0] + ANALYSIS_SUFFIX
+        _resized(image, ANALYSIS_MAX_SIZE).convert('RGB').save(analysis_path, 'JPEG', quality=85)
+        return analysis_path
+    except Exception as e:
+        logger.warning(f"圖片處理失敗 {file_path}: {e}")
+        return None
+
+
+def remove_image_files(file_path: str):
+    """刪除原圖與所有衍生檔案"""
+    stem = os.path.splitext(file_path)[0]
+    paths = [file_path, stem + ANALYSIS_SUFFIX] + [f"{stem}_{name}.webp" for name in THUMBNAIL_SIZES]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
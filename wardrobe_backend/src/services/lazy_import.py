@@ -0,0 +1,28 @@
+import importlib
+import threading
+from types import ModuleType
+from typing import Callable, Optional
+
+
+def lazy_module(name: str, warning: Optional[str] = None) -> Callable[[], Optional[ModuleType]]:
+    """返回延遲載入模組的函式：首次呼叫時才 import，之後直接返回結果
+
+    模組無法載入時返回 None（只印出一次 warning）。用於 Gemini SDK、Pillow 等
+    載入成本高的選用套件，讓不需要它們的行程（CLI 工具、未呼叫 AI 的 worker）不必負擔。
+    """
+    lock = threading.Lock()
+    state = {}
+
+    def load() -> Optional[ModuleType]:
+        if 'module' not in state:
+            with lock:
+                if 'module' not in state:
+                    try:
+                        state['module'] = importlib.import_module(name)
+                    except ImportError:
+                        state['module'] = None
+                        if warning:
+                            print(warning)
+        return state['module']
+
+    return load
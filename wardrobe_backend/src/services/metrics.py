@@ -0,0 +1,322 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, g, has_request_context, request
+
+# 延遲直方圖的分界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = 'wardrobe_'
+
+# 多 worker 時各 worker 將指標寫入共用目錄的間隔（秒）
+FLUSH_SECONDS = 5
+
+LabelValues = Tuple[Tuple[str, str], ...]
+ExtraSample = Tuple[str, str, str, Dict[str, object], float]
+
+
+def _labels(labels: Dict[str, object]) -> LabelValues:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class Counter:
+    """可依標籤分組的累計計數器"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def empty(self) -> 'Counter':
+        return Counter(self.name, self.help_text)
+
+    def export(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, exported: List[List[Any]]):
+        """加入其他 worker 匯出的數值"""
+        with self._lock:
+            for labels, value in exported:
+                key = tuple(tuple(pair) for pair in labels)
+                self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Optional[Tuple[str, str]], float]]:
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, labels, None, value
+
+
+class Histogram:
+    """可依標籤分組的延遲直方圖（累計分桶，格式同 Prometheus histogram）"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # {標籤: [各分桶計數..., 總和, 次數]}
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            bucket = bisect_left(self.buckets, seconds)
+            if bucket < len(self.buckets):
+                values[bucket] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def empty(self) -> 'Histogram':
+        return Histogram(self.name, self.help_text, self.buckets)
+
+    def export(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(labels), list(counts)] for labels, counts in self._values.items()]
+
+    def merge(self, exported: List[List[Any]]):
+        """加入其他 worker 匯出的數值"""
+        with self._lock:
+            for labels, counts in exported:
+                key = tuple(tuple(pair) for pair in labels)
+                values = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+                for index, count in enumerate(counts):
+                    values[index] += count
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Optional[Tuple[str, str]], float]]:
+        with self._lock:
+            values = {labels: list(counts) for labels, counts in self._values.items()}
+        for labels, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labels, ('le', _format_value(bound)), cumulative
+            yield f'{self.name}_bucket', labels, ('le', '+Inf'), counts[-1]
+            yield f'{self.name}_sum', labels, None, counts[-2]
+            yield f'{self.name}_count', labels, None, counts[-1]
+
+
+class Metrics:
+    """延遲與計數指標，以 Prometheus 文字格式輸出
+
+    多 worker 部署時請求（包含 /api/metrics 本身）會落在任一 worker，因此設定 METRICS_DIR 後
+    每個 worker 定期將自己的指標寫入該目錄，輸出時加總所有 worker 的計數器與直方圖
+    （包含已結束的 worker，計數不會倒退）；gauge 只輸出仍在執行的 worker，並加上 worker 標籤。
+    """
+
+    def __init__(self):
+        self.request_duration = Histogram(METRIC_PREFIX + 'http_request_duration_seconds',
+                                          'HTTP 請求處理時間（串流回應只計到開始傳送）')
+        self.stage_duration = Histogram(METRIC_PREFIX + 'stage_duration_seconds', '請求內各處理階段的耗時')
+        self.external_duration = Histogram(METRIC_PREFIX + 'external_call_duration_seconds',
+                                           '外部服務（Gemini、OpenWeather）呼叫耗時')
+        self.external_errors = Counter(METRIC_PREFIX + 'external_call_errors_total', '外部服務呼叫失敗次數')
+        self.logger = logging.getLogger(__name__)
+        self.directory: Optional[str] = None
+        self._collectors: List[Callable[[], List[ExtraSample]]] = []
+        self._flusher_pid = None
+
+    @property
+    def _metrics(self):
+        return (self.request_duration, self.stage_duration, self.external_duration, self.external_errors)
+
+    def init_app(self, app: Flask):
+        """為每個請求計時，並以 Server-Timing 標頭回傳各階段耗時"""
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['metrics'] = self
+
+        self.directory = app.config.get('METRICS_DIR')
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._start_flusher()
+
+    def register_collector(self, collect: Callable[[], List[ExtraSample]]):
+        """加入其他指標的來源，collect 返回 render 的 extra_samples 格式（如快取統計）"""
+        if collect not in self._collectors:
+            self._collectors.append(collect)
+
+    def collect(self) -> List[ExtraSample]:
+        return [sample for collect in self._collectors for sample in collect()]
+
+    @contextmanager
+    def stage(self, name: str):
+        """計時一個處理階段（在請求中時一併記錄到 Server-Timing）"""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - began
+            self.stage_duration.observe(elapsed, stage=name)
+            if has_request_context() and hasattr(g, 'stage_timings'):
+                g.stage_timings.append((name, elapsed))
+
+    @contextmanager
+    def external_call(self, service: str, operation: str):
+        """計時外部服務呼叫，發生例外時計入錯誤次數後繼續拋出"""
+        began = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.external_errors.inc(service=service, operation=operation)
+            raise
+        finally:
+            self.external_duration.observe(time.perf_counter() - began, service=service, operation=operation)
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+        g.stage_timings = []
+
+    def _finish_request(self, response):
+        started = getattr(g, 'request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.request_duration.observe(elapsed, method=request.method, endpoint=endpoint,
+                                      status=response.status_code)
+
+        timings = [f'{name.replace(".", "-")};dur={seconds * 1000:.1f}' for name, seconds in g.stage_timings]
+        timings.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def render(self, extra_samples: Optional[Sequence[ExtraSample]] = None) -> str:
+        """輸出 Prometheus 文字格式；extra_samples 為 (名稱, 類型, 說明, 標籤, 數值) 的其他指標，
+        未指定時使用 register_collector 加入的來源"""
+        extra_samples = self.collect() if extra_samples is None else list(extra_samples)
+        if not self.directory:
+            return self._format(self._metrics, extra_samples)
+        self.flush(extra_samples)
+        return self._format(*self._aggregate())
+
+    def flush(self, extra_samples: Optional[Sequence[ExtraSample]] = None):
+        """將本 worker 的指標寫入共用目錄（先寫暫存檔再改名，讀取端不會讀到寫到一半的檔案）"""
+        if not self.directory:
+            return
+        extra_samples = self.collect() if extra_samples is None else extra_samples
+        snapshot = {
+            'pid': os.getpid(),
+            'metrics': {metric.name: metric.export() for metric in self._metrics},
+            'extra': [[name, type_name, help_text, {key: str(value) for key, value in labels.items()}, value]
+                      for name, type_name, help_text, labels, value in extra_samples],
+        }
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as target:
+            json.dump(snapshot, target, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def _aggregate(self) -> Tuple[List, List[ExtraSample]]:
+        merged = [metric.empty() for metric in self._metrics]
+        by_name = {metric.name: metric for metric in merged}
+        extra = {}
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.json'))):
+            try:
+                with open(path, encoding='utf-8') as source:
+                    snapshot = json.load(source)
+            except (OSError, ValueError):
+                continue
+            pid = snapshot.get('pid')
+            alive = pid == os.getpid() or _process_alive(pid)
+            for name, exported in snapshot.get('metrics', {}).items():
+                if name in by_name:
+                    by_name[name].merge(exported)
+            for name, type_name, help_text, labels, value in snapshot.get('extra', []):
+                if type_name == 'gauge':
+                    # 各 worker 的目前狀態無法相加，已結束的 worker 不再輸出
+                    if not alive:
+                        continue
+                    labels = dict(labels, worker=str(pid))
+                key = (name, _labels(labels))
+                if key in extra:
+                    extra[key][4] += value
+                else:
+                    extra[key] = [name, type_name, help_text, labels, value]
+        # 同名指標的樣本需連續輸出
+        return merged, sorted((tuple(sample) for sample in extra.values()), key=lambda sample: sample[0])
+
+    def _format(self, metric_list, extra_samples: Sequence[ExtraSample]) -> str:
+        lines = []
+        for metric in metric_list:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for name, labels, extra, value in metric.samples():
+                lines.append(f'{name}{format_labels(labels, extra)} {_format_value(value)}')
+
+        described = set()
+        for name, type_name, help_text, labels, value in extra_samples:
+            name = METRIC_PREFIX + name
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {type_name}')
+            lines.append(f'{name}{format_labels(_labels(labels))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _start_flusher(self):
+        # gunicorn 的 worker 由主行程 fork，執行緒不會被複製，因此以 pid 判斷是否已啟動
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        atexit.register(self._flush_quietly)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.warning(f"寫入指標失敗: {e}")
+
+metrics = Metrics()
@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from src.services.ai_service import ANALYSIS_MODEL_NAME
+from src.services.recommendation_cache import LRUCache
+
+# 修改穿搭分析提示詞時需遞增版本號，使舊的快取結果失效
+OUTFIT_ANALYSIS_PROMPT_VERSION = 1
+
+DEFAULT_WORKERS = 6
+DEFAULT_DEADLINE_MS = 3000
+DEFAULT_MAX_ENTRIES = 2048
+
+
+def outfit_fingerprint(prompt: str) -> str:
+    """以模型與提示詞（穿搭衣物、分數、天氣、場合）計算分析快取鍵"""
+    return hashlib.sha256(f"{ANALYSIS_MODEL_NAME}:{OUTFIT_ANALYSIS_PROMPT_VERSION}:{prompt}".encode()).hexdigest()
+
+
+class OutfitAnalyzer:
+    """為最終推薦的穿搭並行產生 AI 分析，在期限內未完成的穿搭由呼叫端改用範本說明
+
+    逾時的呼叫會在背景繼續執行並寫入快取，下次相同穿搭可直接使用。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, deadline_ms: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('OUTFIT_ANALYSIS_WORKERS', DEFAULT_WORKERS))
+        self.deadline_ms = deadline_ms or float(os.getenv('OUTFIT_ANALYSIS_DEADLINE_MS', DEFAULT_DEADLINE_MS))
+        self.cache = LRUCache(max_entries or int(os.getenv('OUTFIT_ANALYSIS_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)))
+        self.logger = logging.getLogger(__name__)
+        self.timeouts = 0
+        self._executor = None
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def analyze(self, scoring_system, outfits: List[Tuple[float, List[Dict]]], weather: Dict,
+                occasion: str) -> List[Optional[str]]:
+        """返回每套穿搭的分析文字，無法在期限內取得時為 None"""
+        if scoring_system.model is None or not outfits:
+            return [None] * len(outfits)
+
+        prompts = [scoring_system.outfit_analysis_prompt(items, score, weather, occasion) for score, items in outfits]
+        keys = [outfit_fingerprint(prompt) for prompt in prompts]
+        results = [self.cache.get(key) for key in keys]
+
+        pending = {idx: self._submit(keys[idx], scoring_system, prompts[idx])
+                   for idx, result in enumerate(results) if result is None}
+        if pending:
+            done, _ = wait(set(pending.values()), timeout=self.deadline_ms / 1000)
+            for idx, future in pending.items():
+                if future in done and future.exception() is None:
+                    results[idx] = future.result()
+                elif future not in done:
+                    self.timeouts += 1
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.cache.stats(), 'timeouts': self.timeouts, 'inflight': len(self._inflight)}
+
+    def _submit(self, key: str, scoring_system, prompt: str) -> Future:
+        # 相同穿搭同時只呼叫一次模型
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='outfit-analysis')
+                future = self._inflight[key] = self._executor.submit(self._run, key, scoring_system, prompt)
+            return future
+
+    def _run(self, key: str, scoring_system, prompt: str) -> Optional[str]:
+        try:
+            text = scoring_system.request_outfit_analysis(prompt)
+            if text:
+                self.cache.put(key, text)
+            return text or None
+        except Exception as e:
+            self.logger.warning(f"AI 穿搭分析生成錯誤: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+outfit_analyzer = OutfitAnalyzer()
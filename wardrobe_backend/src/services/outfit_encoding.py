@@ -0,0 +1,219 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.services.color_engine import MISSING_COLOR_SCORE, get_color_engine
+
+# 季節與場合的固定詞彙（位元位置固定，可存入資料庫）
+SEASONS = ['春季', '夏季', '秋季', '冬季']
+OCCASIONS = ['日常', '正式', '運動', '約會', '工作', '休閒']
+
+# 場合對應
+OCCASION_MAPPING = {
+    '正式': ['正式', '工作'],
+    '日常': ['日常', '休閒'],
+    '運動': ['運動'],
+    '約會': ['約會', '日常'],
+    '工作': ['工作', '正式']
+}
+
+# 材質關鍵字旗標
+MATERIAL_WARM = 1        # 寒冷時加分
+MATERIAL_LIGHT = 2       # 涼爽時加分
+MATERIAL_BREATHABLE = 4  # 炎熱時加分
+MATERIAL_WATERPROOF = 8  # 雨天加分
+
+MATERIAL_KEYWORDS = {
+    MATERIAL_WARM: ['毛', '厚', '保暖', '羊毛', '絨'],
+    MATERIAL_LIGHT: ['薄', '長袖'],
+    MATERIAL_BREATHABLE: ['棉', '麻', '透氣', '薄', '涼爽'],
+    MATERIAL_WATERPROOF: ['防水', '雨'],
+}
+
+RAINY_WEATHER = ['Rain', 'Thunderstorm', 'Drizzle']
+
+# 保留給詞彙外數值的位元（維持在 SQLite 有號 64 位元整數範圍內）
+OVERFLOW_BIT = 1 << 62
+
+
+def parse_list_field(value: Any) -> Any:
+    """解析季節/場合欄位（JSON 字串或逗號分隔字串）"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except Exception:
+            return [s.strip() for s in value.split(',')]
+    return value or []
+
+
+def material_flags(material: Optional[str]) -> int:
+    """將材質描述轉為關鍵字旗標"""
+    material = (material or '').lower()
+    flags = 0
+    for flag, keywords in MATERIAL_KEYWORDS.items():
+        if any(keyword in material for keyword in keywords):
+            flags |= flag
+    return flags
+
+
+def vocab_mask(values: Any, vocab: Dict[str, int]) -> int:
+    """以詞彙位元編碼季節/場合列表，詞彙外的數值使用溢位位元"""
+    mask = 0
+    for value in values:
+        bit = vocab.get(value)
+        mask |= (1 << bit) if bit is not None else OVERFLOW_BIT
+    return mask
+
+
+SEASON_BITS = {season: idx for idx, season in enumerate(SEASONS)}
+OCCASION_BITS = {occasion: idx for idx, occasion in enumerate(OCCASIONS)}
+
+
+def season_mask(seasons: Any) -> int:
+    return vocab_mask(parse_list_field(seasons), SEASON_BITS)
+
+
+def occasion_mask(occasions: Any) -> int:
+    return vocab_mask(parse_list_field(occasions), OCCASION_BITS)
+
+
+class WardrobeEncoding:
+    """將衣物字典列表編碼為整數屬性陣列，供批次評分使用"""
+
+    def __init__(self, items: Sequence[Dict[str, Any]]):
+        engine = get_color_engine()
+        self.items = list(items)
+        n = len(self.items)
+
+        # 顏色矩陣多一列/欄代表缺少顏色
+        self.missing_color_id = len(engine.families)
+        matrix = np.full((self.missing_color_id + 1, self.missing_color_id + 1), MISSING_COLOR_SCORE, dtype=np.int64)
+        matrix[:-1, :-1] = np.asarray(engine.matrix, dtype=np.int64)
+        self.color_matrix = matrix
+
+        # 場合詞彙：固定詞彙在前，衣櫥內其他場合依序加入
+        self.occasion_bits: Dict[str, int] = dict(OCCASION_BITS)
+        self.style_ids: Dict[str, int] = {}
+
+        self.color_id = np.empty(n, dtype=np.int64)
+        self.style_id = np.empty(n, dtype=np.int64)
+        self.is_outerwear = np.empty(n, dtype=bool)
+        self.is_top = np.empty(n, dtype=bool)
+        self.material = np.empty(n, dtype=np.int64)
+        self.seasons = np.empty(n, dtype=np.int64)
+        self.has_seasons = np.empty(n, dtype=bool)
+        self.occasions = np.empty(n, dtype=np.uint64)
+        self.has_occasions = np.empty(n, dtype=bool)
+
+        for idx, item in enumerate(self.items):
+            color = (item.get('primary_color') or '').strip()
+            self.color_id[idx] = engine.family_id(color) if color else self.missing_color_id
+
+            style = item.get('style')
+            self.style_id[idx] = self._intern_style(style.strip()) if style else -1
+
+            category = (item.get('category') or '').strip()
+            self.is_outerwear[idx] = category == '外套'
+            self.is_top[idx] = category == '上衣'
+            self.material[idx] = material_flags(item.get('material'))
+
+            seasons = parse_list_field(item.get('suitable_seasons', []))
+            self.seasons[idx] = sum(1 << bit for season, bit in SEASON_BITS.items() if season in seasons)
+            self.has_seasons[idx] = bool(seasons)
+
+            occasions = parse_list_field(item.get('suitable_occasions', []))
+            self.occasions[idx] = np.uint64(self._occasion_mask(occasions))
+            self.has_occasions[idx] = bool(occasions)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _intern_style(self, style: str) -> int:
+        return self.style_ids.setdefault(style, len(self.style_ids))
+
+    def _occasion_mask(self, occasions: Iterable[str]) -> int:
+        mask = 0
+        for occasion in occasions:
+            bit = self.occasion_bits.get(occasion)
+            if bit is None and len(self.occasion_bits) < 62:
+                bit = self.occasion_bits[occasion] = len(self.occasion_bits)
+            mask |= (1 << bit) if bit is not None else OVERFLOW_BIT
+        return mask
+
+    def preferred_styles(self, styles: Iterable[str]) -> np.ndarray:
+        """返回風格ID -> 是否為偏好風格的布林表"""
+        table = np.zeros(len(self.style_ids) + 1, dtype=bool)
+        for style in styles:
+            if style in self.style_ids:
+                table[self.style_ids[style]] = True
+        return table
+
+    def occasion_query_mask(self, occasions: Iterable[str]) -> np.uint64:
+        """將要求的場合轉為位元遮罩（不在衣櫥詞彙中的場合不會命中）"""
+        mask = 0
+        for occasion in occasions:
+            bit = self.occasion_bits.get(occasion)
+            if bit is not None:
+                mask |= 1 << bit
+        return np.uint64(mask)
+
+    def criteria_mask(self, season: str, occasion: str, preferred_styles: Iterable[str],
+                      preferred_color_families: Optional[Iterable[int]]) -> np.ndarray:
+        """篩選條件同 filter_items_by_criteria，返回符合條件的布林陣列
+
+        preferred_color_families 為 None 時不限顏色（風格等級 3）。
+        """
+        season_match = ~self.has_seasons | ((self.seasons & (1 << SEASON_BITS[season])) != 0)
+        occasion_match = ~self.has_occasions | ((self.occasions & self.occasion_query_mask([occasion])) != 0)
+        if preferred_color_families is None:
+            return season_match & occasion_match
+
+        style_match = self.preferred_styles(preferred_styles)[self.style_id]
+        color_match = np.isin(self.color_id, list(preferred_color_families))
+        return season_match & occasion_match & (style_match | color_match)
+
+    def item_weather_scores(self, weather: Dict) -> np.ndarray:
+        """計算每件衣物的天氣適應性分數"""
+        temp = weather.get('temperature', 20)
+        weather_main = weather.get('weather_main', 'Clear')
+
+        def has_season(*names: str) -> np.ndarray:
+            bits = sum(1 << SEASON_BITS[name] for name in names)
+            return (self.seasons & bits) != 0
+
+        scores = np.full(len(self), 50, dtype=np.int64)
+
+        # 溫度適應性
+        if temp < 10:  # 寒冷
+            scores += 25 * (self.is_outerwear | ((self.material & MATERIAL_WARM) != 0))
+            scores += 15 * has_season('冬季')
+        elif temp < 18:  # 涼爽
+            scores += 20 * (self.is_outerwear | self.is_top | ((self.material & MATERIAL_LIGHT) != 0))
+            scores += 15 * has_season('秋季', '春季')
+        elif temp < 26:  # 舒適
+            scores += 20 * has_season('春季', '秋季')
+        else:  # 溫暖/炎熱
+            scores += 25 * ((self.material & MATERIAL_BREATHABLE) != 0)
+            scores += 15 * has_season('夏季')
+
+        # 天氣狀況適應性
+        if weather_main in RAINY_WEATHER:
+            scores += 10 * (self.is_outerwear | ((self.material & MATERIAL_WATERPROOF) != 0))
+
+        return np.minimum(100, scores)
+
+    def item_occasion_scores(self, occasion: str) -> np.ndarray:
+        """計算每件衣物的場合適用性分數"""
+        suitable_occasions = OCCASION_MAPPING.get(occasion, [occasion])
+        matched = (self.occasions & self.occasion_query_mask(suitable_occasions)) != 0
+        return np.where(matched, 100, np.where(self.has_occasions, 40, 70))
+
+
+def encode_outfits(outfits: Sequence[Sequence[int]], width: Optional[int] = None) -> np.ndarray:
+    """將每套穿搭的衣物索引列表轉為 N x K 陣列（以 -1 補齊）"""
+    width = width or max((len(outfit) for outfit in outfits), default=0)
+    encoded = np.full((len(outfits), width), -1, dtype=np.int64)
+    for row, outfit in enumerate(outfits):
+        encoded[row, :len(outfit)] = outfit
+    return encoded
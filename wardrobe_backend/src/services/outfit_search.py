@@ -0,0 +1,173 @@
+import heapq
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.outfit_encoding import WardrobeEncoding
+
+# 浮點誤差容許值，避免上界與實際分數相等時被誤剪枝
+BOUND_EPSILON = 1e-9
+
+
+class OutfitSearch:
+    """以分支限界在各類別的完整組合中搜尋最高分的 k 套穿搭"""
+
+    def __init__(self, scoring_system, encoding: WardrobeEncoding, weather: Dict, occasion: str, style_level: int,
+                 k: int = 3, min_score: float = 0, budget_ms: Optional[float] = None):
+        self.scoring_system = scoring_system
+        self.encoding = encoding
+        self.weather = weather
+        self.occasion = occasion
+        self.style_level = style_level
+        self.k = k
+        self.min_score = min_score
+        self.budget_ms = budget_ms
+
+        # 每件衣物的單品分數只需計算一次
+        self.weather_scores = encoding.item_weather_scores(weather)
+        self.occasion_scores = encoding.item_occasion_scores(occasion)
+        preferred_styles = scoring_system.style_level_preferences.get(style_level, {}).get('styles', [])
+        self.preferred = encoding.preferred_styles(preferred_styles)
+
+        self.complete = True
+        self.evaluated = 0
+        self.pruned = 0
+        self._heap: List[Tuple[float, int, Tuple[int, ...]]] = []
+        self._sequence = 0
+        self._deadline = None
+        self._restore_order = None
+
+    def search(self, layouts: Sequence[Sequence[Sequence[int]]]) -> List[Tuple[float, List[int]]]:
+        """搜尋所有版型（每個版型為數個類別欄位的衣物索引列表），返回 (分數, 衣物索引) 由高到低"""
+        for _ in self.iter_search(layouts):
+            pass
+        return self.results()
+
+    def iter_search(self, layouts: Sequence[Sequence[Sequence[int]]]) -> Iterator[List[Tuple[float, List[int]]]]:
+        """逐步搜尋，每當目前最佳的 k 套穿搭改變時產生一次排名（格式同 search）"""
+        if self.budget_ms is not None:
+            self._deadline = time.perf_counter() + self.budget_ms / 1000
+
+        for layout in layouts:
+            if len(layout) < 2 or not all(layout):
+                continue
+            yield from self._search_layout(layout)
+            if not self.complete:
+                break
+
+    def results(self) -> List[Tuple[float, List[int]]]:
+        """目前找到的最佳穿搭，由高到低"""
+        ranked = sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))
+        return [(score, list(outfit)) for score, _, outfit in ranked]
+
+    def _threshold(self) -> float:
+        if len(self._heap) < self.k:
+            return self.min_score
+        return max(self.min_score, self._heap[0][0])
+
+    def _expired(self) -> bool:
+        return self._deadline is not None and time.perf_counter() > self._deadline
+
+    def _search_layout(self, layout: Sequence[Sequence[int]]) -> Iterator[List[Tuple[float, List[int]]]]:
+        """搜尋單一版型，時間用盡時將 complete 設為 False"""
+        item_scores = self.weather_scores + self.occasion_scores
+
+        # 衣物較少的欄位放前面，最後一個欄位整批評分；欄位內先試單品分數高的衣物
+        order = sorted(range(len(layout)), key=lambda position: len(layout[position]))
+        slots = [np.asarray(sorted(layout[position], key=lambda idx: -item_scores[idx]), dtype=np.int64)
+                 for position in order]
+        # 評分後依原版型順序（上衣、下著、外套、鞋子）輸出
+        self._restore_order = np.argsort(order)
+        matrix = self.encoding.color_matrix
+        slot_colors = [np.unique(self.encoding.color_id[slot]) for slot in slots]
+        slot_styles = [self.encoding.style_id[slot] for slot in slots]
+
+        bounds = {
+            'size': len(slots),
+            'pairs': len(slots) * (len(slots) - 1) // 2,
+            'weather': [int(self.weather_scores[slot].max()) for slot in slots],
+            'occasion': [int(self.occasion_scores[slot].max()) for slot in slots],
+            'colors': slot_colors,
+            # 剩餘欄位之間的最佳配色
+            'slot_pairs': [[int(matrix[np.ix_(ci, cj)].max()) for cj in slot_colors] for ci in slot_colors],
+            # 欄位內可能的最佳風格匹配分數（無風格衣物不計入）
+            'style': [
+                100 if self.preferred[styles[styles >= 0]].any() else (40 if (styles >= 0).any() else 0)
+                for styles in slot_styles
+            ],
+        }
+        yield from self._descend(slots, bounds, [])
+
+    def _upper_bound(self, bounds: Dict, chosen: List[int]) -> float:
+        """部分穿搭在剩餘欄位任意選擇下可達到的分數上界"""
+        depth = len(chosen)
+        remaining = range(depth, bounds['size'])
+        matrix = self.encoding.color_matrix
+        colors = self.encoding.color_id[chosen]
+
+        # 顏色：已選衣物兩兩精確計算，涉及剩餘欄位的配對取最佳值
+        color_sum = sum(int(matrix[colors[i], colors[j]]) for i in range(depth) for j in range(i + 1, depth))
+        for s in remaining:
+            if depth:
+                color_sum += int(matrix[np.ix_(colors, bounds['colors'][s])].max(axis=1).sum())
+            color_sum += sum(bounds['slot_pairs'][s][t] for t in range(s + 1, bounds['size']))
+        color_bound = color_sum / bounds['pairs']
+
+        # 風格：匹配平均不超過最佳單品，已出現多種風格時一致性加分只會更低
+        styles = [int(style) for style in self.encoding.style_id[chosen] if style >= 0]
+        match_values = [100 if self.preferred[style] else 40 for style in styles]
+        match_values += [bounds['style'][s] for s in remaining]
+        unique_styles = len(set(styles))
+        consistency_bound = 100 if unique_styles <= 1 else max(60, 100 - (unique_styles - 1) * 15)
+        style_bound = max(50, (max(match_values, default=0) + consistency_bound) / 2)
+
+        weather_bound = (int(self.weather_scores[chosen].sum()) + sum(bounds['weather'][s] for s in remaining)) / bounds['size']
+        occasion_bound = (int(self.occasion_scores[chosen].sum()) + sum(bounds['occasion'][s] for s in remaining)) / bounds['size']
+
+        return min(100, color_bound * 0.3 + style_bound * 0.25 + weather_bound * 0.25 + occasion_bound * 0.2)
+
+    def _descend(self, slots: List[np.ndarray], bounds: Dict, chosen: List[int]) -> Iterator[List[Tuple[float, List[int]]]]:
+        if self._expired():
+            self.complete = False
+            return
+
+        if self._upper_bound(bounds, chosen) < self._threshold() - BOUND_EPSILON:
+            self.pruned += 1
+            return
+
+        depth = len(chosen)
+        if depth == len(slots) - 1:
+            if self._score_leaves(slots[-1], chosen):
+                yield self.results()
+            return
+
+        for idx in slots[depth]:
+            yield from self._descend(slots, bounds, chosen + [int(idx)])
+            if not self.complete:
+                return
+
+    def _score_leaves(self, last_slot: np.ndarray, chosen: List[int]) -> bool:
+        """將前綴與最後一個欄位的所有衣物組合後整批評分，返回最佳穿搭是否改變"""
+        outfits = np.empty((len(last_slot), len(chosen) + 1), dtype=np.int64)
+        outfits[:, :-1] = chosen
+        outfits[:, -1] = last_slot
+        scores = self.scoring_system.calculate_outfit_scores_batch(
+            self.encoding, outfits, self.weather, self.occasion, self.style_level
+        )
+        self.evaluated += len(outfits)
+
+        improved = False
+        for row in np.flatnonzero(scores >= self._threshold() - BOUND_EPSILON):
+            score = float(scores[row])
+            if score < self.min_score:
+                continue
+            self._sequence += 1
+            entry = (score, -self._sequence, tuple(int(idx) for idx in outfits[row][self._restore_order]))
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+                improved = True
+            elif entry > self._heap[0]:
+                heapq.heapreplace(self._heap, entry)
+                improved = True
+        return improved
@@ -0,0 +1,443 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import abort, send_from_directory
+from sqlalchemy import or_
+
+from src.models.wardrobe import db
+from src.models.photo import StoredPhoto
+from src.services.image_pipeline import ingest_image, prepare_analysis_image, remove_image_files
+from src.services.image_pipeline import analysis_image_path as legacy_analysis_image_path
+
+# 圖片網址前綴（photo_path 與 photo_variants 儲存的格式）
+URL_PREFIX = '/uploads/'
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_INGEST_WORKERS = 4
+
+# add_variant 以此名稱加入分析用圖片（其他名稱為縮圖）
+ANALYSIS_VARIANT = 'analysis'
+
+# 內容定址的檔案不會改變，可長期快取
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def stored_name(digest: str, suffix: str) -> str:
+    """依內容雜湊產生兩層分片的儲存名稱（如 ab/cd/abcd...jpg），每層最多 256 個目錄"""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+def is_content_addressed(name: str) -> bool:
+    return '/' in name
+
+
+def file_digest(path: str) -> Tuple[str, int]:
+    """返回檔案內容的 SHA-256 與大小"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class PhotoStore(ABC):
+    """圖片儲存後端介面，以儲存名稱存取檔案
+
+    名稱由 PhotoStorage 決定（內容雜湊分片路徑），查詢只需計算名稱、不需列出目錄。
+    S3 相容儲存等後端實作所有抽象方法後在 PHOTO_STORES 註冊，以 PHOTO_STORE 設定選用；
+    缺少任何方法時在建立時即失敗。
+    """
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, name: str, local_path: str):
+        """將本機檔案移入儲存（完成前不可讀到不完整的內容）"""
+
+    @abstractmethod
+    def open(self, name: str) -> IO[bytes]:
+        ...
+
+    @abstractmethod
+    def delete(self, name: str):
+        ...
+
+    def local_path(self, name: str) -> Optional[str]:
+        """本機檔案路徑（供圖片處理與 AI 分析讀取），非本機儲存或不存在時返回 None"""
+        return None
+
+    @abstractmethod
+    def send(self, name: str, max_age: Optional[int] = None):
+        """回傳圖片的回應（遠端儲存可改為重新導向至簽名網址）"""
+
+    def staging_folder(self) -> str:
+        """上傳處理中的暫存目錄"""
+        return tempfile.gettempdir()
+
+
+class LocalPhotoStore(PhotoStore):
+    """儲存在本機目錄（UPLOAD_FOLDER），舊版的平面檔名與分片路徑共用同一目錄"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split('/'))
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def put(self, name: str, local_path: str):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(local_path, path)
+
+    def open(self, name: str) -> IO[bytes]:
+        return open(self._path(name), 'rb')
+
+    def delete(self, name: str):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, name: str) -> Optional[str]:
+        path = self._path(name)
+        return path if os.path.exists(path) else None
+
+    def send(self, name: str, max_age: Optional[int] = None):
+        return send_from_directory(self.root, name, max_age=max_age)
+
+    def staging_folder(self) -> str:
+        # 與儲存位置在同一檔案系統，put 時可直接改名
+        return os.path.join(self.root, '.staging')
+
+
+PHOTO_STORES = {
+    'local': LocalPhotoStore,
+}
+
+
+class StagedPhoto:
+    """已上傳、尚未寫入儲存的圖片（暫存目錄中的原圖與衍生檔案）
+
+    digest 為儲存的原圖內容雜湊，上傳的圖片在轉正並移除中繼資料後才計算（prepare），
+    儲存的檔案內容與名稱一致；source_digest 為上傳內容的雜湊，用於在處理前找出相同的上傳。
+    """
+
+    TEMP_STEM = 'photo'
+
+    def __init__(self, source_digest: str, extension: str, folder: str, size: int):
+        self.source_digest = source_digest
+        self.digest = source_digest
+        self.extension = extension
+        self.folder = folder
+        self.size = size
+        self.original_path = self.temp_path(f'.{extension}')
+        # 衍生檔案名稱接在雜湊之後的部分（如 _analysis.jpg、_small.webp）
+        self.analysis_suffix: Optional[str] = None
+        self.variant_suffixes: Dict[str, str] = {}
+        # existing: 儲存中已有相同內容；processed: 衍生檔案已在暫存目錄中
+        self.existing = False
+        self.processed = False
+
+    @property
+    def name(self) -> str:
+        return stored_name(self.digest, f'.{self.extension}')
+
+    @property
+    def analysis_name(self) -> Optional[str]:
+        return stored_name(self.digest, self.analysis_suffix) if self.analysis_suffix else None
+
+    @property
+    def variants(self) -> Dict[str, str]:
+        return {variant: stored_name(self.digest, suffix) for variant, suffix in self.variant_suffixes.items()}
+
+    @property
+    def photo_url(self) -> str:
+        return URL_PREFIX + self.name
+
+    @property
+    def variant_urls(self) -> Dict[str, str]:
+        return {variant: URL_PREFIX + name for variant, name in self.variants.items()}
+
+    def temp_path(self, suffix: str) -> str:
+        return os.path.join(self.folder, self.TEMP_STEM + suffix)
+
+    def use_stored(self, photo: StoredPhoto):
+        """沿用已儲存的相同圖片（不需再處理，暫存檔案於 publish 時捨棄）"""
+        stem = stored_name(photo.digest, '')
+        self.digest = photo.digest
+        self.extension = photo.extension
+        self.analysis_suffix = photo.analysis_name[len(stem):] if photo.analysis_name else None
+        self.variant_suffixes = {variant: name[len(stem):] for variant, name in photo.variant_names().items()}
+        self.existing = True
+
+
+class PhotoStorage:
+    """內容定址的圖片儲存：相同內容只存一份，以 stored_photos.refcount 記錄引用的衣物數
+
+    上傳流程：stage（暫存並找出相同的上傳）→ prepare（產生分析用圖片與縮圖並以處理後的內容命名）→
+    在衣物的交易中 acquire → 提交後 publish。刪除時在交易中 release，提交後由背景執行緒
+    回收引用數為 0 的檔案。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('BULK_INGEST_WORKERS', DEFAULT_INGEST_WORKERS))
+        self.logger = logging.getLogger(__name__)
+        self.store: Optional[PhotoStore] = None
+        self._app = None
+        self._collector = None
+
+    def init_app(self, app):
+        backend = app.config.get('PHOTO_STORE', 'local')
+        if backend not in PHOTO_STORES:
+            raise ValueError(f"未知的圖片儲存後端: {backend}")
+        self.store = PHOTO_STORES[backend](app.config['UPLOAD_FOLDER'])
+        self._app = app
+        self._collector = ThreadPoolExecutor(max_workers=1, thread_name_prefix='photo-collector')
+        app.extensions['photo_storage'] = self
+
+    def stage(self, source: IO[bytes], extension: str) -> StagedPhoto:
+        """將上傳內容寫入暫存目錄，已儲存過相同內容時沿用既有的圖片"""
+        staging = self.store.staging_folder()
+        os.makedirs(staging, exist_ok=True)
+        folder = tempfile.mkdtemp(dir=staging)
+
+        extension = extension.lower()
+        digest = hashlib.sha256()
+        size = 0
+        with open(os.path.join(folder, f'{StagedPhoto.TEMP_STEM}.{extension}'), 'wb') as target:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                target.write(chunk)
+                size += len(chunk)
+
+        staged = StagedPhoto(digest.hexdigest(), extension, folder, size)
+        # 相同的上傳，或內容即為已儲存的原圖（例如匯入本系統匯出的備份）
+        photo = StoredPhoto.query.filter(or_(StoredPhoto.source_digest == staged.source_digest,
+                                             StoredPhoto.digest == staged.source_digest)).first()
+        if photo is not None:
+            staged.use_stored(photo)
+        return staged
+
+    def add_variant(self, staged: StagedPhoto, variant: str, source: IO[bytes], extension: str):
+        """加入既有的縮圖或分析用圖片（例如備份檔中的衍生檔案），原圖不再重新處理"""
+        if staged.existing:
+            return
+        suffix = f'_{variant}.{extension.lower()}'
+        with open(staged.temp_path(suffix), 'wb') as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        if variant == ANALYSIS_VARIANT:
+            staged.analysis_suffix = suffix
+        else:
+            staged.variant_suffixes[variant] = suffix
+        staged.processed = True
+
+    def ensure_analysis_image(self, staged: StagedPhoto):
+        """以 add_variant 加入衍生檔案但缺少分析用圖片時，由原圖產生"""
+        if staged.existing or staged.analysis_suffix:
+            return
+        analysis_path = prepare_analysis_image(staged.original_path)
+        if analysis_path:
+            staged.analysis_suffix = os.path.basename(analysis_path)[len(StagedPhoto.TEMP_STEM):]
+
+    def prepare(self, staged: StagedPhoto):
+        """產生分析用圖片與縮圖並以處理後的內容命名（相同內容已在儲存中時略過）"""
+        if staged.existing or staged.processed:
+            return
+        self._process(staged)
+        self._use_stored_if_present(staged)
+
+    def prepare_all(self, staged_photos: List[StagedPhoto]):
+        """並行處理多張圖片"""
+        pending = [staged for staged in staged_photos if not (staged.existing or staged.processed)]
+        if len(pending) > 1:
+            # 工作執行緒只處理檔案，資料庫查詢留在呼叫端的執行緒
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bulk-ingest') as executor:
+                list(executor.map(self._process, pending))
+        else:
+            for staged in pending:
+                self._process(staged)
+        for staged in pending:
+            self._use_stored_if_present(staged)
+
+    def _process(self, staged: StagedPhoto, rename: bool = True):
+        """轉正、移除中繼資料並產生衍生檔案；rename 時以處理後的原圖內容重新計算雜湊"""
+        analysis_path, variants = ingest_image(staged.original_path)
+        stem_length = len(StagedPhoto.TEMP_STEM)
+        staged.analysis_suffix = os.path.basename(analysis_path)[stem_length:] \
+            if analysis_path != staged.original_path else None
+        staged.variant_suffixes = {variant: filename[stem_length:] for variant, filename in variants.items()}
+        staged.processed = True
+        if rename:
+            staged.digest, staged.size = file_digest(staged.original_path)
+
+    def _use_stored_if_present(self, staged: StagedPhoto):
+        # 不同的上傳（例如只有 EXIF 不同）處理後可能與已儲存的圖片相同
+        photo = db.session.get(StoredPhoto, staged.digest)
+        if photo is not None:
+            staged.use_stored(photo)
+
+    def acquire(self, staged: StagedPhoto):
+        """在目前的交易中增加引用數（提交後再呼叫 publish）"""
+        updated = StoredPhoto.query.filter_by(digest=staged.digest) \
+            .update({StoredPhoto.refcount: StoredPhoto.refcount + 1}, synchronize_session=False)
+        if not updated:
+            db.session.add(StoredPhoto(
+                digest=staged.digest,
+                source_digest=staged.source_digest,
+                extension=staged.extension,
+                size=staged.size,
+                analysis_name=staged.analysis_name,
+                variants=json.dumps(staged.variants) if staged.variants else None,
+                refcount=1
+            ))
+            db.session.flush()
+
+    def publish(self, staged: StagedPhoto) -> Optional[str]:
+        """將暫存檔案移入儲存（內容已存在時直接捨棄），返回分析用圖片的本機路徑"""
+        try:
+            # 引用數已提交，回收程序不會再刪除這些檔案
+            if not self.store.exists(staged.name):
+                if not staged.processed:
+                    # 沿用的圖片在 acquire 前已被回收：重新產生，名稱維持資料列記錄的雜湊
+                    self._process(staged, rename=False)
+                # 原圖最後寫入：原圖存在即代表衍生檔案皆已完成
+                for suffix in [staged.analysis_suffix, *staged.variant_suffixes.values()]:
+                    if suffix and os.path.exists(staged.temp_path(suffix)):
+                        self.store.put(stored_name(staged.digest, suffix), staged.temp_path(suffix))
+                self.store.put(staged.name, staged.original_path)
+        finally:
+            self.discard(staged)
+        return self.store.local_path(staged.analysis_name or staged.name)
+
+    def discard(self, staged: StagedPhoto):
+        shutil.rmtree(staged.folder, ignore_errors=True)
+
+    @contextmanager
+    def scratch_folder(self) -> Iterator[str]:
+        """不寫入儲存的暫存目錄（例如預覽分析），離開時連同內容刪除"""
+        staging = self.store.staging_folder()
+        os.makedirs(staging, exist_ok=True)
+        folder = tempfile.mkdtemp(dir=staging)
+        try:
+            yield folder
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def name_for_url(self, url: Optional[str]) -> Optional[str]:
+        if not url or not url.startswith(URL_PREFIX):
+            return None
+        return url[len(URL_PREFIX):]
+
+    def release(self, photo_path: Optional[str]) -> Optional[str]:
+        """在目前的交易中減少引用數，返回提交後要交給 collect_later 回收的名稱"""
+        name = self.name_for_url(photo_path)
+        if not name:
+            return None
+        if is_content_addressed(name):
+            digest = os.path.basename(name).split('.', 1)[0]
+            StoredPhoto.query.filter(StoredPhoto.digest == digest, StoredPhoto.refcount > 0) \
+                .update({StoredPhoto.refcount: StoredPhoto.refcount - 1}, synchronize_session=False)
+        return name
+
+    def collect_later(self, names: Iterable[Optional[str]]):
+        """在背景回收已沒有引用的圖片（刪除請求不需等待檔案刪除）"""
+        names = [name for name in names if name]
+        if names:
+            self._collector.submit(self._collect, names)
+
+    def collect_unreferenced(self):
+        """回收引用數為 0 的圖片（例如回收前行程結束）"""
+        with self._app.app_context():
+            digests = [digest for (digest,) in db.session.query(StoredPhoto.digest).filter(StoredPhoto.refcount <= 0)]
+        if digests:
+            self.collect_later(stored_name(digest, '') for digest in digests)
+
+    def _collect(self, names: List[str]):
+        with self._app.app_context():
+            for name in names:
+                try:
+                    if is_content_addressed(name):
+                        self._collect_content_addressed(os.path.basename(name).split('.', 1)[0])
+                    else:
+                        # 舊版平面檔名沒有共用，直接刪除原圖與衍生檔案
+                        path = self.store.local_path(name)
+                        if path:
+                            remove_image_files(path)
+                except Exception as e:
+                    db.session.rollback()
+                    self.logger.error(f"回收圖片失敗 {name}: {e}")
+
+    def _collect_content_addressed(self, digest: str):
+        photo = StoredPhoto.query.filter(StoredPhoto.digest == digest, StoredPhoto.refcount <= 0).first()
+        if photo is None:
+            db.session.rollback()
+            return
+        names = [stored_name(digest, f'.{photo.extension}'), photo.analysis_name, *photo.variant_names().values()]
+
+        # 在刪除資料列的交易中刪除檔案：同時上傳相同內容的 acquire 需等待此交易結束，
+        # 之後的 publish 會重新寫入檔案
+        deleted = StoredPhoto.query.filter(StoredPhoto.digest == digest, StoredPhoto.refcount <= 0) \
+            .delete(synchronize_session=False)
+        if deleted:
+            for name in names:
+                if name:
+                    self.store.delete(name)
+        db.session.commit()
+
+    def analysis_url(self, photo_path: Optional[str]) -> Optional[str]:
+        """內容定址圖片的分析用圖片網址（供匯出備份），沒有時返回 None"""
+        name = self.name_for_url(photo_path)
+        if not name or not is_content_addressed(name):
+            return None
+        photo = self._stored_photo(name)
+        return URL_PREFIX + photo.analysis_name if photo is not None and photo.analysis_name else None
+
+    def analysis_image_path(self, photo_path: Optional[str]) -> Optional[str]:
+        """衣物圖片的分析用圖片本機路徑（沒有時使用原圖），圖片不存在時返回 None"""
+        name = self.name_for_url(photo_path)
+        if not name:
+            return None
+        if is_content_addressed(name):
+            photo = self._stored_photo(name)
+            if photo is not None and photo.analysis_name:
+                return self.store.local_path(photo.analysis_name) or self.store.local_path(name)
+            return self.store.local_path(name)
+        path = self.store.local_path(name)
+        if path is None:
+            return None
+        return legacy_analysis_image_path(path)
+
+    def _stored_photo(self, name: str) -> Optional[StoredPhoto]:
+        return db.session.get(StoredPhoto, os.path.basename(name).split('.', 1)[0])
+
+    def open(self, url: str) -> Optional[IO[bytes]]:
+        """以圖片網址開啟檔案，不存在時返回 None"""
+        name = self.name_for_url(url)
+        try:
+            return self.store.open(name) if name else None
+        except FileNotFoundError:
+            return None
+
+    def send(self, name: str):
+        """回傳 /uploads/ 下的圖片，內容定址的檔案可長期快取"""
+        if any(not part or part.startswith('.') for part in name.split('/')):
+            abort(404)
+        return self.store.send(name, max_age=IMMUTABLE_MAX_AGE if is_content_addressed(name) else None)
+
+
+photo_storage = PhotoStorage()
@@ -0,0 +1,28 @@
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_held = {}
+
+
+def acquire_process_lock(path: str) -> bool:
+    """以檔案鎖確保多個 worker 中只有一個執行背景工作，取得後持有到行程結束
+
+    不支援檔案鎖的平台（Windows）一律返回 True。
+    """
+    if fcntl is None or path in _held:
+        return True
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_file = open(path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    _held[path] = lock_file
+    return True
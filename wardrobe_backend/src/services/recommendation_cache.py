@@ -0,0 +1,70 @@
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# 推薦結果會隨溫度改變的分界點：季節判斷（15/20/25）、外套版型（22）
+# 與天氣適應性評分（10/18/26）；同一區間內的溫度得到相同的推薦
+TEMPERATURE_THRESHOLDS = (10, 15, 18, 20, 22, 25, 26)
+
+
+def temperature_bucket(temperature: float) -> int:
+    return bisect_right(TEMPERATURE_THRESHOLDS, temperature)
+
+
+class LRUCache:
+    """執行緒安全的記憶體內 LRU 快取"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                'max_entries': self.max_entries}
+
+
+class RecommendationCache(LRUCache):
+    """以（用戶、衣櫥版本、推薦條件）為鍵的推薦結果快取
+
+    衣櫥版本在衣物新增/修改/刪除時遞增，舊版本的項目不會再被查詢並逐漸被淘汰。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        super().__init__(max_entries or int(os.getenv('RECOMMENDATION_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)))
+
+    @staticmethod
+    def key(user_id: int, version: int, season: str, occasion: str, style_level: int,
+            weather: Dict[str, Any]) -> Tuple:
+        return (int(user_id), version, season, occasion, style_level,
+                temperature_bucket(weather.get('temperature', 20)), weather.get('weather_main', 'Clear'))
+
+
+recommendation_cache = RecommendationCache()
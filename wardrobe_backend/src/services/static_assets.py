@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from typing import Dict, Optional
+
+from flask import request, send_file
+
+from src.services.compression import ENCODINGS, add_vary, available_encodings, compress, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+# Vite 建置的檔名含內容雜湊（如 index-EgLWOFeH.js），內容不會改變
+HASHED_FILENAME = re.compile(r'-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+HASHED_DIRECTORY = 'assets/'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 未含雜湊的檔案（index.html 等）每次以 ETag 確認是否更新
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.mjs', '.css', '.json', '.map', '.svg', '.txt', '.xml', '.ico', '.wasm'}
+MIN_PRECOMPRESS_SIZE = 1024
+# 壓縮後至少要小 10% 才保留
+MAX_COMPRESSED_RATIO = 0.9
+
+FILE_EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+class StaticAsset:
+    """靜態檔案的內容雜湊、快取策略與預先壓縮的版本"""
+
+    def __init__(self, path: str, mimetype: str, etag: str, immutable: bool, variants: Dict[str, str]):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.immutable = immutable
+        self.variants = variants
+
+
+class StaticManifest:
+    """啟動時建立的靜態檔案索引，請求時不需查詢檔案系統
+
+    可壓縮的檔案以最高壓縮等級產生 gzip/brotli 版本，依內容雜湊存放在 cache_folder，
+    重新啟動或多個 worker 時直接沿用。建置後新增的檔案需重新啟動才會提供。
+    """
+
+    def __init__(self, static_folder: str, cache_folder: Optional[str] = None):
+        self.static_folder = static_folder
+        self.cache_folder = cache_folder
+        self.assets: Dict[str, StaticAsset] = {}
+        if os.path.isdir(static_folder):
+            self._build()
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path)
+
+    def send(self, asset: StaticAsset):
+        """依 Accept-Encoding 傳送預先壓縮的版本，並設定快取標頭"""
+        encoding = None
+        if asset.variants:
+            offered = [name for name in ENCODINGS if name in asset.variants]
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), offered)
+
+        # 不同壓縮格式為不同表示，ETag 需不同
+        response = send_file(asset.variants[encoding] if encoding else asset.path, mimetype=asset.mimetype,
+                             etag=f'{asset.etag}-{encoding}' if encoding else asset.etag, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            add_vary(response)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+        return response
+
+    def _build(self):
+        if self.cache_folder:
+            os.makedirs(self.cache_folder, exist_ok=True)
+        for root, _, filenames in os.walk(self.static_folder):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                relative = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                try:
+                    self.assets[relative] = self._load(relative, path)
+                except OSError as e:
+                    logger.warning(f"讀取靜態檔案失敗 {relative}: {e}")
+
+    def _load(self, relative: str, path: str) -> StaticAsset:
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+        immutable = relative.startswith(HASHED_DIRECTORY) and bool(HASHED_FILENAME.search(relative))
+
+        variants = {}
+        extension = os.path.splitext(relative)[1].lower()
+        if self.cache_folder and extension in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_PRECOMPRESS_SIZE:
+            for encoding in available_encodings():
+                variant_path = self._precompress(data, digest, encoding)
+                if variant_path:
+                    variants[encoding] = variant_path
+        return StaticAsset(path, mimetype, digest[:20], immutable, variants)
+
+    def _precompress(self, data: bytes, digest: str, encoding: str) -> Optional[str]:
+        """返回壓縮檔路徑（已存在時直接使用），壓縮效益不足時返回 None"""
+        variant_path = os.path.join(self.cache_folder, digest + FILE_EXTENSIONS[encoding])
+        if os.path.exists(variant_path):
+            return variant_path if os.path.getsize(variant_path) <= len(data) * MAX_COMPRESSED_RATIO else None
+
+        compressed = compress(data, encoding, static=True)
+        # 先寫入暫存檔再改名，避免多個行程同時產生時讀到不完整的檔案
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_folder)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(compressed)
+        os.replace(temp_path, variant_path)
+        return variant_path if len(compressed) <= len(data) * MAX_COMPRESSED_RATIO else None
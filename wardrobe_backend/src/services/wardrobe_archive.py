@@ -0,0 +1,258 @@
+import io
+import json
+import os
+import time
+import zipfile
+from datetime import datetime
+from typing import IO, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import load_only
+
+from src.models.wardrobe import db, ClothingItem, FavoriteOutfit, FavoriteOutfitItem, WardrobeVersion
+from src.services.analysis_queue import ANALYSIS_PENDING, ANALYSIS_PROCESSING, ANALYSIS_FAILED
+from src.services.photo_storage import photo_storage, ANALYSIS_VARIANT
+
+ARCHIVE_FORMAT = 'ai-wardrobe-export'
+ARCHIVE_VERSION = 1
+
+MANIFEST_NAME = 'manifest.json'
+ITEMS_NAME = 'clothing_items.jsonl'
+FAVORITES_NAME = 'favorite_outfits.jsonl'
+PHOTOS_DIR = 'photos/'
+
+CHUNK_SIZE = 64 * 1024
+QUERY_BATCH_SIZE = 200
+
+# 匯出/匯入的衣物欄位（id 與 user_id 於匯入時重新指定）
+ITEM_FIELDS = ('name', 'category', 'primary_color', 'style', 'material', 'suitable_seasons',
+               'suitable_occasions', 'usage_count', 'analysis_status', 'user_fields')
+
+
+class ArchiveError(ValueError):
+    """匯入的備份檔格式錯誤"""
+
+
+class _StreamBuffer(io.RawIOBase):
+    """只能寫入的暫存緩衝，供 ZipFile 寫入後由產生器取出"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _photo_urls(item: ClothingItem) -> Dict[str, str]:
+    """衣物引用的圖片網址（原圖、縮圖與分析用圖片），{欄位名稱: 網址}"""
+    urls = {}
+    if item.photo_path:
+        urls['photo'] = item.photo_path
+        analysis_url = photo_storage.analysis_url(item.photo_path)
+        if analysis_url:
+            urls[ANALYSIS_VARIANT] = analysis_url
+    for name, url in (json.loads(item.photo_variants) if item.photo_variants else {}).items():
+        urls[name] = url
+    return urls
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def iter_export_archive(user_id: int) -> Iterator[bytes]:
+    """逐段產生用戶衣櫥的 zip 備份（衣物、收藏穿搭與圖片），記憶體用量與衣櫥大小無關"""
+    return (chunk for chunk in _iter_export_chunks(user_id) if chunk)
+
+
+def _iter_export_chunks(user_id: int) -> Iterator[bytes]:
+    buffer = _StreamBuffer()
+    date_time = time.localtime()[:6]
+
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        def entry(name, compress_type):
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.compress_type = compress_type
+            return archive.open(info, 'w')
+
+        # 衣物資料，逐列寫入
+        item_count = 0
+        with entry(ITEMS_NAME, zipfile.ZIP_DEFLATED) as target:
+            query = ClothingItem.query.filter_by(user_id=user_id).order_by(ClothingItem.id) \
+                .yield_per(QUERY_BATCH_SIZE)
+            for item in query:
+                files = {key: os.path.basename(url) for key, url in _photo_urls(item).items()}
+                record = {field: getattr(item, field) for field in ITEM_FIELDS}
+                record.update(id=item.id, created_at=_timestamp(item.created_at), photos=files)
+                target.write((json.dumps(record, ensure_ascii=False) + '\n').encode())
+                item_count += 1
+                yield buffer.drain()
+
+        # 收藏穿搭（以匯出檔中的衣物 ID 引用）
+        favorite_count = 0
+        with entry(FAVORITES_NAME, zipfile.ZIP_DEFLATED) as target:
+            favorites = FavoriteOutfit.query.filter_by(user_id=user_id).order_by(FavoriteOutfit.id) \
+                .yield_per(QUERY_BATCH_SIZE)
+            for favorite in favorites:
+                item_ids = [item_id for (item_id,) in db.session.query(FavoriteOutfitItem.item_id)
+                            .filter_by(favorite_id=favorite.id).order_by(FavoriteOutfitItem.position)]
+                record = {'id': favorite.id, 'explanation': favorite.explanation, 'score': favorite.score,
+                          'created_at': _timestamp(favorite.created_at), 'item_ids': item_ids}
+                target.write((json.dumps(record, ensure_ascii=False) + '\n').encode())
+                favorite_count += 1
+                yield buffer.drain()
+
+        # 圖片已壓縮，直接儲存（再查詢一次；多件衣物共用的圖片只寫入一次）
+        photo_rows = ClothingItem.query.filter_by(user_id=user_id).order_by(ClothingItem.id) \
+            .options(load_only(ClothingItem.photo_path, ClothingItem.photo_variants)) \
+            .yield_per(QUERY_BATCH_SIZE)
+        written = set()
+        for item in photo_rows:
+            for url in _photo_urls(item).values():
+                filename = os.path.basename(url)
+                if filename in written:
+                    continue
+                source = photo_storage.open(url)
+                if source is None:
+                    continue
+                written.add(filename)
+                with source, entry(PHOTOS_DIR + filename, zipfile.ZIP_STORED) as target:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        target.write(chunk)
+                        yield buffer.drain()
+
+        manifest = {
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'exported_at': datetime.utcnow().isoformat(),
+            'user_id': user_id,
+            'clothing_items': item_count,
+            'favorite_outfits': favorite_count,
+        }
+        with entry(MANIFEST_NAME, zipfile.ZIP_DEFLATED) as target:
+            target.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode())
+
+    yield buffer.drain()
+
+
+def _read_jsonl(archive: zipfile.ZipFile, name: str) -> Iterator[Dict]:
+    if name not in archive.namelist():
+        return
+    with archive.open(name) as source:
+        for line in io.TextIOWrapper(source, encoding='utf-8'):
+            if line.strip():
+                yield json.loads(line)
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def import_archive(file: IO[bytes], user_id: int) -> Dict[str, int]:
+    """將 iter_export_archive 產生的備份匯入指定用戶（單一交易，失敗時不留下任何資料與圖片）"""
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise ArchiveError('無效的備份檔')
+
+    staged_photos = []
+    try:
+        with archive:
+            try:
+                manifest = json.loads(archive.read(MANIFEST_NAME))
+            except (KeyError, ValueError):
+                raise ArchiveError('備份檔缺少 manifest.json')
+            if manifest.get('format') != ARCHIVE_FORMAT or manifest.get('version', 0) > ARCHIVE_VERSION:
+                raise ArchiveError('不支援的備份檔格式或版本')
+
+            names = set(archive.namelist())
+            id_map = {}
+            pending = []
+            for record in _read_jsonl(archive, ITEMS_NAME):
+                # 圖片依內容存入儲存（已有相同圖片時共用）
+                photos = {key: os.path.basename(filename) for key, filename in (record.get('photos') or {}).items()}
+                photos = {key: filename for key, filename in photos.items() if PHOTOS_DIR + filename in names}
+                staged = None
+                if 'photo' in photos:
+                    stem, extension = os.path.splitext(photos['photo'])
+                    with archive.open(PHOTOS_DIR + photos['photo']) as source:
+                        staged = photo_storage.stage(source, extension.lstrip('.'))
+                    staged_photos.append(staged)
+                    # 已有相同圖片時以下皆略過
+                    if stem == staged.source_digest:
+                        # 檔名即內容雜湊：已處理過的圖片，沿用備份檔中的縮圖與分析用圖片
+                        for key, filename in photos.items():
+                            if key != 'photo':
+                                with archive.open(PHOTOS_DIR + filename) as source:
+                                    photo_storage.add_variant(staged, key, source,
+                                                              os.path.splitext(filename)[1].lstrip('.'))
+                        photo_storage.ensure_analysis_image(staged)
+                    else:
+                        # 舊版平面檔名的圖片未經轉正與移除中繼資料，與上傳相同處理並以處理後的內容命名
+                        photo_storage.prepare(staged)
+
+                values = {field: record.get(field) for field in ITEM_FIELDS}
+                if values['analysis_status'] in (ANALYSIS_PENDING, ANALYSIS_PROCESSING):
+                    values['analysis_status'] = ANALYSIS_FAILED
+                created_at = _parse_datetime(record.get('created_at'))
+                if created_at:
+                    values['created_at'] = created_at
+                variants = staged.variant_urls if staged else {}
+                item = ClothingItem(
+                    user_id=user_id,
+                    photo_path=staged.photo_url if staged else None,
+                    photo_variants=json.dumps(variants) if variants else None,
+                    **values
+                )
+                item.name = item.name or '新衣物'
+                item.category = item.category or '其他'
+                item.usage_count = item.usage_count or 0
+                item.update_attribute_columns()
+                db.session.add(item)
+                if staged:
+                    photo_storage.acquire(staged)
+                pending.append((record.get('id'), item))
+
+                if len(pending) >= QUERY_BATCH_SIZE:
+                    db.session.flush()
+                    id_map.update((old_id, item.id) for old_id, item in pending)
+                    pending.clear()
+            db.session.flush()
+            id_map.update((old_id, item.id) for old_id, item in pending)
+
+            favorite_count = 0
+            for record in _read_jsonl(archive, FAVORITES_NAME):
+                favorite = FavoriteOutfit(user_id=user_id, explanation=record.get('explanation'),
+                                          score=record.get('score'))
+                favorite.created_at = _parse_datetime(record.get('created_at')) or datetime.utcnow()
+                db.session.add(favorite)
+                db.session.flush()
+                item_ids = [id_map[item_id] for item_id in record.get('item_ids', []) if item_id in id_map]
+                db.session.add_all(FavoriteOutfitItem(favorite_id=favorite.id, position=position, item_id=item_id)
+                                   for position, item_id in enumerate(item_ids))
+                favorite_count += 1
+
+            WardrobeVersion.bump(user_id)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for staged in staged_photos:
+            photo_storage.discard(staged)
+        raise
+
+    for staged in staged_photos:
+        photo_storage.publish(staged)
+    # 同一張圖片被多件衣物引用時只計算一次
+    photo_count = len({staged.digest for staged in staged_photos})
+    return {'clothing_items': len(id_map), 'favorite_outfits': favorite_count, 'photos': photo_count}
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_STALE_SECONDS = 3600
+HTTP_POOL_SIZE = 10
+# 等待同一座標進行中抓取的上限（略大於 One Call API 請求的逾時）
+FETCH_WAIT_SECONDS = 15
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """返回行程共用、具連線池的 HTTP session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+class WeatherCache:
+    """以座標為鍵的天氣快取：TTL 內直接回傳，過期但未超過 stale 期限時先回傳舊資料並在背景更新"""
+
+    def __init__(self, ttl: Optional[float] = None, stale: Optional[float] = None):
+        self.ttl = ttl or float(os.getenv('WEATHER_CACHE_TTL', DEFAULT_TTL_SECONDS))
+        self.stale = stale or float(os.getenv('WEATHER_CACHE_STALE', DEFAULT_STALE_SECONDS))
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[float, float], Tuple[float, Dict[str, Any]]] = {}
+        self._refreshing = set()
+        self._fetching: Dict[Tuple[float, float], threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(lat: float, lon: float) -> Tuple[float, float]:
+        # 約 1 公里精度，同城市的查詢共用快取
+        return round(lat, 2), round(lon, 2)
+
+    def get(self, key: Tuple[float, float], fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """取得天氣資料，必要時呼叫 fetch 取得最新資料"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            age = now - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                return entry[1]
+            if age < self.stale:
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch)
+                return entry[1]
+
+        self.misses += 1
+        return self._fetch_once(key, fetch) or (entry[1] if entry else None)
+
+    def refresh(self, key: Tuple[float, float], fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """立即取得最新資料並寫入快取"""
+        data = fetch()
+        if data is not None:
+            with self._lock:
+                self._entries[key] = (time.monotonic(), data)
+        return data
+
+    def _fetch_once(self, key: Tuple[float, float], fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """同一座標同時只抓取一次，其他請求等待該次結果"""
+        with self._lock:
+            pending = self._fetching.get(key)
+            if pending is None:
+                pending = self._fetching[key] = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            pending.wait(FETCH_WAIT_SECONDS)
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None and time.monotonic() - entry[0] < self.ttl else None
+
+        try:
+            return self.refresh(key, fetch)
+        finally:
+            with self._lock:
+                self._fetching.pop(key, None)
+            pending.set()
+
+    def is_fresh(self, key: Tuple[float, float]) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def _refresh_in_background(self, key: Tuple[float, float], fetch: Callable[[], Optional[Dict[str, Any]]]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(key, fetch)
+            except Exception as e:
+                self.logger.error(f"背景更新天氣失敗 for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name='weather-refresh', daemon=True).start()
+
+
+weather_cache = WeatherCache()
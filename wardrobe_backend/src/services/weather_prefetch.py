@@ -0,0 +1,91 @@
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from src.models.user import User
+from src.services.ai_service import WeatherService
+from src.services.weather_cache import weather_cache
+
+# 預設在快取 TTL（600 秒）到期前更新
+DEFAULT_INTERVAL_SECONDS = 480
+DEFAULT_JITTER_SECONDS = 30
+DEFAULT_CONCURRENCY = 4
+
+
+class WeatherPrefetcher:
+    """定期為用戶所在城市與常用城市預先抓取天氣，寫入天氣快取"""
+
+    def __init__(self, interval: Optional[float] = None, jitter: Optional[float] = None,
+                 concurrency: Optional[int] = None):
+        self.interval = interval or float(os.getenv('WEATHER_PREFETCH_INTERVAL', DEFAULT_INTERVAL_SECONDS))
+        self.jitter = jitter if jitter is not None else float(os.getenv('WEATHER_PREFETCH_JITTER', DEFAULT_JITTER_SECONDS))
+        self.concurrency = concurrency or int(os.getenv('WEATHER_PREFETCH_CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.logger = logging.getLogger(__name__)
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self._app = app
+        app.extensions['weather_prefetcher'] = self
+
+    def start(self) -> bool:
+        """啟動背景排程（未設定 WEATHER_API_KEY 或已停用時不啟動）"""
+        if os.getenv('WEATHER_PREFETCH_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            return False
+        if not os.getenv('WEATHER_API_KEY') or (self._thread and self._thread.is_alive()):
+            return False
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='weather-prefetch', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def target_cities(self) -> List[str]:
+        """用戶所在城市與台灣主要城市（以英文名稱去重）"""
+        city_map = WeatherService.TAIWAN_CITIES
+        with self._app.app_context():
+            locations = [location for (location,) in User.query.with_entities(User.location).distinct() if location]
+        cities = {city_map.get(location, location) for location in locations}
+        cities.update(city_map.values())
+        return sorted(cities)
+
+    def prefetch_once(self) -> int:
+        """抓取一輪天氣，返回成功的城市數"""
+        service = WeatherService(os.getenv('WEATHER_API_KEY'))
+        cities = self.target_cities()
+
+        def refresh(city):
+            with self._app.app_context():
+                try:
+                    return service.refresh_city_weather(city)
+                except Exception as e:
+                    self.logger.error(f"預先抓取天氣失敗 for {city}: {e}")
+                    return False
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='weather-prefetch') as executor:
+            refreshed = sum(1 for ok in executor.map(refresh, cities) if ok)
+
+        self.logger.info(f"天氣預先抓取完成 {refreshed}/{len(cities)}，快取狀態 {weather_cache.stats()}")
+        return refreshed
+
+    def _loop(self):
+        # 啟動時加入隨機延遲，避免多個 worker 同時抓取
+        if self._stop.wait(random.uniform(0, self.jitter)):
+            return
+        while not self._stop.is_set():
+            try:
+                self.prefetch_once()
+            except Exception as e:
+                self.logger.error(f"天氣預先抓取排程錯誤: {e}")
+            if self._stop.wait(self.interval + random.uniform(-self.jitter, self.jitter)):
+                return
+
+
+weather_prefetcher = WeatherPrefetcher()
@@ -0,0 +1,9 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import create_app, env_flag
+
+# 正式環境 WSGI 入口（例如 gunicorn -c gunicorn.conf.py）
+# 資料庫初始化由 gunicorn 主行程在啟動 worker 前執行一次，worker 不再寫入結構
+app = create_app({'INIT_DATABASE': env_flag('INIT_DATABASE', False)})
@@ -0,0 +1,20 @@
+import pytest
+
+from src.main import create_app
+
+
+@pytest.fixture(scope='session')
+def static_cache_folder(tmp_path_factory):
+    """前端檔案的預先壓縮結果在測試間共用（壓縮只需進行一次）"""
+    return str(tmp_path_factory.mktemp('static_cache'))
+
+
+@pytest.fixture
+def app(tmp_path, static_cache_folder):
+    """使用暫存資料庫與上傳目錄的應用程式（不啟動背景工作）"""
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'BACKGROUND_TASKS': False,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'STATIC_CACHE_FOLDER': static_cache_folder,
+    })
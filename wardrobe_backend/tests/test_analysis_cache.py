@@ -0,0 +1,42 @@
+from src.models.analysis_cache import AnalysisCacheEntry
+from src.models.wardrobe import db, ClothingItem
+from src.services.analysis_cache import AnalysisCache
+
+
+def test_hit_does_not_commit_caller_session(app):
+    cache = AnalysisCache(max_entries=10)
+    with app.app_context():
+        cache.put('a' * 64, {'name': '襯衫'})
+
+        db.session.add(ClothingItem(user_id=1, name='未提交', category='上衣'))
+        db.session.flush()
+        assert cache.get('a' * 64) == {'name': '襯衫'}
+        assert cache.get('b' * 64) is None
+        db.session.rollback()
+
+        assert ClothingItem.query.filter_by(name='未提交').count() == 0
+
+
+def test_touches_are_flushed_in_batches(app):
+    cache = AnalysisCache(max_entries=10)
+    with app.app_context():
+        cache.put('a' * 64, {'name': '襯衫'})
+        for _ in range(3):
+            cache.get('a' * 64)
+        assert db.session.get(AnalysisCacheEntry, 'a' * 64).hits == 0
+
+        cache.flush_touches()
+        db.session.expire_all()
+        assert db.session.get(AnalysisCacheEntry, 'a' * 64).hits == 3
+        assert cache.stats()['hits'] == 3
+
+
+def test_evicts_least_recently_used(app):
+    cache = AnalysisCache(max_entries=2)
+    with app.app_context():
+        cache.put('a' * 64, {'name': 'a'})
+        cache.put('b' * 64, {'name': 'b'})
+        cache.get('a' * 64)
+        cache.put('c' * 64, {'name': 'c'})
+
+        assert {key for (key,) in db.session.query(AnalysisCacheEntry.cache_key)} == {'a' * 64, 'c' * 64}
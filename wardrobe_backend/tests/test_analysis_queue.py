@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from src.models.wardrobe import db, ClothingItem
+from src.services.ai_service import AIService, ClothingAnalysisError
+from src.services.analysis_queue import analysis_queue, ANALYSIS_PENDING, ANALYSIS_FAILED
+
+
+def test_analysis_without_fallback_raises(monkeypatch, tmp_path):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    ai_service = AIService(None)
+    assert ai_service.analyze_clothing_image(str(tmp_path / 'missing.jpg'))['confidence'] == 0.0
+    with pytest.raises(ClothingAnalysisError):
+        ai_service.analyze_clothing_image(str(tmp_path / 'missing.jpg'), fallback=False)
+
+
+def test_failed_analysis_keeps_user_fields(app, monkeypatch, tmp_path):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    with app.app_context():
+        item = ClothingItem(user_id=1, name='我的外套', category='外套', primary_color='',
+                            suitable_seasons=json.dumps([]), suitable_occasions=json.dumps([]),
+                            analysis_status=ANALYSIS_PENDING, user_fields=json.dumps(['name', 'category']))
+        db.session.add(item)
+        db.session.commit()
+        item_id = item.id
+
+    analysis_queue._run(item_id, str(tmp_path / 'photo.jpg'))
+
+    with app.app_context():
+        item = db.session.get(ClothingItem, item_id)
+        assert item.analysis_status == ANALYSIS_FAILED
+        assert (item.name, item.category, item.primary_color, item.style) == ('我的外套', '外套', '', None)
+        assert json.loads(item.suitable_seasons) == []
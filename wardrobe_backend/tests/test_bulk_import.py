@@ -0,0 +1,47 @@
+import io
+import json
+import os
+
+import pytest
+
+from src.models.wardrobe import ClothingItem, WardrobeVersion
+from src.routes import clothing
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (30, 60, 90)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_failed_batch_keeps_committed_items(app, monkeypatch):
+    original_bump = WardrobeVersion.bump.__func__
+    calls = []
+
+    def bump_failing_first_batch(cls, user_id):
+        calls.append(user_id)
+        if len(calls) == 1:
+            raise RuntimeError('database is locked')
+        return original_bump(cls, user_id)
+
+    monkeypatch.setattr(WardrobeVersion, 'bump', classmethod(bump_failing_first_batch))
+    rows = [{'name': f'衣物{index}', 'category': '上衣'} for index in range(clothing.BULK_COMMIT_SIZE + 20)]
+    response = app.test_client().post('/api/clothing/bulk', data={
+        'metadata': json.dumps(rows),
+        'photos': [(io.BytesIO(png_bytes()), 'first.png')],
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    # 第一批（圖片與前 99 列）失敗，第二批已提交
+    assert data['created'] == 21
+    assert data['failed'] == clothing.BULK_COMMIT_SIZE
+    failed = [item for item in data['items'] if not item['success']]
+    assert failed[0]['filename'] == 'first.png' and 'database is locked' in failed[0]['error']
+    created_ids = [item['item_id'] for item in data['items'] if item['success']]
+    with app.app_context():
+        assert sorted(created_ids) == sorted(item_id for (item_id,) in ClothingItem.query.with_entities(ClothingItem.id))
+    uploads = app.config['UPLOAD_FOLDER']
+    assert [name for _, _, names in os.walk(uploads) for name in names] == []
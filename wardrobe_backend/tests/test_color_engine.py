@@ -0,0 +1,126 @@
+import itertools
+
+import pytest
+
+from src.services.ai_service import OutfitScoringSystem
+from src.services.color_engine import COLOR_CATEGORIES, ColorEngine
+
+# 舊版 OutfitScoringSystem.color_compatibility 的所有鍵（各種顏色寫法）
+LEGACY_COMPATIBILITY_SPELLINGS = [
+    '黑色', '黑', 'black', '深黑',
+    '白色', '白', 'white', '純白', '米白',
+    '灰色', '灰', 'gray', 'grey', '深灰', '淺灰', '炭灰',
+    '藍色', '藍', 'blue', '深藍', '淺藍', '海軍藍', '天藍', '牛仔藍',
+    '紅色', '紅', 'red', '深紅', '酒紅', '粉紅', '粉色',
+    '綠色', '綠', 'green', '深綠', '淺綠', '軍綠', '橄欖綠',
+    '黃色', '黃', 'yellow', '淺黃', '檸檬黃',
+    '紫色', '紫', 'purple', '深紫', '淺紫',
+    '米色', '米', 'beige', '卡其', '駝色',
+    '棕色', '棕', 'brown', '咖啡色', '深棕',
+    '橙色', '橘色', 'orange',
+    '銀色', '銀', 'silver',
+    '金色', '金', 'gold',
+]
+
+# 大小寫、空白、複合寫法與無法辨識的顏色
+EXTRA_SPELLINGS = ['', '  Black ', 'NAVY', 'Dark Blue', '淡藍色', '藍白條紋', '螢光綠', '酒紅色', '透明', '多色']
+
+SPELLINGS = list(dict.fromkeys(
+    [color for colors in COLOR_CATEGORIES.values() for color in colors]
+    + LEGACY_COMPATIBILITY_SPELLINGS + EXTRA_SPELLINGS
+))
+
+
+def legacy_normalize_color(color):
+    """顏色引擎之前的 OutfitScoringSystem._normalize_color"""
+    if not color:
+        return '未知'
+
+    color = color.strip().lower()
+
+    for category, colors in COLOR_CATEGORIES.items():
+        if any(c.lower() in color or color in c.lower() for c in colors):
+            return category
+
+    color_keywords = {
+        '黑': '黑色系', '白': '白色系', '灰': '灰色系', '藍': '藍色系',
+        '紅': '紅色系', '綠': '綠色系', '黃': '黃色系', '紫': '紫色系',
+        '棕': '棕色系', '米': '米色系', '橙': '橙色系', '橘': '橙色系',
+        'black': '黑色系', 'white': '白色系', 'gray': '灰色系', 'grey': '灰色系',
+        'blue': '藍色系', 'red': '紅色系', 'green': '綠色系', 'yellow': '黃色系',
+        'purple': '紫色系', 'brown': '棕色系', 'beige': '米色系', 'orange': '橙色系'
+    }
+    for keyword, category in color_keywords.items():
+        if keyword in color:
+            return category
+
+    return '其他'
+
+
+def legacy_color_compatibility_score(color1, color2):
+    """顏色引擎之前的 OutfitScoringSystem._get_color_compatibility_score"""
+    if not color1 or not color2:
+        return 50
+
+    norm_color1 = legacy_normalize_color(color1)
+    norm_color2 = legacy_normalize_color(color2)
+
+    if norm_color1 == norm_color2:
+        return 85
+
+    classic_combinations = [
+        ('黑色系', '白色系'), ('白色系', '黑色系'),
+        ('黑色系', '灰色系'), ('灰色系', '黑色系'),
+        ('白色系', '灰色系'), ('灰色系', '白色系'),
+        ('藍色系', '白色系'), ('白色系', '藍色系'),
+        ('藍色系', '米色系'), ('米色系', '藍色系'),
+        ('黑色系', '藍色系'), ('藍色系', '黑色系'),
+        ('綠色系', '米色系'), ('米色系', '綠色系'),
+        ('棕色系', '米色系'), ('米色系', '棕色系'),
+    ]
+    if (norm_color1, norm_color2) in classic_combinations:
+        return 90
+
+    neutral_colors = ['黑色系', '白色系', '灰色系', '米色系']
+    if norm_color1 in neutral_colors or norm_color2 in neutral_colors:
+        return 75
+
+    contrast_pairs = [
+        ('紅色系', '綠色系'), ('綠色系', '紅色系'),
+        ('藍色系', '橙色系'), ('橙色系', '藍色系'),
+        ('黃色系', '紫色系'), ('紫色系', '黃色系'),
+    ]
+    if (norm_color1, norm_color2) in contrast_pairs:
+        return 70
+
+    adjacent_pairs = [
+        ('藍色系', '綠色系'), ('綠色系', '藍色系'),
+        ('紅色系', '橙色系'), ('橙色系', '紅色系'),
+        ('黃色系', '橙色系'), ('橙色系', '黃色系'),
+    ]
+    if (norm_color1, norm_color2) in adjacent_pairs:
+        return 80
+
+    return 60
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return ColorEngine()
+
+
+@pytest.mark.parametrize('color', SPELLINGS + [None])
+def test_family_matches_legacy_normalization(engine, color):
+    assert engine.family_name(color) == legacy_normalize_color(color)
+
+
+def test_pair_scores_match_legacy(engine):
+    for color1, color2 in itertools.product(SPELLINGS + [None], repeat=2):
+        assert engine.pair_score(color1, color2) == legacy_color_compatibility_score(color1, color2), (color1, color2)
+
+
+def test_scoring_system_uses_engine():
+    scorer = OutfitScoringSystem()
+    for color1, color2 in itertools.product(SPELLINGS, repeat=2):
+        assert scorer._normalize_color(color1) == legacy_normalize_color(color1)
+        assert scorer._get_color_compatibility_score(color1, color2) == legacy_color_compatibility_score(color1, color2)
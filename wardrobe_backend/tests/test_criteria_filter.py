@@ -0,0 +1,30 @@
+import itertools
+
+import numpy as np
+
+from benchmarks.wardrobe_generator import EXTRA_OCCASIONS, generate_wardrobe, insert_wardrobe
+from src.models.wardrobe import ClothingItem
+from src.routes.recommendations import criteria_mask, filter_items_by_criteria, query_items_by_criteria
+from src.services.ai_service import OutfitScoringSystem, STYLE_LEVEL_PREFERENCES
+from src.services.outfit_encoding import OCCASIONS, SEASONS
+
+
+def test_sql_filter_matches_python_filter(app):
+    with app.app_context():
+        insert_wardrobe(generate_wardrobe(600, seed=11))
+        # 其他用戶的衣物不應出現在結果中
+        insert_wardrobe(generate_wardrobe(50, seed=12, user_id=2))
+
+        all_items = [item.to_dict() for item in ClothingItem.query.filter_by(user_id=1).order_by(ClothingItem.id)]
+        scoring_system = OutfitScoringSystem()
+        encoding = scoring_system.encode_items(all_items)
+
+        occasions = OCCASIONS + EXTRA_OCCASIONS + ['海邊']
+        for season, occasion, style_level in itertools.product(SEASONS, occasions, STYLE_LEVEL_PREFERENCES):
+            expected = [item['id'] for item in filter_items_by_criteria(all_items, season, occasion, style_level)]
+            queried = sorted(item.id for item in query_items_by_criteria(1, season, occasion, style_level))
+            assert queried == sorted(expected), (season, occasion, style_level)
+
+            mask = criteria_mask(scoring_system, encoding, season, occasion, style_level)
+            assert [all_items[index]['id'] for index in np.flatnonzero(mask)] == expected, \
+                (season, occasion, style_level)
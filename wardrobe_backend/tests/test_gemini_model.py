@@ -0,0 +1,38 @@
+import pytest
+
+from src.services import ai_service
+from src.services.ai_service import AIService, OutfitScoringSystem
+
+
+class FakeGenAI:
+    def __init__(self):
+        self.configured = []
+
+    def configure(self, api_key):
+        self.configured.append(api_key)
+
+    def GenerativeModel(self, name):
+        return object()
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    genai = FakeGenAI()
+    monkeypatch.setattr(ai_service, 'load_genai', lambda: genai)
+    monkeypatch.setattr(ai_service, 'gemini_available', lambda: True)
+    monkeypatch.setattr(ai_service, '_gemini_models', {})
+    return genai
+
+
+def test_model_is_built_once_per_key(fake_genai):
+    scorers = [OutfitScoringSystem('key') for _ in range(3)]
+    analyzer = AIService('key')
+
+    assert fake_genai.configured == ['key']
+    assert all(scorer.model is analyzer.model for scorer in scorers)
+
+
+def test_no_model_without_key(fake_genai, monkeypatch):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    assert OutfitScoringSystem().model is None
+    assert fake_genai.configured == []
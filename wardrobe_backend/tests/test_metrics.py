@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from src.main import create_app
+from src.services.metrics import metrics
+
+DEAD_PID = 2 ** 22 + 1
+
+
+def sample_value(text, line_prefix):
+    values = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(line_prefix)]
+    assert len(values) == 1, line_prefix
+    return float(values[0])
+
+
+@pytest.fixture
+def metrics_app(tmp_path, static_cache_folder):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'BACKGROUND_TASKS': False,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'STATIC_CACHE_FOLDER': static_cache_folder,
+        'METRICS_DIR': str(tmp_path / 'metrics'),
+    })
+    yield app
+    metrics.directory = None
+
+
+def write_worker_snapshot(directory, pid, errors, cache_entries):
+    snapshot = {
+        'pid': pid,
+        'metrics': {'wardrobe_external_call_errors_total': [[[['operation', 'onecall'], ['service', 'openweather']],
+                                                             errors]]},
+        'extra': [['cache_entries', 'gauge', '快取目前的項目數', {'cache': 'recommendation'}, cache_entries],
+                  ['cache_misses_total', 'counter', '快取未命中次數', {'cache': 'recommendation'}, 5]],
+    }
+    with open(os.path.join(directory, f'{pid}.json'), 'w', encoding='utf-8') as target:
+        json.dump(snapshot, target)
+
+
+def test_metrics_are_summed_across_workers(metrics_app):
+    directory = metrics_app.config['METRICS_DIR']
+    own_errors = sum(value for labels, value in metrics.external_errors.export()
+                     if labels == [('operation', 'onecall'), ('service', 'openweather')])
+    own_misses = next(value for name, _, _, labels, value in metrics.collect()
+                      if name == 'cache_misses_total' and labels == {'cache': 'recommendation'})
+    write_worker_snapshot(directory, os.getppid(), errors=3, cache_entries=7)
+    write_worker_snapshot(directory, DEAD_PID, errors=2, cache_entries=9)
+
+    text = metrics_app.test_client().get('/api/metrics').get_data(as_text=True)
+
+    # 計數器包含已結束的 worker
+    assert sample_value(text, 'wardrobe_external_call_errors_total{operation="onecall",service="openweather"}') \
+        == own_errors + 5
+    assert sample_value(text, 'wardrobe_cache_misses_total{cache="recommendation"}') == own_misses + 10
+    # gauge 只列出執行中的 worker
+    assert sample_value(text, f'wardrobe_cache_entries{{cache="recommendation",worker="{os.getppid()}"}}') == 7
+    assert f'worker="{DEAD_PID}"' not in text
+    assert f'worker="{os.getpid()}"' in text
+    assert os.path.exists(os.path.join(directory, f'{os.getpid()}.json'))
+
+
+def test_metrics_without_directory_report_this_process(app):
+    text = app.test_client().get('/api/metrics').get_data(as_text=True)
+    assert '# TYPE wardrobe_http_request_duration_seconds histogram' in text
+    assert 'worker=' not in text
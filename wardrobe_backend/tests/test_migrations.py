@@ -0,0 +1,103 @@
+import json
+import sqlite3
+
+import pytest
+
+from src.main import create_app, init_database
+from src.models.migrations import MIGRATIONS, current_version
+from src.models.wardrobe import db, ClothingItem, FavoriteOutfit, FavoriteOutfitItem
+from src.services.color_engine import get_color_engine
+from src.services.outfit_encoding import season_mask, occasion_mask
+
+# 加入遷移之前（初始版本）由 db.create_all() 建立的結構
+BASELINE_SCHEMA = """
+CREATE TABLE clothing_items (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    primary_color VARCHAR(50),
+    style VARCHAR(50),
+    material VARCHAR(100),
+    suitable_seasons TEXT,
+    suitable_occasions TEXT,
+    photo_path VARCHAR(255),
+    usage_count INTEGER,
+    created_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE TABLE favorite_outfits (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    outfit_data TEXT NOT NULL,
+    score FLOAT,
+    created_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE TABLE users (
+    id INTEGER NOT NULL,
+    username VARCHAR(50) NOT NULL,
+    email VARCHAR(100),
+    style_level INTEGER,
+    location VARCHAR(100),
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE (username)
+);
+"""
+
+BASELINE_ITEMS = [
+    (1, 1, '白襯衫', '上衣', '白色', '正式', '棉', '["春季", "秋季"]', '["工作"]', '/uploads/a.jpg', 3),
+    (2, 1, '牛仔褲', '下著', '深藍', '休閒', '丹寧', '["春季", "夏季", "秋季", "冬季"]', '["日常", "約會"]', None, 0),
+    (3, 1, '外套', '外套', None, None, None, None, None, None, 1),
+]
+
+
+@pytest.fixture
+def baseline_database(tmp_path):
+    path = tmp_path / 'app.db'
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.executemany(
+        "INSERT INTO clothing_items (id, user_id, name, category, primary_color, style, material, "
+        "suitable_seasons, suitable_occasions, photo_path, usage_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        BASELINE_ITEMS
+    )
+    outfit = {'items': [{'id': 1}, {'id': 99}, {'id': 2}], 'explanation': '簡約通勤'}
+    connection.execute("INSERT INTO favorite_outfits (id, user_id, outfit_data, score) VALUES (1, 1, ?, 88.5)",
+                       (json.dumps(outfit, ensure_ascii=False),))
+    connection.execute("INSERT INTO users (id, username, style_level) VALUES (1, 'default_user', 3)")
+    connection.commit()
+    connection.close()
+    return path
+
+
+def test_upgrade_from_baseline_with_data(baseline_database, tmp_path, static_cache_folder):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{baseline_database}',
+        'INIT_DATABASE': False,
+        'BACKGROUND_TASKS': False,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'STATIC_CACHE_FOLDER': static_cache_folder,
+    })
+    init_database(app)
+
+    with app.app_context():
+        assert current_version() == MIGRATIONS[-1][0]
+
+        color_engine = get_color_engine()
+        items = {item.id: item for item in ClothingItem.query.all()}
+        assert sorted(items) == [1, 2, 3]
+        for item_id, _, _, _, primary_color, _, _, seasons, occasions, _, _ in BASELINE_ITEMS:
+            item = items[item_id]
+            assert item.season_mask == season_mask(seasons)
+            assert item.occasion_mask == occasion_mask(occasions)
+            assert item.color_family == color_engine.family_id(primary_color or '')
+            assert item.analysis_status is None
+            assert item.to_dict()['photo_variants'] == {}
+
+        favorite = db.session.get(FavoriteOutfit, 1)
+        assert favorite.explanation == '簡約通勤'
+        item_ids = [row.item_id for row in FavoriteOutfitItem.query.filter_by(favorite_id=1)
+                    .order_by(FavoriteOutfitItem.position)]
+        assert item_ids == [1, 2]
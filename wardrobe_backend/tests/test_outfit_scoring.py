@@ -0,0 +1,147 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.wardrobe_generator import generate_wardrobe
+from src.services.ai_service import OutfitScoringSystem, STYLE_LEVEL_PREFERENCES
+from src.services.outfit_encoding import encode_outfits
+
+WEATHERS = [{'temperature': temperature, 'weather_main': weather_main}
+            for temperature in (5, 12, 17, 22, 28, 35) for weather_main in ('Clear', 'Rain', 'Drizzle')]
+OCCASIONS = ['日常', '正式', '運動', '約會', '工作', '休閒', '派對']
+
+
+class LegacyOutfitScorer:
+    """向量化之前逐件計算的 OutfitScoringSystem.calculate_outfit_score（顏色相容性沿用目前的實作）"""
+
+    def __init__(self, scoring_system):
+        self.color_score = scoring_system._get_color_compatibility_score
+
+    def score(self, outfit_items, weather, occasion, style_level):
+        if len(outfit_items) < 2:
+            return 0
+        total = (self.color_harmony(outfit_items) * 0.3 + self.style_consistency(outfit_items, style_level) * 0.25
+                 + self.weather_appropriateness(outfit_items, weather) * 0.25
+                 + self.occasion_suitability(outfit_items, occasion) * 0.2)
+        return min(100, total)
+
+    def color_harmony(self, outfit_items):
+        scores = [self.color_score(outfit_items[i].get('primary_color', '').strip(),
+                                   outfit_items[j].get('primary_color', '').strip())
+                  for i in range(len(outfit_items)) for j in range(i + 1, len(outfit_items))]
+        return sum(scores) / len(scores) if scores else 50
+
+    def style_consistency(self, outfit_items, style_level):
+        styles = [item.get('style', '').strip() for item in outfit_items if item.get('style')]
+        if not styles:
+            return 50
+        preferred_styles = STYLE_LEVEL_PREFERENCES.get(style_level, {}).get('styles', [])
+        match_score = sum(100 if style in preferred_styles else 40 for style in styles)
+        unique_styles = set(styles)
+        consistency_bonus = 100 if len(unique_styles) == 1 else max(60, 100 - (len(unique_styles) - 1) * 15)
+        return (match_score / len(styles) + consistency_bonus) / 2
+
+    @staticmethod
+    def parse_list(value):
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return [part.strip() for part in value.split(',')]
+        return value
+
+    def weather_appropriateness(self, outfit_items, weather):
+        temp = weather.get('temperature', 20)
+        weather_main = weather.get('weather_main', 'Clear')
+        total = 0
+        for item in outfit_items:
+            category = item.get('category', '').strip()
+            material = item.get('material', '').lower()
+            seasons = self.parse_list(item.get('suitable_seasons', []))
+            item_score = 50
+            if temp < 10:
+                if category in ['外套'] or any(keyword in material for keyword in ['毛', '厚', '保暖', '羊毛', '絨']):
+                    item_score += 25
+                if '冬季' in seasons:
+                    item_score += 15
+            elif temp < 18:
+                if category in ['外套', '上衣'] or any(keyword in material for keyword in ['薄', '長袖']):
+                    item_score += 20
+                if any(season in seasons for season in ['秋季', '春季']):
+                    item_score += 15
+            elif temp < 26:
+                if any(season in seasons for season in ['春季', '秋季']):
+                    item_score += 20
+            else:
+                if any(keyword in material for keyword in ['棉', '麻', '透氣', '薄', '涼爽']):
+                    item_score += 25
+                if '夏季' in seasons:
+                    item_score += 15
+            if weather_main in ['Rain', 'Thunderstorm', 'Drizzle']:
+                if category == '外套' or any(keyword in material for keyword in ['防水', '雨']):
+                    item_score += 10
+            total += min(100, item_score)
+        return total / len(outfit_items)
+
+    def occasion_suitability(self, outfit_items, occasion):
+        occasion_mapping = {'正式': ['正式', '工作'], '日常': ['日常', '休閒'], '運動': ['運動'],
+                            '約會': ['約會', '日常'], '工作': ['工作', '正式']}
+        suitable_occasions = occasion_mapping.get(occasion, [occasion])
+        total = 0
+        for item in outfit_items:
+            item_occasions = self.parse_list(item.get('suitable_occasions', []))
+            if any(occ in suitable_occasions for occ in item_occasions):
+                total += 100
+            elif not item_occasions:
+                total += 70
+            else:
+                total += 40
+        return total / len(outfit_items)
+
+
+def wardrobe(size, seed):
+    """合成衣櫥（舊版評分不接受空值，以空字串表示未填寫；部分列表以資料庫中的字串格式表示）"""
+    rnd = random.Random(seed)
+    items = []
+    for item in generate_wardrobe(size, seed=seed):
+        item = dict(item, primary_color=item['primary_color'] or '', style=item['style'] or '')
+        if rnd.random() < 0.2:
+            item['suitable_seasons'] = json.dumps(item['suitable_seasons'], ensure_ascii=False)
+        elif rnd.random() < 0.1:
+            item['suitable_occasions'] = ','.join(item['suitable_occasions'])
+        items.append(item)
+    return items
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_batch_scores_match_legacy_scoring(seed):
+    rnd = random.Random(seed)
+    items = wardrobe(200, seed)
+    scoring_system = OutfitScoringSystem()
+    legacy = LegacyOutfitScorer(scoring_system)
+    encoding = scoring_system.encode_items(items)
+
+    for _ in range(20):
+        weather = rnd.choice(WEATHERS)
+        occasion = rnd.choice(OCCASIONS + ['海邊'])
+        style_level = rnd.randint(1, 5)
+        outfits = [rnd.sample(range(len(items)), rnd.randint(2, 5)) for _ in range(50)]
+
+        scores = scoring_system.calculate_outfit_scores_batch(encoding, encode_outfits(outfits), weather,
+                                                              occasion, style_level)
+        expected = [legacy.score([items[index] for index in outfit], weather, occasion, style_level)
+                    for outfit in outfits]
+        np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-9)
+
+
+def test_single_outfit_score_matches_legacy_scoring():
+    items = wardrobe(30, seed=4)
+    scoring_system = OutfitScoringSystem()
+    legacy = LegacyOutfitScorer(scoring_system)
+    weather = {'temperature': 8, 'weather_main': 'Rain'}
+    for size in range(1, 5):
+        outfit = items[size:size * 2 + 1]
+        assert scoring_system.calculate_outfit_score(outfit, weather, '約會', 4) \
+            == pytest.approx(legacy.score(outfit, weather, '約會', 4), abs=1e-9)
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from benchmarks.wardrobe_generator import generate_wardrobe
+from src.routes.recommendations import build_outfit_layouts, generate_outfit_combinations
+from src.services.ai_service import OutfitScoringSystem
+from src.services.outfit_encoding import encode_outfits
+from src.services.outfit_search import OutfitSearch
+
+OCCASIONS = ['日常', '正式', '運動', '約會', '工作', '休閒']
+
+
+def items_by_category(items):
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault(item['category'], []).append(index)
+    return groups
+
+
+def brute_force_top_scores(scoring_system, encoding, groups, weather, occasion, style_level, k, min_score):
+    combinations = generate_outfit_combinations(groups, weather['temperature'])
+    scores = scoring_system.calculate_outfit_scores_batch(encoding, encode_outfits(combinations), weather,
+                                                          occasion, style_level)
+    return sorted((score for score in scores.tolist() if score >= min_score), reverse=True)[:k]
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_search_matches_brute_force(seed):
+    rnd = random.Random(seed)
+    scoring_system = OutfitScoringSystem()
+    for _ in range(5):
+        items = generate_wardrobe(rnd.randint(4, 40), seed=rnd.randrange(10 ** 6))
+        groups = items_by_category(items)
+        weather = {'temperature': rnd.choice([5, 15, 21, 30]), 'weather_main': rnd.choice(['Rain', 'Clear'])}
+        occasion = rnd.choice(OCCASIONS)
+        style_level = rnd.randint(1, 5)
+        k = rnd.choice([1, 3, 5])
+        min_score = rnd.choice([0, 60, 70])
+        encoding = scoring_system.encode_items(items)
+
+        search = OutfitSearch(scoring_system, encoding, weather, occasion, style_level, k=k, min_score=min_score)
+        found = search.search(build_outfit_layouts(groups, weather['temperature']))
+
+        expected = brute_force_top_scores(scoring_system, encoding, groups, weather, occasion, style_level, k,
+                                          min_score)
+        assert [score for score, _ in found] == pytest.approx(expected, abs=1e-9)
+        assert search.complete
+        # 返回的組合分數與重新計算的一致
+        for score, outfit in found:
+            assert scoring_system.calculate_outfit_scores_batch(encoding, encode_outfits([outfit]), weather,
+                                                                occasion, style_level)[0] \
+                == pytest.approx(score, abs=1e-9)
+
+
+def test_search_prunes_large_wardrobes():
+    items = generate_wardrobe(120, seed=3)
+    groups = items_by_category(items)
+    scoring_system = OutfitScoringSystem()
+    encoding = scoring_system.encode_items(items)
+    weather = {'temperature': 15, 'weather_main': 'Clear'}
+
+    search = OutfitSearch(scoring_system, encoding, weather, '日常', 3, k=3, min_score=60)
+    found = search.search(build_outfit_layouts(groups, weather['temperature']))
+
+    expected = brute_force_top_scores(scoring_system, encoding, groups, weather, '日常', 3, 3, 60)
+    assert [score for score, _ in found] == pytest.approx(expected, abs=1e-9)
+    assert search.pruned > 0
@@ -0,0 +1,125 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from src.models.wardrobe import db
+from src.models.photo import StoredPhoto
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def jpeg_with_exif(color, description):
+    """含 EXIF 的 JPEG（儲存時會移除中繼資料，內容與上傳不同）"""
+    exif = Image.Exif()
+    exif[0x010E] = description  # ImageDescription
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), color).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+def upload(client, data, filename='photo.jpg'):
+    response = client.post('/api/clothing', data={'name': '測試', 'photo': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    assert response.status_code in (200, 201)
+    return response.get_json()['data']
+
+
+def stored_file(app, url):
+    return os.path.join(app.config['UPLOAD_FOLDER'], *url[len('/uploads/'):].split('/'))
+
+
+def digest_of(url):
+    return os.path.basename(url).split('.')[0].split('_')[0]
+
+
+def refcount(app, digest):
+    with app.app_context():
+        return db.session.get(StoredPhoto, digest).refcount
+
+
+def test_stored_photo_is_named_by_its_content(app):
+    client = app.test_client()
+    data = jpeg_with_exif((20, 40, 60), 'first')
+    item = upload(client, data)
+
+    with open(stored_file(app, item['photo_path']), 'rb') as stored:
+        content = stored.read()
+    assert content != data
+    assert hashlib.sha256(content).hexdigest() == digest_of(item['photo_path'])
+    assert all(digest_of(url) == digest_of(item['photo_path']) for url in item['photo_variants'].values())
+
+    # 相同的上傳與只有中繼資料不同的上傳都共用同一張圖片
+    same = upload(client, data)
+    other_metadata = upload(client, jpeg_with_exif((20, 40, 60), 'second'))
+    assert same['photo_path'] == other_metadata['photo_path'] == item['photo_path']
+    assert refcount(app, digest_of(item['photo_path'])) == 3
+
+
+def test_export_import_keeps_photo_digests(app):
+    client = app.test_client()
+    first = upload(client, jpeg_with_exif((200, 10, 10), 'red'))
+    second = upload(client, jpeg_with_exif((200, 10, 10), 'red'))
+    third = upload(client, jpeg_with_exif((10, 200, 10), 'green'))
+    digests = {digest_of(item['photo_path']) for item in (first, second, third)}
+    assert len(digests) == 2
+
+    archive = client.get('/api/export?user_id=1').data
+    response = client.post('/api/import', data={'user_id': '1', 'archive': (io.BytesIO(archive), 'wardrobe.zip')},
+                           content_type='multipart/form-data')
+    summary = response.get_json()['data']
+    assert summary['clothing_items'] == 3
+    assert summary['photos'] == 2
+
+    items = client.get('/api/clothing').get_json()['data']
+    assert {digest_of(item['photo_path']) for item in items} == digests
+    assert refcount(app, digest_of(first['photo_path'])) == 4
+    assert refcount(app, digest_of(third['photo_path'])) == 2
+
+
+def uploaded_files(app):
+    root = app.config['UPLOAD_FOLDER']
+    return [os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names]
+
+
+def test_analyze_without_api_key_writes_nothing(app, monkeypatch):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    response = app.test_client().post('/api/clothing/analyze',
+                                      data={'photo': (io.BytesIO(jpeg_with_exif((1, 2, 3), 'x')), 'photo.jpg')},
+                                      content_type='multipart/form-data')
+    assert response.status_code == 500
+    assert uploaded_files(app) == []
+
+
+def test_analyze_removes_temporary_files_when_analysis_fails(app, monkeypatch):
+    from src.services.ai_service import AIService
+
+    seen = []
+
+    def failing_analysis(self, image_path, fallback=True):
+        seen.append(image_path)
+        assert os.path.exists(image_path)
+        raise RuntimeError('model unavailable')
+
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(AIService, '__init__', lambda self, api_key: None)
+    monkeypatch.setattr(AIService, 'analyze_clothing_image', failing_analysis)
+    response = app.test_client().post('/api/clothing/analyze',
+                                      data={'photo': (io.BytesIO(jpeg_with_exif((1, 2, 3), 'x')), 'photo.jpg')},
+                                      content_type='multipart/form-data')
+    assert response.status_code == 500
+    assert seen and seen[0].startswith(app.config['UPLOAD_FOLDER'])
+    assert uploaded_files(app) == []
+
+
+def test_incomplete_photo_store_fails_on_construction():
+    from src.services.photo_storage import PhotoStore, LocalPhotoStore
+
+    class PartialStore(PhotoStore):
+        def exists(self, name):
+            return False
+
+    with pytest.raises(TypeError):
+        PartialStore()
+    LocalPhotoStore('/tmp')
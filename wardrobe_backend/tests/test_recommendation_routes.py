@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.mark.parametrize('scenarios, message', [
+    (['x'], '情境 0'),
+    ([{'occasion': '日常'}, 3], '情境 1'),
+    ([{'style_level': 9}], 'style_level'),
+    ([{'style_level': '3'}], 'style_level'),
+    ([{'style_level': [3]}], 'style_level'),
+    ([{'weather': 'sunny'}], 'weather'),
+])
+def test_batch_rejects_invalid_scenarios(app, scenarios, message):
+    response = app.test_client().post('/api/recommendations/generate_batch', json={'scenarios': scenarios})
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_batch_accepts_valid_scenarios(app):
+    response = app.test_client().post('/api/recommendations/generate_batch',
+                                      json={'scenarios': [{'occasion': '日常', 'style_level': 2}, {}]})
+    assert response.status_code == 200
+    assert [result['style_level'] for result in response.get_json()['data']] == [2, 3]
+
+
+def test_stream_keeps_request_context(app, monkeypatch):
+    from flask import has_request_context, request
+
+    from benchmarks.wardrobe_generator import generate_wardrobe, insert_wardrobe
+    from src.routes import recommendations
+
+    def events(*args):
+        yield recommendations.sse_event('done', {'in_request': has_request_context() and request.path})
+
+    with app.app_context():
+        insert_wardrobe(generate_wardrobe(40, seed=5))
+    monkeypatch.setattr(recommendations, 'stream_search_events', events)
+    response = app.test_client().post('/api/recommendations/generate/stream', json={'weather': {'temperature': 18}})
+    assert '"in_request": "/api/recommendations/generate/stream"' in response.get_data(as_text=True)
@@ -0,0 +1,99 @@
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from src.main import create_app
+from src.models.wardrobe import db, ClothingItem
+from src.models.photo import StoredPhoto
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def jpeg_with_exif(color):
+    exif = Image.Exif()
+    exif[0x010E] = 'legacy upload'  # ImageDescription
+    buffer = io.BytesIO()
+    Image.new('RGB', (1600, 1200), color).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+def make_app(folder, static_cache_folder):
+    folder.mkdir()
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{folder / 'app.db'}",
+        'BACKGROUND_TASKS': False,
+        'UPLOAD_FOLDER': str(folder / 'uploads'),
+        'STATIC_CACHE_FOLDER': static_cache_folder,
+    })
+
+
+def import_archive(app, archive):
+    response = app.test_client().post('/api/import',
+                                      data={'user_id': '1', 'archive': (io.BytesIO(archive), 'wardrobe.zip')},
+                                      content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+def stored_photos(app):
+    with app.app_context():
+        return {photo.digest: photo.analysis_name for photo in StoredPhoto.query}
+
+
+def test_round_trip_keeps_digest_and_analysis_image(tmp_path, static_cache_folder):
+    source_app = make_app(tmp_path / 'source', static_cache_folder)
+    client = source_app.test_client()
+    item = client.post('/api/clothing', data={'name': '襯衫', 'photo': (io.BytesIO(jpeg_with_exif((90, 20, 20))), 'a.jpg')},
+                       content_type='multipart/form-data').get_json()['data']
+    exported = stored_photos(source_app)
+    archive = client.get('/api/export?user_id=1').data
+
+    records = [json.loads(line) for line in zipfile.ZipFile(io.BytesIO(archive)).read('clothing_items.jsonl').splitlines()]
+    assert 'analysis' in records[0]['photos']
+
+    target_app = make_app(tmp_path / 'target', static_cache_folder)
+    assert import_archive(target_app, archive)['photos'] == 1
+    assert stored_photos(target_app) == exported
+    with target_app.app_context():
+        imported = ClothingItem.query.filter_by(name='襯衫').one()
+        assert imported.photo_path == item['photo_path']
+        assert json.loads(imported.photo_variants) == item['photo_variants']
+
+
+def test_legacy_photo_is_normalized_on_import(tmp_path, static_cache_folder):
+    data = jpeg_with_exif((20, 90, 20))
+    source_app = make_app(tmp_path / 'source', static_cache_folder)
+    uploads = source_app.config['UPLOAD_FOLDER']
+    os.makedirs(uploads, exist_ok=True)
+    with open(os.path.join(uploads, 'legacy-photo.jpg'), 'wb') as target:
+        target.write(data)
+    with source_app.app_context():
+        db.session.add(ClothingItem(user_id=1, name='舊衣物', category='上衣', photo_path='/uploads/legacy-photo.jpg'))
+        db.session.commit()
+    archive = source_app.test_client().get('/api/export?user_id=1').data
+
+    target_app = make_app(tmp_path / 'target', static_cache_folder)
+    assert import_archive(target_app, archive)['photos'] == 1
+    with target_app.app_context():
+        imported = ClothingItem.query.filter_by(name='舊衣物').one()
+        digest = os.path.basename(imported.photo_path).split('.')[0]
+        photo = db.session.get(StoredPhoto, digest)
+        assert photo.analysis_name and set(json.loads(imported.photo_variants)) == {'small', 'medium'}
+    # 以處理後（移除 EXIF）的內容命名
+    stored_path = os.path.join(target_app.config['UPLOAD_FOLDER'], *imported.photo_path[len('/uploads/'):].split('/'))
+    with open(stored_path, 'rb') as stored:
+        content = stored.read()
+    assert digest != hashlib.sha256(data).hexdigest()
+    assert hashlib.sha256(content).hexdigest() == digest
+    assert 'exif' not in Image.open(io.BytesIO(content)).info
+
+    # 直接上傳相同內容時共用同一張圖片
+    uploaded = target_app.test_client().post('/api/clothing', data={'name': '上傳', 'photo': (io.BytesIO(data), 'b.jpg')},
+                                             content_type='multipart/form-data').get_json()['data']
+    assert uploaded['photo_path'] == imported.photo_path
+    with target_app.app_context():
+        assert db.session.get(StoredPhoto, digest).refcount == 2
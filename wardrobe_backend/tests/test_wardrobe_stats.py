@@ -0,0 +1,26 @@
+from src.models.wardrobe import db, WardrobeSummary
+from src.routes import recommendations
+
+
+def test_invalid_user_id_is_rejected(app):
+    response = app.test_client().get('/api/stats/wardrobe?user_id=abc')
+    assert response.status_code == 400
+
+
+def test_concurrent_first_load_returns_stats(app, monkeypatch):
+    aggregate = recommendations.aggregate_wardrobe_stats
+
+    def aggregate_while_another_request_writes(user_id):
+        stats = aggregate(user_id)
+        # 另一個請求在本次彙總期間先寫入快照
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(WardrobeSummary.__table__).values(user_id=user_id, version=0, data='{}'))
+        return stats
+
+    monkeypatch.setattr(recommendations, 'aggregate_wardrobe_stats', aggregate_while_another_request_writes)
+    response = app.test_client().get('/api/stats/wardrobe?user_id=1')
+    assert response.status_code == 200
+    assert response.get_json()['data']['total_items'] == 0
+
+    monkeypatch.setattr(recommendations, 'aggregate_wardrobe_stats', aggregate)
+    assert app.test_client().get('/api/stats/wardrobe?user_id=1').status_code == 200
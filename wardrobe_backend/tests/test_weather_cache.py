@@ -0,0 +1,32 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.weather_cache import WeatherCache
+
+
+def test_concurrent_cold_misses_fetch_once():
+    cache = WeatherCache(ttl=600, stale=3600)
+    calls = []
+
+    def fetch():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return {'temperature': 25}
+
+    key = cache.key(25.033, 121.565)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: cache.get(key, fetch), range(8)))
+
+    assert len(calls) == 1
+    assert results == [{'temperature': 25}] * 8
+    assert cache.get(key, fetch) == {'temperature': 25}
+    assert len(calls) == 1
+
+
+def test_failed_fetch_does_not_block_later_requests():
+    cache = WeatherCache(ttl=600, stale=3600)
+    key = cache.key(22.627, 120.301)
+
+    assert cache.get(key, lambda: None) is None
+    assert cache.get(key, lambda: {'temperature': 30}) == {'temperature': 30}
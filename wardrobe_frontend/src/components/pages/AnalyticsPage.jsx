@@ -185,7 +185,7 @@ const AnalyticsPage = () => {
                   <div className="w-12 h-12 bg-gray-200 rounded-lg flex items-center justify-center">
                     {item.photo_path ? (
                       <img
-                        src={`http://localhost:5000${item.photo_path}`}
+                        src={`http://localhost:5000${item.photo_variants?.small || item.photo_path}`}
                         alt={item.name}
                         className="w-full h-full object-cover rounded-lg"
                       />
@@ -142,7 +142,7 @@ const FavoritesPage = () => {
                         <div className="w-full h-32 bg-gray-100 rounded-lg flex items-center justify-center mb-2 overflow-hidden">
                           {item.photo_path ? (
                             <img 
-                              src={`http://localhost:5000${item.photo_path}`} 
+                              src={`http://localhost:5000${item.photo_variants?.small || item.photo_path}`} 
                               alt={item.name}
                               className="w-full h-full object-cover"
                             />
@@ -261,7 +261,7 @@ const HomePage = () => {
                         <div className="w-full h-24 bg-gray-100 rounded-lg flex items-center justify-center mb-2">
                           {item.photo_path ? (
                             <img 
-                              src={`http://localhost:5000${item.photo_path}`} 
+                              src={`http://localhost:5000${item.photo_variants?.small || item.photo_path}`} 
                               alt={item.name}
                               className="w-full h-full object-cover rounded-lg"
                             />
@@ -391,7 +391,7 @@ const WardrobePage = () => {
               <div className="aspect-square bg-gray-100 relative">
                 {item.photo_path ? (
                   <img
-                    src={`http://localhost:5000${item.photo_path}`}
+                    src={`http://localhost:5000${item.photo_variants?.medium || item.photo_path}`}
                     alt={item.name}
                     className="w-full h-full object-cover"
                   />